@@ -0,0 +1,106 @@
+"""Particiona audit_logs por mês (PostgreSQL) e indexa created_at
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    if bind.dialect.name != "postgresql":
+        # SQLite: sem particionamento; o índice permite a limpeza em lotes por data
+        op.create_index('ix_audit_logs_created_at', 'audit_logs', ['created_at'], unique=False)
+        return
+
+    # Tabela particionada: a PK precisa incluir a chave de partição
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_old")
+    op.execute("ALTER INDEX IF EXISTS ix_audit_logs_id RENAME TO ix_audit_logs_old_id")
+    op.execute("ALTER TABLE audit_logs_old RENAME CONSTRAINT audit_logs_pkey TO audit_logs_old_pkey")
+    op.execute("""
+        CREATE TABLE audit_logs (
+            id INTEGER NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            entity VARCHAR NOT NULL,
+            entity_id INTEGER NOT NULL,
+            action auditaction NOT NULL,
+            changes JSON,
+            ip_address VARCHAR,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+    op.execute("CREATE INDEX ix_audit_logs_id ON audit_logs (id)")
+    op.execute("CREATE INDEX ix_audit_logs_created_at ON audit_logs (created_at)")
+
+    # Uma partição por mês desde o log mais antigo até 3 meses à frente
+    op.execute("""
+    DO $$
+    DECLARE
+        inicio DATE := date_trunc('month', COALESCE(
+            (SELECT min(created_at) FROM audit_logs_old), now()) AT TIME ZONE 'UTC')::date;
+        fim DATE := (date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months')::date;
+    BEGIN
+        WHILE inicio <= fim LOOP
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF audit_logs '
+                'FOR VALUES FROM (%L) TO (%L)',
+                'audit_logs_p' || to_char(inicio, 'YYYYMM'),
+                inicio::text || ' 00:00:00+00',
+                (inicio + interval '1 month')::date::text || ' 00:00:00+00'
+            );
+            inicio := (inicio + interval '1 month')::date;
+        END LOOP;
+    END $$;
+    """)
+    op.execute("CREATE TABLE IF NOT EXISTS audit_logs_default PARTITION OF audit_logs DEFAULT")
+
+    op.execute("""
+        INSERT INTO audit_logs (id, user_id, entity, entity_id, action, changes, ip_address, created_at)
+        SELECT id, user_id, entity, entity_id, action, changes, ip_address, COALESCE(created_at, now())
+        FROM audit_logs_old
+    """)
+    op.execute("DROP TABLE audit_logs_old")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    if bind.dialect.name != "postgresql":
+        op.drop_index('ix_audit_logs_created_at', table_name='audit_logs')
+        return
+
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_partitioned")
+    op.execute("ALTER INDEX ix_audit_logs_id RENAME TO ix_audit_logs_partitioned_id")
+    op.execute("ALTER TABLE audit_logs_partitioned RENAME CONSTRAINT audit_logs_pkey TO audit_logs_partitioned_pkey")
+    op.execute("""
+        CREATE TABLE audit_logs (
+            id INTEGER NOT NULL DEFAULT nextval('audit_logs_id_seq') PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            entity VARCHAR NOT NULL,
+            entity_id INTEGER NOT NULL,
+            action auditaction NOT NULL,
+            changes JSON,
+            ip_address VARCHAR,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+        )
+    """)
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+    op.execute("CREATE INDEX ix_audit_logs_id ON audit_logs (id)")
+    op.execute("""
+        INSERT INTO audit_logs (id, user_id, entity, entity_id, action, changes, ip_address, created_at)
+        SELECT id, user_id, entity, entity_id, action, changes, ip_address, created_at
+        FROM audit_logs_partitioned
+    """)
+    op.execute("DROP TABLE audit_logs_partitioned")
@@ -0,0 +1,65 @@
+"""Índices para filtros e joins das consultas mais frequentes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+# (nome, tabela, colunas, condição do índice parcial)
+INDICES = [
+    # Preço atual de uma matéria-prima (materias_primas.py, notas.py, cálculo de custos)
+    ('ix_materia_prima_precos_atual', 'materia_prima_precos', ['materia_prima_id'], 'vigente_ate IS NULL'),
+    # Último preço encerrado (ORDER BY vigente_ate DESC) em materias_primas.py
+    ('ix_materia_prima_precos_mp_vigente_ate', 'materia_prima_precos', ['materia_prima_id', 'vigente_ate'], None),
+    # Histórico por matéria-prima e janelas LAG/LEAD particionadas por materia_prima_id
+    ('ix_materia_prima_precos_mp_vigente_desde', 'materia_prima_precos', ['materia_prima_id', 'vigente_desde'], None),
+    # Filtros de período do histórico geral (historicos.py)
+    ('ix_materia_prima_precos_vigente_desde', 'materia_prima_precos', ['vigente_desde'], None),
+
+    ('ix_produto_precos_atual', 'produto_precos', ['produto_id'], 'vigente_ate IS NULL'),
+    ('ix_produto_precos_produto_vigente_desde', 'produto_precos', ['produto_id', 'vigente_desde'], None),
+    ('ix_produto_precos_vigente_desde', 'produto_precos', ['vigente_desde'], None),
+
+    ('ix_nota_itens_nota_id', 'nota_itens', ['nota_id'], None),
+    # Itens ainda sem matéria-prima ficam fora do índice
+    ('ix_nota_itens_materia_prima_id', 'nota_itens', ['materia_prima_id'], 'materia_prima_id IS NOT NULL'),
+
+    ('ix_produto_componentes_materia_prima_id', 'produto_componentes', ['materia_prima_id'], None),
+    ('ix_produto_componentes_produto_id', 'produto_componentes', ['produto_id'], None),
+
+    # Listagem de notas ordenada por created_at, com filtro de fornecedor e período
+    ('ix_notas_created_at', 'notas', ['created_at'], None),
+    ('ix_notas_fornecedor_emissao', 'notas', ['fornecedor_id', 'emissao_date'], None),
+
+    ('ix_audit_logs_entity', 'audit_logs', ['entity', 'entity_id'], None),
+]
+
+
+def upgrade() -> None:
+    for nome, tabela, colunas, condicao in INDICES:
+        where = sa.text(condicao) if condicao else None
+        op.create_index(
+            nome, tabela, colunas, unique=False,
+            postgresql_where=where, sqlite_where=where,
+        )
+
+    # Estatísticas atualizadas para o planejador considerar os novos índices
+    if op.get_bind().dialect.name == "postgresql":
+        for tabela in sorted({tabela for _, tabela, _, _ in INDICES}):
+            op.execute(f"ANALYZE {tabela}")
+
+
+def downgrade() -> None:
+    for nome, tabela, _, _ in reversed(INDICES):
+        op.drop_index(nome, table_name=tabela)
@@ -0,0 +1,61 @@
+"""Agregado diário de variações de preço para o resumo dos históricos
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+# Mesmo cálculo de app.services.resumo_historicos.reconstruir (date() existe no PostgreSQL e no SQLite)
+CARGA_INICIAL = """
+INSERT INTO variacoes_preco_diarias (tipo, item_id, dia, total_precos, soma_variacao_abs)
+SELECT '{tipo}', item_id, dia, count(*), sum(variacao)
+FROM (
+    SELECT {coluna_item} AS item_id,
+           date(vigente_desde) AS dia,
+           abs(coalesce({coluna_valor} - lag({coluna_valor}) OVER (
+               PARTITION BY {coluna_item} ORDER BY vigente_desde, id), 0)) AS variacao
+    FROM {tabela}
+) v
+GROUP BY item_id, dia
+"""
+
+TIPOS = [
+    ('materia_prima', 'materia_prima_precos', 'materia_prima_id', 'valor_unitario'),
+    ('produto', 'produto_precos', 'produto_id', 'custo_total'),
+]
+
+
+def upgrade() -> None:
+    op.create_table('variacoes_preco_diarias',
+        sa.Column('tipo', sa.String(length=20), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('dia', sa.Date(), nullable=False),
+        sa.Column('total_precos', sa.Integer(), nullable=False),
+        sa.Column('soma_variacao_abs', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('tipo', 'item_id', 'dia')
+    )
+    op.create_index('ix_variacoes_preco_diarias_tipo_dia', 'variacoes_preco_diarias', ['tipo', 'dia'], unique=False)
+
+    for tipo, tabela, coluna_item, coluna_valor in TIPOS:
+        op.execute(CARGA_INICIAL.format(
+            tipo=tipo, tabela=tabela, coluna_item=coluna_item, coluna_valor=coluna_valor
+        ))
+
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("ANALYZE variacoes_preco_diarias")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_variacoes_preco_diarias_tipo_dia', table_name='variacoes_preco_diarias')
+    op.drop_table('variacoes_preco_diarias')
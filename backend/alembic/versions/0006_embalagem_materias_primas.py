@@ -0,0 +1,52 @@
+"""Tamanho de embalagem das matérias-primas interpretado do nome e gravado
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+# Mesma regra de app.services.embalagem
+EMBALAGEM = re.compile(r"\s*(\d+(?:\.\d+)?)\s*(L|KG|PC|UN|MT|M)$", re.IGNORECASE)
+LOTE = 5000
+
+
+def upgrade() -> None:
+    op.add_column('materias_primas', sa.Column('nome_exibicao', sa.String(), nullable=True))
+    op.add_column('materias_primas', sa.Column('embalagem_quantidade', sa.Numeric(14, 4), nullable=True))
+    op.add_column('materias_primas', sa.Column('embalagem_unidade', sa.String(length=10), nullable=True))
+
+    conn = op.get_bind()
+    atualizar = sa.text(
+        "UPDATE materias_primas SET nome_exibicao = :nome_exibicao, "
+        "embalagem_quantidade = :embalagem_quantidade, embalagem_unidade = :embalagem_unidade WHERE id = :id"
+    )
+    linhas = []
+    for id_, nome in conn.execute(sa.text("SELECT id, nome FROM materias_primas")).all():
+        encontrado = EMBALAGEM.search(nome or "")
+        linhas.append({
+            "id": id_,
+            "nome_exibicao": (nome[:encontrado.start()].strip() or nome) if encontrado else nome,
+            "embalagem_quantidade": float(encontrado.group(1)) if encontrado else None,
+            "embalagem_unidade": encontrado.group(2).upper() if encontrado else None,
+        })
+    for inicio in range(0, len(linhas), LOTE):
+        conn.execute(atualizar, linhas[inicio:inicio + LOTE])
+
+
+def downgrade() -> None:
+    op.drop_column('materias_primas', 'embalagem_unidade')
+    op.drop_column('materias_primas', 'embalagem_quantidade')
+    op.drop_column('materias_primas', 'nome_exibicao')
@@ -0,0 +1,55 @@
+"""Índices GiST por intervalo de vigência para consultas de preço numa data
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+# (nome, tabela, coluna do item); expressão igual à de app.services.precos_vigentes
+INDICES = [
+    ('ix_materia_prima_precos_intervalo', 'materia_prima_precos', 'materia_prima_id'),
+    ('ix_produto_precos_intervalo', 'produto_precos', 'produto_id'),
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # Fora do PostgreSQL a consulta usa o índice (item, vigente_desde) da 0004
+    if bind.dialect.name != "postgresql":
+        return
+    # btree_gist permite o item (inteiro) e o intervalo no mesmo índice GiST
+    disponivel = bind.execute(sa.text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'btree_gist'"
+    )).scalar()
+    if not disponivel:
+        logger.warning("Extensão btree_gist indisponível; consultas por data seguem pelo índice (item, vigente_desde)")
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    for nome, tabela, coluna_item in INDICES:
+        op.execute(
+            f"CREATE INDEX {nome} ON {tabela} "
+            f"USING gist ({coluna_item}, tstzrange(vigente_desde, vigente_ate, '[)'))"
+        )
+        op.execute(f"ANALYZE {tabela}")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for nome, _, _ in INDICES:
+        op.execute(f"DROP INDEX IF EXISTS {nome}")
@@ -0,0 +1,36 @@
+"""Resumo da análise de variações de preço por matéria-prima
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('analises_variacao_preco',
+        sa.Column('periodo_dias', sa.Integer(), nullable=False),
+        sa.Column('materia_prima_id', sa.Integer(), nullable=False),
+        sa.Column('analisado_em', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('total_variacoes', sa.Integer(), nullable=False),
+        sa.Column('maior_variacao_abs', sa.Float(), nullable=False),
+        sa.Column('maior_variacao_pct', sa.Float(), nullable=False),
+        sa.Column('variacao_media_pct', sa.Float(), nullable=False),
+        sa.Column('volatilidade_pct', sa.Float(), nullable=False),
+        sa.Column('maior_zscore', sa.Float(), nullable=False),
+        sa.Column('anomalias', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('periodo_dias', 'materia_prima_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('analises_variacao_preco')
@@ -0,0 +1,36 @@
+"""Execuções da verificação de integridade (marca d'água do modo incremental)
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('verificacoes_integridade',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('modo', sa.String(length=20), nullable=False),
+        sa.Column('iniciada_em', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('concluida_em', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('problemas_encontrados', sa.Integer(), nullable=False),
+        sa.Column('problemas', sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # Última execução concluída (marca d'água)
+    op.create_index('ix_verificacoes_integridade_concluida_em', 'verificacoes_integridade',
+                    ['concluida_em'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_verificacoes_integridade_concluida_em', table_name='verificacoes_integridade')
+    op.drop_table('verificacoes_integridade')
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.auth.jwt import create_access_token, create_refresh_token, authenticate_user
+from app.auth.jwt import create_access_token, create_refresh_token, authenticate_user_async
 from app.schemas.user import UserLogin, TokenResponse
 from app.models.user import User
 
@@ -15,7 +15,7 @@ async def login(
     db: Session = Depends(get_db)
 ):
     """Login do usuário"""
-    user = authenticate_user(user_credentials.email, user_credentials.password, db)
+    user = await authenticate_user_async(user_credentials.email, user_credentials.password, db)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
 from app.models import Fornecedor, User
 from app.schemas import FornecedorCreate, FornecedorUpdate, FornecedorResponse
 from app.auth.dependencies import require_editor
+from app.utils.http_cache import resposta_cacheada
 
 fornecedores_router = APIRouter(prefix="/fornecedores", tags=["Fornecedores"])
 
@@ -52,18 +53,20 @@ async def criar_fornecedor(
 
 @fornecedores_router.get("/", response_model=List[FornecedorResponse])
 async def listar_fornecedores(
+    request: Request,
     skip: int = 0, 
     limit: int = 100, 
     ativo: bool = True,
     db: Session = Depends(get_db)
 ):
     """Listar fornecedores"""
-    query = db.query(Fornecedor)
-    if ativo is not None:
-        query = query.filter(Fornecedor.ativo == ativo)
-    
-    fornecedores = query.offset(skip).limit(limit).all()
-    return fornecedores
+    def gerar():
+        query = db.query(Fornecedor)
+        if ativo is not None:
+            query = query.filter(Fornecedor.ativo == ativo)
+        return query.offset(skip).limit(limit).all()
+
+    return resposta_cacheada(request, ["fornecedor"], gerar, List[FornecedorResponse])
 
 @fornecedores_router.get("/{fornecedor_id}", response_model=FornecedorResponse)
 async def buscar_fornecedor(
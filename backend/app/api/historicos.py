@@ -1,7 +1,7 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, desc
+from sqlalchemy import and_, or_, desc
 from datetime import datetime, date
 
 from app.database import get_db
@@ -11,6 +11,8 @@ from app.models.produto import Produto, ProdutoPreco
 from app.models.fornecedor import Fornecedor
 from app.schemas.common import PaginatedResponse
 from app.auth.dependencies import get_current_active_user
+from app.services import resumo_historicos
+from app.utils.http_cache import resposta_cacheada
 
 router = APIRouter(prefix="/historicos", tags=["historicos"])
 
@@ -68,10 +70,10 @@ async def get_historico_materias_primas(
         # Buscar informações do fornecedor
         fornecedor_info = None
         if preco.fornecedor_id:
-            fornecedor_obj = db.query(Fornecedor).filter(Fornecedor.id == preco.fornecedor_id).first()
+            fornecedor_obj = db.query(Fornecedor).filter(Fornecedor.id_fornecedor == preco.fornecedor_id).first()
             if fornecedor_obj:
                 fornecedor_info = {
-                    "id": fornecedor_obj.id,
+                    "id": fornecedor_obj.id_fornecedor,
                     "nome": fornecedor_obj.nome,
                     "cnpj": fornecedor_obj.cnpj
                 }
@@ -82,7 +84,6 @@ async def get_historico_materias_primas(
             "moeda": preco.moeda,
             "vigente_desde": preco.vigente_desde,
             "vigente_ate": preco.vigente_ate,
-            "origem": preco.origem.value,
             "fornecedor": fornecedor_info,
             "nota_id": preco.nota_id,
             "created_at": preco.created_at
@@ -154,10 +155,10 @@ async def get_historico_materia_prima(
     for preco in precos:
         fornecedor_info = None
         if preco.fornecedor_id:
-            fornecedor = db.query(Fornecedor).filter(Fornecedor.id == preco.fornecedor_id).first()
+            fornecedor = db.query(Fornecedor).filter(Fornecedor.id_fornecedor == preco.fornecedor_id).first()
             if fornecedor:
                 fornecedor_info = {
-                    "id": fornecedor.id,
+                    "id": fornecedor.id_fornecedor,
                     "nome": fornecedor.nome,
                     "cnpj": fornecedor.cnpj
                 }
@@ -168,7 +169,6 @@ async def get_historico_materia_prima(
             "moeda": preco.moeda,
             "vigente_desde": preco.vigente_desde,
             "vigente_ate": preco.vigente_ate,
-            "origem": preco.origem.value,
             "fornecedor": fornecedor_info,
             "nota_id": preco.nota_id,
             "created_at": preco.created_at
@@ -341,91 +341,14 @@ async def get_historico_produto(
 
 @router.get("/resumo")
 async def get_resumo_historicos(
+    request: Request,
     periodo_ini: Optional[date] = Query(None, description="Data inicial"),
     periodo_fim: Optional[date] = Query(None, description="Data final"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Obtém resumo dos históricos de preços e custos"""
-    # Estatísticas de matérias-primas
-    query_mp = db.query(MateriaPrimaPreco)
-    if periodo_ini:
-        query_mp = query_mp.filter(MateriaPrimaPreco.vigente_desde >= periodo_ini)
-    if periodo_fim:
-        query_mp = query_mp.filter(MateriaPrimaPreco.vigente_desde <= periodo_fim)
-    
-    total_precos_mp = query_mp.count()
-    variacao_media_mp = db.query(
-        func.avg(
-            func.abs(
-                func.coalesce(
-                    func.lag(MateriaPrimaPreco.valor_unitario).over(
-                        partition_by=MateriaPrimaPreco.materia_prima_id,
-                        order_by=MateriaPrimaPreco.vigente_desde
-                    ) - MateriaPrimaPreco.valor_unitario,
-                    0
-                )
-            )
-        )
-    ).scalar()
-    
-    # Estatísticas de produtos
-    query_prod = db.query(ProdutoPreco)
-    if periodo_ini:
-        query_prod = query_prod.filter(ProdutoPreco.vigente_desde >= periodo_ini)
-    if periodo_fim:
-        query_prod = query_prod.filter(ProdutoPreco.vigente_desde <= periodo_fim)
-    
-    total_custos_prod = query_prod.count()
-    variacao_media_prod = db.query(
-        func.avg(
-            func.abs(
-                func.coalesce(
-                    func.lag(ProdutoPreco.custo_total).over(
-                        partition_by=ProdutoPreco.produto_id,
-                        order_by=ProdutoPreco.vigente_desde
-                    ) - ProdutoPreco.custo_total,
-                    0
-                )
-            )
-        )
-    ).scalar()
-    
-    # Top 5 matérias-primas com mais variações
-    top_mp_variacoes = db.query(
-        MateriaPrima.nome,
-        func.count(MateriaPrimaPreco.id).label('total_precos')
-    ).join(MateriaPrimaPreco).group_by(MateriaPrima.id, MateriaPrima.nome).order_by(
-        func.count(MateriaPrimaPreco.id).desc()
-    ).limit(5).all()
-    
-    # Top 5 produtos com mais variações
-    top_prod_variacoes = db.query(
-        Produto.nome,
-        func.count(ProdutoPreco.id).label('total_custos')
-    ).join(ProdutoPreco).group_by(Produto.id, Produto.nome).order_by(
-        func.count(ProdutoPreco.id).desc()
-    ).limit(5).all()
-    
-    return {
-        "periodo": {
-            "inicio": periodo_ini,
-            "fim": periodo_fim
-        },
-        "materias_primas": {
-            "total_precos": total_precos_mp,
-            "variacao_media_absoluta": float(variacao_media_mp) if variacao_media_mp else 0,
-            "top_variacoes": [
-                {"nome": mp.nome, "total_precos": mp.total_precos}
-                for mp in top_mp_variacoes
-            ]
-        },
-        "produtos": {
-            "total_custos": total_custos_prod,
-            "variacao_media_absoluta": float(variacao_media_prod) if variacao_media_prod else 0,
-            "top_variacoes": [
-                {"nome": prod.nome, "total_custos": prod.total_custos}
-                for prod in top_prod_variacoes
-            ]
-        }
-    } 
\ No newline at end of file
+    return resposta_cacheada(
+        request, ["materias_primas", "produtos", "variacoes_preco_diarias", "materia_prima_precos", "produto_precos"],
+        lambda: resumo_historicos.resumo(db, periodo_ini, periodo_fim),
+    )
@@ -8,6 +8,7 @@ import os
 from email.header import decode_header
 import hashlib
 import asyncio
+import logging
 
 from app.database import get_db
 from app.models.user import User
@@ -21,6 +22,7 @@ from app.auth.dependencies import get_current_active_user, require_admin
 from app.config import settings
 
 router = APIRouter(prefix="/integracoes", tags=["Integrações"])
+logger = logging.getLogger(__name__)
 
 @router.get("/ping")
 def ping_integracoes():
@@ -307,14 +309,14 @@ async def processar_emails_background(db: Session):
                 
             except Exception as e:
                 # Log do erro
-                print(f"Erro ao processar email {email_id}: {str(e)}")
+                logger.error("Erro ao processar email %s: %s", email_id, e)
                 continue
         
         imap_server.logout()
         
     except Exception as e:
         # Log do erro geral
-        print(f"Erro no processamento de emails: {str(e)}")
+        logger.error("Erro no processamento de emails: %s", e)
 
 
 @router.post("/sincronizar")
@@ -342,10 +344,10 @@ async def sincronizar_dados_background(db: Session):
         # Simular sincronização
         await asyncio.sleep(5)
         
-        print("Sincronização de dados concluída")
+        logger.info("Sincronização de dados concluída")
         
     except Exception as e:
-        print(f"Erro na sincronização: {str(e)}")
+        logger.error("Erro na sincronização: %s", e)
 
 
 @router.get("/logs")
@@ -1,5 +1,6 @@
+from datetime import date, datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 
@@ -7,6 +8,7 @@ from app.database import get_db
 from app.models.user import User
 from app.models.materia_prima import MateriaPrima, MateriaPrimaPreco
 from app.models.fornecedor import Fornecedor
+from app.models.historico_resumo import AnaliseVariacaoPreco
 from app.models.nota import Nota
 from app.models.unidade import Unidade
 from app.schemas.materia_prima import (
@@ -14,11 +16,14 @@ from app.schemas.materia_prima import (
     MateriaPrimaUpdate,
     MateriaPrimaPrecoCreate,
     MateriaPrimaResponse,
-    MateriaPrimaPrecoResponse
+    MateriaPrimaPrecoResponse,
+    PrecosVigentesRequest
 )
 from app.schemas.common import PaginatedResponse
 from app.auth.dependencies import get_current_active_user, require_editor
 from app.utils.audit import log_audit
+from app.utils.http_cache import resposta_cacheada
+from app.services import precos_vigentes, series_precos
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,9 +33,17 @@ router = APIRouter(prefix="/materias-primas", tags=["materias-primas"])
 
 @router.get("/public", response_model=List[MateriaPrimaResponse])
 async def list_materias_primas_public(
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Lista todas as matérias-primas ativas (endpoint público para frontend)"""
+    return resposta_cacheada(
+        request, ["materias_primas", "materia_prima_precos", "unidades"],
+        lambda: _listar_materias_primas_publicas(db), List[MateriaPrimaResponse],
+    )
+
+
+def _listar_materias_primas_publicas(db: Session) -> List[MateriaPrimaResponse]:
     materias_primas = db.query(MateriaPrima).filter(MateriaPrima.is_active == True).all()
     
     items = []
@@ -63,6 +76,7 @@ async def list_materias_primas_public(
 
 @router.get("/", response_model=PaginatedResponse[MateriaPrimaResponse])
 async def list_materias_primas(
+    request: Request,
     nome: Optional[str] = Query(None, description="Filtrar por nome"),
     unidade_codigo: Optional[str] = Query(None, description="Filtrar por unidade"),
     page: int = Query(1, ge=1, description="Número da página"),
@@ -70,6 +84,15 @@ async def list_materias_primas(
     db: Session = Depends(get_db)
 ):
     """Lista matérias-primas com paginação e filtros"""
+    return resposta_cacheada(
+        request, ["materias_primas", "materia_prima_precos"],
+        lambda: _listar_materias_primas(db, nome, unidade_codigo, page, page_size),
+        PaginatedResponse[MateriaPrimaResponse],
+    )
+
+
+def _listar_materias_primas(db: Session, nome: Optional[str], unidade_codigo: Optional[str],
+                            page: int, page_size: int) -> PaginatedResponse[MateriaPrimaResponse]:
     query = db.query(MateriaPrima).filter(MateriaPrima.is_active == True)
     
     if nome:
@@ -137,6 +160,7 @@ async def list_materias_primas(
 @router.get("/{materia_prima_id}", response_model=MateriaPrimaResponse)
 async def get_materia_prima(
     materia_prima_id: int,
+    as_of: Optional[datetime] = Query(None, description="Preço vigente nesta data em vez do atual"),
     db: Session = Depends(get_db)
 ):
     """Obtém detalhes de uma matéria-prima específica"""
@@ -153,13 +177,20 @@ async def get_materia_prima(
             detail="Matéria-prima não encontrada"
         )
     
-    # Buscar preço atual
-    preco_atual = db.query(MateriaPrimaPreco).filter(
-        and_(
-            MateriaPrimaPreco.materia_prima_id == materia_prima_id,
-            MateriaPrimaPreco.vigente_ate.is_(None)
-        )
-    ).first()
+    # Buscar preço atual (ou o vigente em as_of)
+    if as_of is not None:
+        vigente = precos_vigentes.preco_materia_prima_em(db, materia_prima_id, as_of)
+        valor_preco = vigente.valor if vigente else None
+        vigente_desde = vigente.vigente_desde if vigente else None
+    else:
+        preco_atual = db.query(MateriaPrimaPreco).filter(
+            and_(
+                MateriaPrimaPreco.materia_prima_id == materia_prima_id,
+                MateriaPrimaPreco.vigente_ate.is_(None)
+            )
+        ).first()
+        valor_preco = preco_atual.valor_unitario if preco_atual else None
+        vigente_desde = preco_atual.vigente_desde if preco_atual else None
     
     return MateriaPrimaResponse(
         id=materia_prima.id,
@@ -169,14 +200,36 @@ async def get_materia_prima(
         is_active=materia_prima.is_active,
             created_at=str(materia_prima.created_at),
             updated_at=str(materia_prima.updated_at) if materia_prima.updated_at else None,
-        preco_atual=preco_atual.valor_unitario if preco_atual else None,
+        preco_atual=valor_preco,
         preco_anterior=None,
         variacao_abs=None,
         variacao_pct=None,
-            vigente_desde=str(preco_atual.vigente_desde) if preco_atual and preco_atual.vigente_desde else None
+            vigente_desde=str(vigente_desde) if vigente_desde else None
     )
 
 
+@router.post("/precos/vigentes")
+async def get_precos_vigentes(
+    request: PrecosVigentesRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Preço vigente de várias matérias-primas, cada uma numa data, em uma consulta"""
+    pares = [(consulta.materia_prima_id, consulta.data) for consulta in request.consultas]
+    precos = precos_vigentes.precos_materias_primas_em(db, pares)
+    return [
+        {
+            "materia_prima_id": materia_prima_id,
+            "data": data.isoformat(),
+            "preco_id": preco.id if preco else None,
+            "valor_unitario": preco.valor if preco else None,
+            "vigente_desde": preco.vigente_desde.isoformat() if preco else None,
+            "vigente_ate": preco.vigente_ate.isoformat() if preco and preco.vigente_ate else None,
+        }
+        for (materia_prima_id, data), preco in zip(pares, precos)
+    ]
+
+
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_materia_prima(
     materia_prima_data: MateriaPrimaCreate,
@@ -534,6 +587,61 @@ async def create_materia_prima_preco(
     )
 
 
+@router.get("/historico-precos/series")
+async def get_series_precos(
+    request: Request,
+    granularidade: str = Query("semana", pattern="^(dia|semana|mes)$", description="dia, semana ou mes"),
+    materia_prima_id: Optional[List[int]] = Query(None, description="Matérias-primas (padrão: todas; até 50 séries por resposta)"),
+    periodo_ini: Optional[date] = Query(None, description="Data inicial"),
+    periodo_fim: Optional[date] = Query(None, description="Data final"),
+    pontos: int = Query(200, ge=3, le=2000, description="Máximo de pontos por série"),
+    db: Session = Depends(get_db)
+):
+    """Séries de preço agrupadas por período (último/mínimo/máximo/média), para gráficos"""
+    return resposta_cacheada(
+        request, ["materias_primas", "materia_prima_precos"],
+        lambda: series_precos.series(db, granularidade, materia_prima_id, periodo_ini, periodo_fim, pontos),
+    )
+
+
+@router.get("/historico-precos/analise-variacoes")
+async def get_analise_variacoes(
+    periodo_dias: int = Query(30, ge=1, description="Janela analisada pela tarefa analisar_variacoes_precos"),
+    apenas_anomalias: bool = Query(False, description="Só matérias-primas com variação anômala"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Última análise de variações de preço gravada para a janela, mais voláteis primeiro"""
+    query = db.query(AnaliseVariacaoPreco, MateriaPrima.nome).join(
+        MateriaPrima, MateriaPrima.id == AnaliseVariacaoPreco.materia_prima_id
+    ).filter(AnaliseVariacaoPreco.periodo_dias == periodo_dias)
+    if apenas_anomalias:
+        query = query.filter(AnaliseVariacaoPreco.anomalias > 0)
+    linhas = query.order_by(
+        AnaliseVariacaoPreco.anomalias.desc(), AnaliseVariacaoPreco.volatilidade_pct.desc()
+    ).limit(limit).all()
+
+    return {
+        "periodo_dias": periodo_dias,
+        "analisado_em": linhas[0][0].analisado_em.isoformat() if linhas else None,
+        "materias_primas": [
+            {
+                "materia_prima_id": analise.materia_prima_id,
+                "materia_prima_nome": nome,
+                "total_variacoes": analise.total_variacoes,
+                "maior_variacao_abs": analise.maior_variacao_abs,
+                "maior_variacao_pct": analise.maior_variacao_pct,
+                "variacao_media_pct": analise.variacao_media_pct,
+                "volatilidade_pct": analise.volatilidade_pct,
+                "maior_zscore": analise.maior_zscore,
+                "anomalias": analise.anomalias
+            }
+            for analise, nome in linhas
+        ]
+    }
+
+
 @router.get("/historico-precos/todos")
 async def get_historico_precos_todas_materias(
     db: Session = Depends(get_db)
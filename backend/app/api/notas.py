@@ -55,7 +55,7 @@ def normalizar_nome_materia_prima(nome: str) -> str:
         # Uppercase e trim
         return nome.upper().strip()
     except Exception as e:
-        logging.error(f"Erro ao normalizar nome '{nome}': {e}")
+        logging.error("Erro ao normalizar nome '%s': %s", nome, e)
         return nome.upper().strip()
 
 def get_current_user_optional(
@@ -71,6 +71,7 @@ def get_current_user_optional(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
 router = APIRouter(prefix="/notas", tags=["notas"])
+logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
@@ -238,7 +239,7 @@ async def create_nota(
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     try:
-        print(f"DEBUG: Criando nota - Numero: {nota_data.numero}, Itens: {len(nota_data.itens)}")
+        logger.debug("Criando nota - Numero: %s, Itens: %d", nota_data.numero, len(nota_data.itens))
         
         # Criar a nota
         nota = Nota(
@@ -254,15 +255,15 @@ async def create_nota(
         db.add(nota)
         db.flush()  # Para obter o ID
         
-        print(f"DEBUG: Nota criada com ID: {nota.id}")
+        logger.debug("Nota criada com ID: %s", nota.id)
         
         # Criar os itens da nota
         for i, item_data in enumerate(nota_data.itens):
-            print(f"DEBUG: Processando item {i+1}: {item_data.nome_no_documento}")
+            logger.debug("Processando item %d: %s", i + 1, item_data.nome_no_documento)
             
             # Buscar matéria-prima existente pelo nome (MATCHING MELHORADO)
             nome_nota = normalizar_nome_materia_prima(item_data.nome_no_documento)
-            print(f"DEBUG: Nome normalizado da nota: '{nome_nota}'")
+            logger.debug("Nome normalizado da nota: '%s'", nome_nota)
             
             # Buscar matéria-prima com matching inteligente
             materia_prima = None
@@ -280,7 +281,7 @@ async def create_nota(
                 # Match exato
                 if nome_mp == nome_nota:
                     materia_prima = mp
-                    print(f"DEBUG: ✅ Match EXATO encontrado: {mp.nome}")
+                    logger.debug("Match EXATO encontrado: %s", mp.nome)
                     break
                 
                 # Match parcial - calcular score de similaridade
@@ -301,17 +302,17 @@ async def create_nota(
             # Se não encontrou match exato, usar o melhor parcial
             if not materia_prima and melhor_match:
                 materia_prima = melhor_match
-                print(f"DEBUG: ⚠️  Match PARCIAL encontrado: {materia_prima.nome} (score: {melhor_score})")
+                logger.debug("Match PARCIAL encontrado: %s (score: %s)", materia_prima.nome, melhor_score)
             
             materia_prima_id = None
             if materia_prima:
                 materia_prima_id = materia_prima.id
-                print(f"DEBUG: ✅ Matéria-prima vinculada: ID={materia_prima_id}, Nome={materia_prima.nome}")
-            else:
-                print(f"DEBUG: ❌ Matéria-prima NÃO encontrada para: '{item_data.nome_no_documento}'")
-                print(f"DEBUG: Sugestões de nomes similares no banco:")
-                for mp in materias_candidatas[:5]:
-                    print(f"  - {mp.nome}")
+                logger.debug("Matéria-prima vinculada: ID=%s, Nome=%s", materia_prima_id, materia_prima.nome)
+            elif logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Matéria-prima NÃO encontrada para: '%s'. Primeiras do banco: %s",
+                    item_data.nome_no_documento, [mp.nome for mp in materias_candidatas[:5]],
+                )
             
             # Verificar se a unidade existe, se nÃ£o, criar automaticamente
             unidade = db.query(Unidade).filter(Unidade.codigo == item_data.unidade_codigo).first()
@@ -326,7 +327,7 @@ async def create_nota(
                 )
                 db.add(unidade)
                 db.flush()  # Para obter o ID
-                print(f"DEBUG: Unidade '{item_data.unidade_codigo}' criada automaticamente")
+                logger.debug("Unidade '%s' criada automaticamente", item_data.unidade_codigo)
             
             # Criar item da nota
             item = NotaItem(
@@ -339,7 +340,7 @@ async def create_nota(
                 valor_total=item_data.valor_total
             )
             db.add(item)
-            print(f"DEBUG: Item criado: {item_data.nome_no_documento}")
+            logger.debug("Item criado: %s", item_data.nome_no_documento)
             
             # Registrar preço no histórico (se matéria-prima foi identificada)
             if materia_prima_id:
@@ -357,7 +358,7 @@ async def create_nota(
                 if preco_anterior:
                     preco_anterior.vigente_ate = vigente_desde
                     db.add(preco_anterior)
-                    print(f"DEBUG: Preço anterior fechado em {vigente_desde}")
+                    logger.debug("Preço anterior fechado em %s", vigente_desde)
                 
                 # Criar novo preço
                 novo_preco = MateriaPrimaPreco(
@@ -370,12 +371,12 @@ async def create_nota(
                     nota_id=nota.id
                 )
                 db.add(novo_preco)
-                print(f"DEBUG: Novo preço registrado: R$ {item_data.valor_unitario}")
+                logger.debug("Novo preço registrado: R$ %s", item_data.valor_unitario)
         
         db.commit()
         db.refresh(nota)
         
-        print(f"DEBUG: Nota salva com sucesso!")
+        logger.debug("Nota %s salva com %d itens", nota.id, len(nota_data.itens))
         
         # Buscar fornecedor para resposta
         fornecedor = db.query(Fornecedor).filter(
@@ -427,17 +428,10 @@ async def create_nota(
         }
         
     except Exception as e:
-        print(f"ERROR: ========================================")
-        print(f"ERROR: FALHA AO CRIAR NOTA FISCAL")
-        print(f"ERROR: ========================================")
-        print(f"ERROR: Tipo de erro: {type(e).__name__}")
-        print(f"ERROR: Mensagem: {str(e)}")
-        print(f"ERROR: Dados da nota: Número={nota_data.numero}, Itens={len(nota_data.itens)}")
-        print(f"ERROR: ========================================")
-        import traceback
-        print(f"ERROR: Traceback completo:")
-        traceback.print_exc()
-        print(f"ERROR: ========================================")
+        logger.exception(
+            "Falha ao criar nota fiscal (Número=%s, Itens=%d): %s: %s",
+            nota_data.numero, len(nota_data.itens), type(e).__name__, e,
+        )
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime, timezone
+from typing import List, Optional
 from app.database import get_db
 from app.models import Produto, User
-from app.schemas import ProdutoCreate, ProdutoUpdate, ProdutoResponse
-from app.auth.dependencies import require_editor
+from app.schemas import ProdutoCreate, ProdutoUpdate, ProdutoResponse, SimulacaoPrecosRequest
+from app.auth.dependencies import get_current_active_user, require_editor
+from app.services import precos_vigentes, simulacao_precos
 
 produtos_router = APIRouter(prefix="/produtos", tags=["Produtos"])
 
@@ -70,6 +72,16 @@ async def listar_produtos(
     produtos = query.offset(skip).limit(limit).all()
     return produtos
 
+@produtos_router.post("/simulacao-precos")
+async def simular_precos(
+    simulacao: SimulacaoPrecosRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Simular o custo dos produtos em cenários de preço das matérias-primas (nada é gravado)"""
+    cenarios = [cenario.model_dump() for cenario in simulacao.cenarios]
+    return {"cenarios": simulacao_precos.simular(db, cenarios, max(simulacao.limite_produtos, 0))}
+
 @produtos_router.get("/{produto_id}", response_model=ProdutoResponse)
 async def buscar_produto(
     produto_id: int, 
@@ -84,6 +96,28 @@ async def buscar_produto(
         )
     return produto
 
+@produtos_router.get("/{produto_id}/custo")
+async def buscar_custo_produto(
+    produto_id: int,
+    as_of: Optional[datetime] = Query(None, description="Custo vigente nesta data (padrão: agora)"),
+    db: Session = Depends(get_db)
+):
+    """Custo do produto vigente numa data"""
+    instante = as_of or datetime.now(timezone.utc)
+    preco = precos_vigentes.custo_produto_em(db, produto_id, instante)
+    if not preco:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Nenhum custo vigente para o produto nesta data"
+        )
+    return {
+        "produto_id": produto_id,
+        "as_of": instante.isoformat(),
+        "custo_total": preco.valor,
+        "vigente_desde": preco.vigente_desde.isoformat(),
+        "vigente_ate": preco.vigente_ate.isoformat() if preco.vigente_ate else None,
+    }
+
 @produtos_router.put("/{produto_id}", response_model=ProdutoResponse)
 async def atualizar_produto(
     produto_id: int,
@@ -1,6 +1,7 @@
-﻿from fastapi import APIRouter, Depends, HTTPException, status
+﻿from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import and_, func
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List, NamedTuple, Optional
 from decimal import Decimal
 import logging
 
@@ -8,6 +9,8 @@ from app.database import get_db
 from app.models.produto_final import ProdutoFinal
 from app.models.materia_prima import MateriaPrima, MateriaPrimaPreco
 from app.schemas.produto_final import ProdutoFinalCreate, ProdutoFinalResponse
+from app.services import conversao_unidades
+from app.utils.http_cache import resposta_cacheada
 
 logger = logging.getLogger(__name__)
 
@@ -49,7 +52,7 @@ async def criar_produto_final(
         }
         
     except Exception as e:
-        logger.error(f"Erro ao criar produto final: {str(e)}")
+        logger.error("Erro ao criar produto final: %s", e)
         return {
             "success": False,
             "message": f"Erro ao criar produto final: {str(e)}"
@@ -57,89 +60,107 @@ async def criar_produto_final(
 
 @produtos_finais_router.get("/materias-primas-disponiveis")
 async def listar_materias_primas_disponiveis(
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Lista matérias-primas disponíveis para uso em produtos"""
     try:
-        print("DEBUG: Iniciando busca de matérias-primas disponíveis")
-        
-        # Verificar se a tabela existe primeiro
-        try:
-            materias_primas = db.query(MateriaPrima).filter(MateriaPrima.is_active == True).all()
-            print(f"DEBUG: Encontradas {len(materias_primas)} matérias-primas ativas")
-        except Exception as e:
-            print(f"DEBUG: Erro ao buscar matérias-primas: {e}")
-            # Retornar lista vazia se tabela não existir
-            return []
-        
-        materias_formatadas = []
-        
-        for mp in materias_primas:
-            try:
-                print(f"DEBUG: Processando matéria-prima: {mp.nome}")
-                
-                # Buscar preço atual usando ORM (sem SQL raw)
-                preco_atual = 0.0
-                try:
-                    preco_obj = db.query(MateriaPrimaPreco).filter(
-                        MateriaPrimaPreco.materia_prima_id == mp.id,
-                        MateriaPrimaPreco.vigente_ate.is_(None)  # Preço atual
-                    ).order_by(MateriaPrimaPreco.vigente_desde.desc()).first()
-                    
-                    if preco_obj:
-                        preco_atual = float(preco_obj.valor_unitario)
-                        print(f"DEBUG: Preço encontrado: R$ {preco_atual}")
-                    else:
-                        print(f"DEBUG: Nenhum preço encontrado para {mp.nome}")
-                except Exception as e:
-                    print(f"DEBUG: Erro ao buscar preço: {e}")
-                    preco_atual = 0.0
-                
-                # Extrair quantidade do nome se existir
-                quantidade_original = 1
-                nome_limpo = mp.nome
-                unidade_original = mp.unidade_codigo or "un"
-                
-                # Procurar por padrões como "18L", "5KG", "10PC", etc.
-                import re
-                match = re.search(r'(\d+(?:\.\d+)?)\s*(L|KG|PC|UN|MT|M)$', mp.nome.upper())
-                if match:
-                    quantidade_original = float(match.group(1))
-                    unidade_original = match.group(2)
-                    # Remover quantidade do nome
-                    nome_limpo = re.sub(r'\s*\d+(?:\.\d+)?\s*(L|KG|PC|UN|MT|M)$', '', mp.nome).strip()
-                
-                # Converter preço para unidade base
-                if quantidade_original and quantidade_original > 0:
-                    preco_por_unidade = preco_atual / quantidade_original
-                else:
-                    preco_por_unidade = preco_atual
-                
-                materias_formatadas.append({
-                    "id": mp.id,
-                    "nome": nome_limpo,
-                    "unidade": unidade_original,
-                    "valorUnitario": preco_por_unidade
-                })
-                
-            except Exception as e:
-                print(f"DEBUG: Erro ao processar matéria-prima {mp.nome}: {e}")
-                continue
-        
-        # Ordenar por nome
-        materias_formatadas.sort(key=lambda x: x['nome'])
-        print(f"DEBUG: Retornando {len(materias_formatadas)} matérias-primas formatadas")
-        
-        return materias_formatadas
-        
+        return resposta_cacheada(
+            request, ["materias_primas", "materia_prima_precos"], lambda: _materias_primas_disponiveis(db)
+        )
     except Exception as e:
-        print(f"ERROR: Erro ao listar matérias-primas: {str(e)}")
-        logger.error(f"Erro ao listar matérias-primas: {str(e)}")
-        # Retornar lista vazia em caso de erro
+        logger.error("Erro ao listar matérias-primas: %s", e)
+        # Retornar lista vazia em caso de erro (fora do cache)
         return []
 
+
+class _PrecoAtual(NamedTuple):
+    id: int
+    nome: str  # nome de exibição (sem a embalagem) ou o nome cadastrado
+    nome_cadastro: str
+    unidade: str  # unidade da embalagem, senão a da matéria-prima
+    valor_unitario: Optional[float]  # por unidade da embalagem
+
+
+def _precos_atuais(db: Session) -> List[_PrecoAtual]:
+    """Matérias-primas ativas com o preço vigente por unidade da embalagem, em ordem de id"""
+    # Preço atual dividido pela embalagem gravada no cadastro ("OLEO 18L" -> preço por L)
+    quantidade_embalagem = func.coalesce(func.nullif(MateriaPrima.embalagem_quantidade, 0), 1)
+    linhas = db.query(
+        MateriaPrima.id,
+        func.coalesce(MateriaPrima.nome_exibicao, MateriaPrima.nome),
+        MateriaPrima.nome,
+        func.coalesce(MateriaPrima.embalagem_unidade, MateriaPrima.unidade_codigo, "un"),
+        MateriaPrimaPreco.valor_unitario / quantidade_embalagem,
+    ).outerjoin(
+        MateriaPrimaPreco,
+        and_(
+            MateriaPrimaPreco.materia_prima_id == MateriaPrima.id,
+            MateriaPrimaPreco.vigente_ate.is_(None)
+        )
+    ).filter(
+        MateriaPrima.is_active == True
+    ).order_by(MateriaPrima.id, MateriaPrimaPreco.vigente_desde.desc()).all()
+
+    precos = []
+    vistos = set()
+    for mp_id, nome, nome_cadastro, unidade, valor_unitario in linhas:
+        if mp_id in vistos:
+            continue  # mais de um preço aberto: fica o mais recente
+        vistos.add(mp_id)
+        precos.append(_PrecoAtual(mp_id, nome, nome_cadastro, unidade,
+                                  float(valor_unitario) if valor_unitario is not None else None))
+    return precos
+
+
+def _materias_primas_disponiveis(db: Session) -> list:
+    materias_formatadas = [
+        {
+            "id": preco.id,
+            "nome": preco.nome,
+            "unidade": preco.unidade,
+            "valorUnitario": preco.valor_unitario if preco.valor_unitario is not None else 0.0
+        }
+        for preco in _precos_atuais(db)
+    ]
+
+    # Ordenar por nome
+    materias_formatadas.sort(key=lambda x: x['nome'])
+    logger.debug("Retornando %d matérias-primas disponíveis", len(materias_formatadas))
+
+    return materias_formatadas
+
+
+class _ResolvedorComponentes:
+    """Acha a matéria-prima do componente pelo nome gravado, sem consulta por componente"""
+
+    def __init__(self, precos: List[_PrecoAtual]):
+        self.precos = precos
+        self.por_nome: Dict[str, _PrecoAtual] = {}
+        for preco in precos:
+            # O front grava o nome de exibição; componentes antigos, o nome cadastrado
+            self.por_nome.setdefault(preco.nome.strip().lower(), preco)
+            self.por_nome.setdefault(preco.nome_cadastro.strip().lower(), preco)
+        self._parciais: Dict[str, Optional[_PrecoAtual]] = {}
+
+    def resolver(self, nome: str) -> Optional[_PrecoAtual]:
+        chave = (nome or "").strip().lower()
+        if not chave:
+            return None
+        preco = self.por_nome.get(chave)
+        if preco is not None:
+            return preco
+        # Como o ilike('%nome%') de antes: primeiro cadastro que contém o nome
+        if chave not in self._parciais:
+            self._parciais[chave] = next(
+                (p for p in self.precos if chave in p.nome_cadastro.lower()), None
+            )
+        return self._parciais[chave]
+
+
 @produtos_finais_router.get("/")
 async def listar_produtos_finais(
+    request: Request,
     skip: int = 0, 
     limit: int = 100, 
     ativo: bool = True,
@@ -153,89 +174,86 @@ async def listar_produtos_finais(
         ativo: Filtrar apenas produtos ativos
     """
     try:
-        print(f"DEBUG: Listando produtos finais com preços atualizados automaticamente")
-        
-        # Verificar se a tabela existe primeiro
+        # Custos dependem dos preços vigentes: qualquer preço novo invalida a resposta
+        return resposta_cacheada(
+            request, ["produtos_finais", "materias_primas", "materia_prima_precos", "unidades"],
+            lambda: _listar_produtos_finais(db, skip, limit, ativo),
+        )
+    except Exception as e:
+        logger.error("Erro ao listar produtos finais: %s", e)
+        # Retornar lista vazia em caso de erro (fora do cache)
+        return []
+
+
+def _listar_produtos_finais(db: Session, skip: int, limit: int, ativo: bool) -> list:
+    query = db.query(ProdutoFinal)
+    if ativo is not None:
+        query = query.filter(ProdutoFinal.ativo == ativo)
+
+    produtos = query.offset(skip).limit(limit).all()
+    logger.debug("Encontrados %d produtos finais", len(produtos))
+    
+    conversao = conversao_unidades.tabela(db)
+    componentes_mp = _ResolvedorComponentes(_precos_atuais(db))
+
+    # Converter para formato simples
+    produtos_formatados = []
+    for produto in produtos:
         try:
-            query = db.query(ProdutoFinal)
-            if ativo is not None:
-                query = query.filter(ProdutoFinal.ativo == ativo)
+            # Processar componentes
+            componentes_atualizados = []
+            custo_total = 0.0
             
-            produtos = query.offset(skip).limit(limit).all()
-            print(f"DEBUG: Encontrados {len(produtos)} produtos finais")
+            if produto.componentes:
+                for componente in produto.componentes:
+                    try:
+                        quantidade = float(componente.get('quantidade', 0))
+                        valor_unitario_salvo = float(componente.get('valorUnitario', 0))
+                        
+                        # SEMPRE usar o preço vigente (atualização automática)
+                        nome_mp = componente.get('materiaPrimaNome', '')
+                        preco = componentes_mp.resolver(nome_mp)
+                        
+                        valor_unitario_atual = valor_unitario_salvo  # Padrão: valor salvo
+                        
+                        if preco is not None and preco.valor_unitario is not None:
+                            # Preço é por unidade da embalagem; o componente pode estar em outra unidade
+                            fator = conversao.fator(componente.get('unidadeMedida'), preco.unidade)
+                            if fator is None:
+                                logger.debug("Unidade '%s' de %s não converte para '%s'; sem conversão",
+                                             componente.get('unidadeMedida'), nome_mp, preco.unidade)
+                                fator = 1.0
+                            valor_unitario_atual = preco.valor_unitario * fator
+                            if valor_unitario_atual != valor_unitario_salvo:
+                                logger.debug("Preço atualizado automaticamente: %s: %s → %s", nome_mp, valor_unitario_salvo, valor_unitario_atual)
+                        
+                        # Adicionar componente com preço atualizado
+                        comp_atualizado = componente.copy()
+                        comp_atualizado['valorUnitario'] = valor_unitario_atual
+                        componentes_atualizados.append(comp_atualizado)
+                        
+                        custo_total += quantidade * valor_unitario_atual
+                    except (ValueError, TypeError) as e:
+                        logger.warning("Erro ao processar componente %s: %s", componente, e)
+                        componentes_atualizados.append(componente)
+                        continue
+            
+            produtos_formatados.append({
+                "id": produto.id,
+                "nome": produto.nome,
+                "idUnico": produto.id_unico,
+                "componentes": componentes_atualizados,  # SEMPRE com preços atualizados
+                "custo_total": round(custo_total, 2),
+                "ativo": produto.ativo,
+                "created_at": produto.created_at.isoformat() if produto.created_at else None,
+                "updated_at": produto.updated_at.isoformat() if produto.updated_at else None
+            })
         except Exception as e:
-            print(f"DEBUG: Erro ao buscar produtos finais: {e}")
-            return []
-        
-        # Converter para formato simples
-        produtos_formatados = []
-        for produto in produtos:
-            try:
-                # Processar componentes
-                componentes_atualizados = []
-                custo_total = 0.0
-                
-                if produto.componentes:
-                    for componente in produto.componentes:
-                        try:
-                            quantidade = float(componente.get('quantidade', 0))
-                            valor_unitario_salvo = float(componente.get('valorUnitario', 0))
-                            
-                            # SEMPRE buscar preço mais recente do histórico (atualização automática)
-                            nome_mp = componente.get('materiaPrimaNome', '')
-                            
-                            # Buscar matéria-prima pelo nome
-                            mp = db.query(MateriaPrima).filter(
-                                MateriaPrima.nome.ilike(f"%{nome_mp}%"),
-                                MateriaPrima.is_active == True
-                            ).first()
-                            
-                            valor_unitario_atual = valor_unitario_salvo  # Padrão: valor salvo
-                            
-                            if mp:
-                                # Buscar preço mais recente do histórico
-                                preco_obj = db.query(MateriaPrimaPreco).filter(
-                                    MateriaPrimaPreco.materia_prima_id == mp.id,
-                                    MateriaPrimaPreco.vigente_ate.is_(None)
-                                ).order_by(MateriaPrimaPreco.vigente_desde.desc()).first()
-                                
-                                if preco_obj:
-                                    valor_unitario_atual = float(preco_obj.valor_unitario)
-                                    if valor_unitario_atual != valor_unitario_salvo:
-                                        print(f"DEBUG: Preço atualizado automaticamente: {nome_mp}: {valor_unitario_salvo} → {valor_unitario_atual}")
-                            
-                            # Adicionar componente com preço atualizado
-                            comp_atualizado = componente.copy()
-                            comp_atualizado['valorUnitario'] = valor_unitario_atual
-                            componentes_atualizados.append(comp_atualizado)
-                            
-                            custo_total += quantidade * valor_unitario_atual
-                        except (ValueError, TypeError) as e:
-                            print(f"DEBUG: Erro ao processar componente {componente}: {e}")
-                            componentes_atualizados.append(componente)
-                            continue
-                
-                produtos_formatados.append({
-                    "id": produto.id,
-                    "nome": produto.nome,
-                    "idUnico": produto.id_unico,
-                    "componentes": componentes_atualizados,  # SEMPRE com preços atualizados
-                    "custo_total": round(custo_total, 2),
-                    "ativo": produto.ativo,
-                    "created_at": produto.created_at.isoformat() if produto.created_at else None,
-                    "updated_at": produto.updated_at.isoformat() if produto.updated_at else None
-                })
-            except Exception as e:
-                print(f"DEBUG: Erro ao formatar produto {produto.id}: {e}")
-                continue
-        
-        return produtos_formatados
-        
-    except Exception as e:
-        print(f"ERROR: Erro ao listar produtos finais: {str(e)}")
-        logger.error(f"Erro ao listar produtos finais: {str(e)}")
-        # Retornar lista vazia em caso de erro
-        return []
+            logger.warning("Erro ao formatar produto %s: %s", produto.id, e)
+            continue
+    
+    return produtos_formatados
+
 
 @produtos_finais_router.get("/{produto_id}")
 async def obter_produto_final(
@@ -261,7 +279,7 @@ async def obter_produto_final(
                     valor_unitario = float(componente.get('valorUnitario', 0))
                     custo_total += quantidade * valor_unitario
                 except (ValueError, TypeError) as e:
-                    print(f"DEBUG: Erro ao calcular custo do componente {componente}: {e}")
+                    logger.warning("Erro ao calcular custo do componente %s: %s", componente, e)
                     continue
         
         return {
@@ -278,7 +296,7 @@ async def obter_produto_final(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Erro ao obter produto final: {str(e)}")
+        logger.error("Erro ao obter produto final: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao obter produto final: {str(e)}"
@@ -331,7 +349,7 @@ async def atualizar_produto_final(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Erro ao atualizar produto final: {str(e)}")
+        logger.error("Erro ao atualizar produto final: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao atualizar produto final: {str(e)}"
@@ -364,7 +382,7 @@ async def deletar_produto_final(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Erro ao deletar produto final: {str(e)}")
+        logger.error("Erro ao deletar produto final: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao deletar produto final: {str(e)}"
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
@@ -6,17 +6,20 @@ from app.database import get_db
 from app.schemas.unidade import UnidadeResponse
 from app.models.unidade import Unidade
 from app.models.user import User
+from app.utils.http_cache import resposta_cacheada
 
 router = APIRouter(prefix="/unidades", tags=["unidades"])
 
 
 @router.get("/", response_model=List[UnidadeResponse])
 async def list_unidades(
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Lista todas as unidades disponíveis"""
-    unidades = db.query(Unidade).all()
-    return unidades
+    return resposta_cacheada(
+        request, ["unidades"], lambda: db.query(Unidade).all(), List[UnidadeResponse]
+    )
 
 
 @router.get("/{unidade_codigo}", response_model=UnidadeResponse)
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.database import get_db
 import xml.etree.ElementTree as ET
@@ -8,8 +9,16 @@ import re
 from typing import List, Dict
 from unidecode import unidecode
 import io
+import logging
+import time
 import pdfplumber
 
+from app.config import settings
+from app.services import danfe_itens, danfe_texto
+from app.utils.metrics import registrar_parse
+
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/uploads", tags=["uploads"])
 
 def processar_xml_nfe(content: bytes) -> dict:
@@ -122,7 +131,7 @@ def processar_xml_nfe(content: bytes) -> dict:
                     })
                     
             except Exception as e:
-                print(f"Erro ao processar item: {e}")
+                logger.warning("Erro ao processar item: %s", e)
                 continue
             
         return dados
@@ -131,83 +140,18 @@ def processar_xml_nfe(content: bytes) -> dict:
         raise HTTPException(status_code=400, detail=f"Erro ao processar XML: {str(e)}")
 
 def extrair_dados_nfe_regex(texto: str) -> dict:
-    """Extrai dados da NFe usando regex melhoradas"""
+    """Extrai dados do cabeçalho da NFe (número, emitente, CNPJ, valor total)"""
+    campos = danfe_texto.extrair_campos(texto)
     dados = {}
-    
-    # Número da nota - mais flexível
-    numero_patterns = [
-        r'N[ºo°\.:\s]*(\d{6,})',  # N° 123456
-        r'NÚMERO[:\s]*(\d{6,})',   # NÚMERO: 123456
-        r'(\d{6,})',               # Qualquer sequência de 6+ dígitos
-    ]
-    for pattern in numero_patterns:
-        numero_match = re.search(pattern, texto, re.IGNORECASE)
-        if numero_match:
-            dados['numero_nota'] = numero_match.group(1)
-            break
-    
-    # CNPJ - mais flexível
-    cnpj_patterns = [
-        r'(\d{2}\.?\d{3}\.?\d{3}\/?\d{4}-?\d{2})',  # Com ou sem pontuação
-        r'CNPJ[:\s]*(\d{2}\.?\d{3}\.?\d{3}\/?\d{4}-?\d{2})',
-    ]
-    for pattern in cnpj_patterns:
-        cnpj_match = re.search(pattern, texto)
-        if cnpj_match:
-            dados['cnpj_fornecedor'] = cnpj_match.group(1)
-            break
-    
-    # Fornecedor - buscar por qualquer nome em maiúsculas (melhorado)
-    fornecedor_patterns = [
-        r'EMITENTE[:\s]*([^\n\r]+)',  # EMITENTE: Nome
-        r'RAZÃO\s+SOCIAL[:\s]*([^\n\r]+)',  # RAZÃO SOCIAL: Nome
-        r'NOME[:\s]*([^\n\r]+)',  # NOME: Nome
-        r'FORNECEDOR[:\s]*([^\n\r]+)',  # FORNECEDOR: Nome
-        r'([A-Z][A-Z\s\.&\-]{15,})',  # Nome em maiúsculas com mais caracteres
-        r'([A-Z][A-Z\s\.&\-]{10,})',  # Nome em maiúsculas (fallback)
-    ]
-    for pattern in fornecedor_patterns:
-        fornecedor_match = re.search(pattern, texto, re.IGNORECASE)
-        if fornecedor_match:
-            nome = fornecedor_match.group(1).strip()
-            # Filtrar nomes que não são fornecedores
-            if (len(nome) > 10 and 
-                not nome.startswith('NF-') and 
-                not nome.startswith('NOTA') and
-                not nome.startswith('IDENTIFICA') and
-                'CNPJ' not in nome and
-                'CPF' not in nome and
-                'INSCRIÇÃO' not in nome):
-                dados['fornecedor'] = nome
-                break
-    
-    # CNPJ do fornecedor
-    cnpj_patterns = [
-        r'CNPJ[:\s]*(\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2})',
-        r'(\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2})',
-    ]
-    for pattern in cnpj_patterns:
-        cnpj_match = re.search(pattern, texto)
-        if cnpj_match:
-            dados['cnpj_fornecedor'] = cnpj_match.group(1)
-            break
-    
-    # Valor total - mais flexível
-    valor_patterns = [
-        r'VALOR\s+TOTAL[:\s]*R?\$?\s*([\d.,]+)',
-        r'TOTAL[:\s]*R?\$?\s*([\d.,]+)',
-        r'R\$\s*([\d.,]+)',
-    ]
-    for pattern in valor_patterns:
-        valor_match = re.search(pattern, texto, re.IGNORECASE)
-        if valor_match:
-            valor_str = valor_match.group(1).replace('.', '').replace(',', '.')
-            try:
-                dados['valor_total'] = float(valor_str)
-                break
-            except:
-                continue
-            
+    if "numero_nota" in campos:
+        dados['numero_nota'] = campos["numero_nota"]
+    if "cnpj_emitente" in campos:
+        dados['cnpj_fornecedor'] = campos["cnpj_emitente"]
+    if "emitente" in campos:
+        dados['fornecedor'] = campos["emitente"]
+    valor_total = danfe_texto.valor_brl(campos.get("valor_total", ""))
+    if valor_total is not None:
+        dados['valor_total'] = valor_total
     return dados
 
 def extrair_itens_produtos(texto: str) -> List[Dict]:
@@ -286,13 +230,35 @@ def processar_pdf_nfe(content: bytes) -> dict:
             for page in pdf.pages:
                 t = page.extract_text() or ""
                 pages_text.append(t)
+            # Itens pelo layout do quadro de produtos; o regex sobre o texto fica de reserva
+            try:
+                layout = danfe_itens.extrair_itens(pdf)
+            except Exception as exc:
+                logger.warning("Extração de itens pelo layout falhou: %s", exc)
+                layout = danfe_itens.ResultadoItens([], 0.0, None)
         
         # Combinar texto de todas as páginas
         texto_completo = "\n".join(pages_text)
         
         dados = extrair_dados_nfe_regex(texto_completo)
-        itens = extrair_itens_produtos(texto_completo)
+        # Layout com confiança baixa só entra se o regex não achar nenhum item
+        itens = [] if layout.confianca >= settings.DANFE_CONFIANCA_MINIMA else extrair_itens_produtos(texto_completo)
+        if not itens and layout.itens:
+            itens = [
+                {
+                    "codigo": item["codigo"],
+                    "descricao": item["descricao"],
+                    "ncm": item["ncm"],
+                    "cfop": item["cfop"],
+                    "un": item["unidade"].lower(),
+                    "quantidade": item["quantidade"],
+                    "valor_unitario": item["valor_unitario"],
+                    "valor_total": item["valor_total"],
+                }
+                for item in layout.itens
+            ]
         dados['itens'] = itens
+        dados['confianca_itens'] = layout.confianca
         
         # Valores padrão
         if 'numero_nota' not in dados:
@@ -319,7 +285,9 @@ async def processar_arquivo_universal(file: UploadFile = File(...)):
     
     if file.filename.lower().endswith(".xml"):
         try:
+            inicio = time.perf_counter()
             dados_extraidos = processar_xml_nfe(content)
+            await run_in_threadpool(registrar_parse, "xml", 1, len(dados_extraidos.get("itens", [])), time.perf_counter() - inicio)
             return {
                 "success": True,
                 "arquivo": file.filename,
@@ -335,7 +303,9 @@ async def processar_arquivo_universal(file: UploadFile = File(...)):
     
     elif file.filename.lower().endswith(".pdf"):
         try:
+            inicio = time.perf_counter()
             dados_extraidos = processar_pdf_nfe(content)
+            await run_in_threadpool(registrar_parse, "pdf", 1, len(dados_extraidos.get("itens", [])), time.perf_counter() - inicio)
             return {
                 "success": True,
                 "arquivo": file.filename,
@@ -2,23 +2,29 @@
 from __future__ import annotations
 
 import json
+import logging
 import os
 import re
 import subprocess
 import tempfile
+import time
 import uuid
 from pathlib import Path
 from typing import Dict, Optional
 
 from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from unidecode import unidecode
 
 from app.config import settings
+from app.services import danfe_itens, danfe_texto
 from app.services.docai_client import process_invoice_pdf
 from app.services.nfe_parser import parse_invoice_document
+from app.utils.metrics import registrar_parse
 
 router = APIRouter(prefix="/uploads-ia", tags=["uploads-ia"])
+logger = logging.getLogger(__name__)
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 UPLOADS_DIR = BASE_DIR / settings.UPLOAD_DIR
@@ -36,7 +42,7 @@ def _generate_session_id(filename: str) -> str:
 def _persist_pdf(session_id: str, pdf_bytes: bytes) -> Path:
     file_path = UPLOADS_DIR / f"{session_id}.pdf"
     file_path.write_bytes(pdf_bytes)
-    print(f"DEBUG: PDF salvo em disco: {file_path}")
+    logger.debug("PDF salvo em disco: %s", file_path)
     return file_path
 
 
@@ -75,36 +81,23 @@ def estruturar_dados_com_regex(texto: str) -> dict:
         "itens": [],
     }
 
-    cnpj_match = re.search(r"(\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2})", texto)
-    if cnpj_match:
-        dados["cnpj_fornecedor"] = cnpj_match.group(1).replace(".", "").replace("/", "").replace("-", "")
-
-    valor_match = re.search(r"valor total\s*[:\-]?\s*([\d.,]+)", texto, re.IGNORECASE)
-    if valor_match:
-        try:
-            dados["valor_total"] = float(valor_match.group(1).replace(".", "").replace(",", "."))
-        except ValueError:
-            pass
-
-    numero_match = re.search(r"nota\s*fiscal\s*(?:n[oº])?\s*[:\-]?\s*(\d+)", texto, re.IGNORECASE)
-    if numero_match:
-        dados["numero_nota"] = numero_match.group(1)
-
-    data_match = re.search(r"(\d{2}/\d{2}/\d{4})", texto)
-    if data_match:
-        dados["data_emissao"] = data_match.group(1)
-
-    fornecedor_match = re.search(r"fornecedor\s*[:\-]?\s*([A-Z0-9\s\.\-&]+)", texto, re.IGNORECASE)
-    if fornecedor_match:
-        dados["fornecedor"] = fornecedor_match.group(1).strip()
+    campos = danfe_texto.extrair_campos(texto)
+    dados["numero_nota"] = campos.get("numero_nota", "")
+    dados["serie"] = campos.get("serie", "")
+    dados["chave_acesso"] = campos.get("chave_acesso", "")
+    dados["fornecedor"] = campos.get("emitente", "")
+    dados["cnpj_fornecedor"] = re.sub(r"\D", "", campos.get("cnpj_emitente", ""))
+    dados["data_emissao"] = campos.get("data_emissao", "")
+    valor_total = danfe_texto.valor_brl(campos.get("valor_total", ""))
+    if valor_total is not None:
+        dados["valor_total"] = valor_total
 
     return dados
 
 
 async def processar_pdf_com_ia(content: bytes, filename: str) -> dict:
     """Processa PDF usando Document AI (Invoice Parser) com fallback em regex."""
-    print("\n=== INÍCIO DO PROCESSAMENTO IA ===")
-    print(f"Recebido arquivo: {filename}")
+    logger.debug("Processamento IA iniciado: %s", filename)
 
     session_id = _generate_session_id(filename)
     pdf_bytes_cache[session_id] = content
@@ -131,7 +124,7 @@ async def processar_pdf_com_ia(content: bytes, filename: str) -> dict:
         current_dir = Path(__file__).resolve().parent
         mcp_path = BASE_DIR / "mcp-server-pdf" / "index.js"
         if mcp_path.exists():
-            print(f"DEBUG: Executando MCP: node {mcp_path} {tmp_path}")
+            logger.debug("Executando MCP: node %s %s", mcp_path, tmp_path)
             result = subprocess.run(
                 ["node", str(mcp_path), tmp_path],
                 capture_output=True,
@@ -142,8 +135,7 @@ async def processar_pdf_com_ia(content: bytes, filename: str) -> dict:
 
             stdout_text = result.stdout.decode("utf-8", errors="replace") if result.stdout else ""
             stderr_text = result.stderr.decode("utf-8", errors="replace") if result.stderr else ""
-            print(f"Código de retorno MCP: {result.returncode}")
-            print(f"MCP stdout (primeiros 200 chars): {stdout_text[:200]}...")
+            logger.debug("MCP retornou %s; stdout: %.200s", result.returncode, stdout_text)
             if result.returncode == 0 and stdout_text:
                 try:
                     mcp_data = json.loads(stdout_text)
@@ -152,23 +144,37 @@ async def processar_pdf_com_ia(content: bytes, filename: str) -> dict:
                     texto_extraido = re.sub(r"[^\x00-\x7F]+", "", texto_extraido)
                     texto_extraido = re.sub(r"\s+", " ", texto_extraido).strip()
                     dados_estruturados = estruturar_dados_com_regex(texto_extraido)
-                    print(f"DEBUG: Dados estruturados por regex: {dados_estruturados}")
+                    logger.debug("Dados estruturados por regex: %s", dados_estruturados)
                 except json.JSONDecodeError as e:
-                    print(f"AVISO: Erro ao parsear JSON do MCP: {e}")
+                    logger.warning("Erro ao parsear JSON do MCP: %s", e)
             else:
-                print(f"AVISO: MCP retornou erro: {stderr_text}")
+                logger.warning("MCP retornou erro: %s", stderr_text)
         else:
-            print(f"AVISO: Script MCP não encontrado em {mcp_path}")
+            logger.warning("Script MCP não encontrado em %s", mcp_path)
     finally:
         if "tmp_path" in locals() and Path(tmp_path).exists():
             Path(tmp_path).unlink()
-            print(f"Arquivo temporário removido: {tmp_path}")
 
     pdf_text_cache[session_id] = texto_extraido
 
-    method = "regex_fallback"
+    # Itens pelo layout do PDF; com confiança alta e cabeçalho completo o Document AI é dispensado
+    try:
+        layout = danfe_itens.extrair_itens_pdf(content)
+    except Exception as exc:
+        logger.warning("Extração de itens pelo layout falhou: %s", exc)
+        layout = danfe_itens.ResultadoItens([], 0.0, None)
+    dados_estruturados["itens"] = layout.itens
+    dados_estruturados["confianca_itens"] = layout.confianca
+    local_suficiente = (
+        layout.confianca >= settings.DANFE_CONFIANCA_MINIMA
+        and dados_estruturados.get("numero_nota") not in ("", "000000")
+        and bool(dados_estruturados.get("cnpj_fornecedor"))
+    )
+    logger.debug("Itens pelo layout: %d (confiança %.2f)", len(layout.itens), layout.confianca)
+
+    method = "layout_local" if local_suficiente else "regex_fallback"
     docai_error: Optional[str] = None
-    if settings.USE_DOCUMENT_AI:
+    if settings.USE_DOCUMENT_AI and not local_suficiente:
         try:
             document = process_invoice_pdf(content)
             parsed = parse_invoice_document(document)
@@ -176,13 +182,12 @@ async def processar_pdf_com_ia(content: bytes, filename: str) -> dict:
             method = "document_ai"
         except Exception as exc:
             docai_error = str(exc)
-            print(f"AVISO: Document AI falhou: {docai_error}")
+            logger.warning("Document AI falhou: %s", docai_error)
 
-    message = (
-        "PDF processado com Document AI!"
-        if method == "document_ai"
-        else "PDF processado com regex! Dados limitados."
-    )
+    message = {
+        "document_ai": "PDF processado com Document AI!",
+        "layout_local": "PDF processado localmente pelo layout da DANFE!",
+    }.get(method, "PDF processado com regex! Dados limitados.")
 
     resultado_final = {
         "success": True,
@@ -195,7 +200,10 @@ async def processar_pdf_com_ia(content: bytes, filename: str) -> dict:
     if docai_error:
         resultado_final["docai_error"] = docai_error
 
-    print(f"DEBUG: Retorno final do backend: {resultado_final}")
+    logger.debug(
+        "Processamento IA concluído: método=%s, itens=%d, sessão=%s",
+        method, len(dados_estruturados.get("itens", [])), session_id,
+    )
     return resultado_final
 
 
@@ -204,7 +212,11 @@ async def processar_pdf_com_ia_endpoint(file: UploadFile = File(...)):
     if not file.filename or not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Apenas arquivos PDF são aceitos.")
     content = await file.read()
+    inicio = time.perf_counter()
     resultado = await processar_pdf_com_ia(content, file.filename)
+    itens = resultado.get("dados_extraidos", {}).get("itens", [])
+    # Redis síncrono: fora do event loop
+    await run_in_threadpool(registrar_parse, f"pdf_{resultado.get('method')}", 1, len(itens), time.perf_counter() - inicio)
     return resultado
 
 
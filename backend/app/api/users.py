@@ -3,7 +3,8 @@ from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
 from app.auth.dependencies import require_admin, get_current_active_user
-from app.auth.jwt import get_password_hash
+from app.auth.jwt import get_password_hash_async
+from app.auth.cache import invalidate_user
 from app.schemas.user import UserCreate, UserUpdate, UserResponse
 from app.models.user import User
 from app.utils.audit import log_audit, AuditAction
@@ -39,7 +40,7 @@ async def create_user(
         )
     
     # Cria hash da senha
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     
     # Cria usuário
     db_user = User(
@@ -103,6 +104,7 @@ async def update_user(
     
     db.commit()
     db.refresh(db_user)
+    invalidate_user(user_id)
     
     # Registra auditoria
     after_changes = {
@@ -146,6 +148,7 @@ async def delete_user(
     # Soft delete
     db_user.is_active = False
     db.commit()
+    invalidate_user(user_id)
     
     # Registra auditoria
     log_audit(
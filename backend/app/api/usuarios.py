@@ -5,6 +5,7 @@ from app.database import get_db
 from app.models import User
 from app.schemas import UserCreate, UserUpdate, UserResponse
 from app.auth.dependencies import require_admin
+from app.auth.cache import invalidate_user
 
 usuarios_router = APIRouter(prefix="/usuarios", tags=["Usuários"])
 
@@ -95,6 +96,7 @@ async def atualizar_usuario(
         
         db.commit()
         db.refresh(db_user)
+        invalidate_user(usuario_id)
         return db_user
     except Exception as e:
         db.rollback()
@@ -121,6 +123,7 @@ async def deletar_usuario(
         # Soft delete
         db_user.ativo = False
         db.commit()
+        invalidate_user(usuario_id)
     except Exception as e:
         db.rollback()
         raise HTTPException(
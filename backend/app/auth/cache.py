@@ -0,0 +1,72 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.config import settings
+from app.models.user import User
+
+# Cache em processo de usuários autenticados, chaveado por (user_id, iat do token).
+# Cada worker tem o seu; a invalidação explícita só vale para o processo local,
+# então o TTL curto limita por quanto tempo outros workers veem dados antigos.
+_USER_COLUMNS = ("id", "name", "email", "password_hash", "role", "is_active", "created_at", "updated_at")
+
+_cache: Dict[Tuple[int, Any], Tuple[float, Dict[str, Any]]] = {}
+_lock = threading.Lock()
+
+
+def _snapshot(user: User) -> Dict[str, Any]:
+    return {col: getattr(user, col) for col in _USER_COLUMNS}
+
+
+def _prune(now: float) -> None:
+    """Remove entradas expiradas e, se ainda estiver cheio, as mais antigas"""
+    for key in [k for k, (expires, _) in _cache.items() if expires <= now]:
+        del _cache[key]
+    excess = len(_cache) - settings.AUTH_USER_CACHE_MAX_SIZE
+    if excess > 0:
+        for key in sorted(_cache, key=lambda k: _cache[k][0])[:excess]:
+            del _cache[key]
+
+
+def get_cached_user(user_id: int, issued_at: Any) -> Optional[User]:
+    """Retorna uma cópia desanexada do usuário em cache, ou None"""
+    if settings.AUTH_USER_CACHE_TTL <= 0:
+        return None
+    with _lock:
+        entry = _cache.get((user_id, issued_at))
+        if entry is None:
+            return None
+        expires, values = entry
+        if expires <= time.monotonic():
+            del _cache[(user_id, issued_at)]
+            return None
+    # Instância nova a cada requisição para não compartilhar estado entre sessões
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+
+def cache_user(user: User, issued_at: Any) -> None:
+    """Armazena o usuário resolvido a partir do token"""
+    if settings.AUTH_USER_CACHE_TTL <= 0:
+        return
+    now = time.monotonic()
+    with _lock:
+        _cache[(user.id, issued_at)] = (now + settings.AUTH_USER_CACHE_TTL, _snapshot(user))
+        if len(_cache) > settings.AUTH_USER_CACHE_MAX_SIZE:
+            _prune(now)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Descarta todas as entradas de um usuário (atualização ou desativação)"""
+    with _lock:
+        for key in [k for k in _cache if k[0] == user_id]:
+            del _cache[key]
+
+
+def clear_user_cache() -> None:
+    """Esvazia o cache de usuários"""
+    with _lock:
+        _cache.clear()
@@ -3,11 +3,30 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.auth.jwt import verify_token
+from app.auth.cache import get_cached_user, cache_user
 from app.models.user import User, UserRole
 
 security = HTTPBearer()
 
 
+def _resolve_user(payload: dict, db: Session) -> User | None:
+    """Carrega o usuário do token, consultando o cache antes do banco"""
+    try:
+        user_id = int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None
+    issued_at = payload.get("iat")
+    
+    user = get_cached_user(user_id, issued_at)
+    if user is not None:
+        return user
+    
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is not None:
+        cache_user(user, issued_at)
+    return user
+
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -31,7 +50,7 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = _resolve_user(payload, db)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -101,7 +120,6 @@ def get_current_user_optional(
         if user_id is None:
             return None
         
-        user = db.query(User).filter(User.id == user_id).first()
-        return user
+        return _resolve_user(payload, db)
     except:
         return None 
\ No newline at end of file
@@ -0,0 +1 @@
+# Pacote de benchmarks (dados sintéticos, planos de consulta, carga)
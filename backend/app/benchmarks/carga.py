@@ -0,0 +1,202 @@
+"""
+Teste de carga da API.
+
+Dispara requisições concorrentes contra /materias-primas, /notas, /historicos e
+/produtos-finais e mostra latência p50/p95/p99, vazão e consultas SQL por
+requisição de cada cenário.
+
+Por padrão roda a aplicação no próprio processo (TestClient); com --url mede um
+servidor já em execução. As consultas por requisição vêm do header Server-Timing
+(PROFILER_ENABLED).
+
+Uso (a partir de backend/, depois de gerar dados com app.benchmarks.dados_sinteticos):
+    python -m app.benchmarks.carga --requisicoes 2000 --concorrencia 16
+    python -m app.benchmarks.carga --url http://localhost:8000 --token <jwt>
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.database import engine
+
+# (nome, peso, caminho) — o caminho recebe o gerador aleatório e os ids de referência
+CENARIOS = [
+    ("mp_lista", 10, lambda r, ids: f"/materias-primas/?page={r.randint(1, 50)}&page_size=25"),
+    ("mp_busca", 5, lambda r, ids: f"/materias-primas/?nome={r.choice(['FIO', 'VERNIZ', 'FITA', 'RESINA'])}"),
+    ("mp_publica", 1, lambda r, ids: "/materias-primas/public"),
+    ("mp_detalhe", 8, lambda r, ids: f"/materias-primas/{r.choice(ids['mp'])}"),
+    ("mp_historico", 6, lambda r, ids: f"/materias-primas/{r.choice(ids['mp'])}/historico-precos"),
+    ("notas_lista", 10, lambda r, ids: f"/notas/?page={r.randint(1, 20)}"),
+    ("notas_fornecedor", 5, lambda r, ids: f"/notas/?fornecedor_id={r.choice(ids['fornecedor'])}"),
+    ("nota_detalhe", 8, lambda r, ids: f"/notas/{r.choice(ids['nota'])}"),
+    ("historicos_mp", 5, lambda r, ids: f"/historicos/materias-primas?page={r.randint(1, 20)}"),
+    ("historicos_resumo", 2, lambda r, ids: "/historicos/resumo"),
+    ("pf_lista", 4, lambda r, ids: "/produtos-finais/"),
+    ("pf_disponiveis", 3, lambda r, ids: "/produtos-finais/materias-primas-disponiveis"),
+]
+
+# Métrica "db" do Server-Timing gerado por app.utils.profiler
+_SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) consultas"')
+
+
+def _ids_referencia(limite: int = 2000) -> Dict[str, list]:
+    consultas = {
+        "mp": "SELECT id FROM materias_primas ORDER BY id DESC LIMIT :n",
+        "nota": "SELECT id FROM notas ORDER BY id DESC LIMIT :n",
+        "fornecedor": "SELECT DISTINCT fornecedor_id FROM notas WHERE fornecedor_id IS NOT NULL LIMIT :n",
+    }
+    with engine.connect() as conn:
+        return {nome: conn.execute(text(sql), {"n": limite}).scalars().all() for nome, sql in consultas.items()}
+
+
+def _cliente_local():
+    """TestClient da aplicação, autenticado"""
+    from fastapi.testclient import TestClient
+
+    from app.auth.dependencies import get_current_active_user
+    from app.benchmarks.dados_sinteticos import USUARIO_CARGA
+    from app.database import SessionLocal
+    from app.main import app
+    from app.models.user import User
+
+    db = SessionLocal()
+    try:
+        usuario = db.query(User).filter(User.email == USUARIO_CARGA["email"]).first()
+        if usuario is not None:
+            db.expunge(usuario)
+            app.dependency_overrides[get_current_active_user] = lambda: usuario
+    finally:
+        db.close()
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[indice]
+
+
+def executar(cliente, requisicoes: int, concorrencia: int, semente: int = 42,
+             cabecalhos: Optional[dict] = None, metricas_db: Callable = None) -> Dict[str, dict]:
+    """Executa a carga e retorna as amostras por cenário"""
+    ids = _ids_referencia()
+    if not all(ids.values()):
+        raise RuntimeError("Banco sem dados: gere com python -m app.benchmarks.dados_sinteticos")
+
+    nomes = [c[0] for c in CENARIOS]
+    pesos = [c[1] for c in CENARIOS]
+    caminhos = {c[0]: c[2] for c in CENARIOS}
+    amostras = {nome: {"ms": [], "consultas": [], "db_ms": [], "status": {}} for nome in nomes}
+    trava = threading.Lock()
+    sorteio = random.Random(semente)
+    plano = [(sorteio.choices(nomes, pesos)[0], random.Random(semente + i)) for i in range(requisicoes)]
+
+    def disparar(item):
+        nome, rng = item
+        inicio = time.perf_counter()
+        resposta = cliente.get(caminhos[nome](rng, ids), headers=cabecalhos)
+        ms = (time.perf_counter() - inicio) * 1000
+        db = metricas_db(resposta) if metricas_db else None
+        with trava:
+            dados = amostras[nome]
+            dados["ms"].append(ms)
+            dados["status"][resposta.status_code] = dados["status"].get(resposta.status_code, 0) + 1
+            if db is not None:
+                dados["db_ms"].append(db[0])
+                dados["consultas"].append(db[1])
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        list(executor.map(disparar, plano))
+    duracao = time.perf_counter() - inicio
+
+    resultado = {}
+    for nome, dados in amostras.items():
+        if not dados["ms"]:
+            continue
+        resultado[nome] = {
+            "n": len(dados["ms"]),
+            "status": dados["status"],
+            "p50": _percentil(dados["ms"], 50),
+            "p95": _percentil(dados["ms"], 95),
+            "p99": _percentil(dados["ms"], 99),
+            "rps": len(dados["ms"]) / duracao,
+            "consultas_media": sum(dados["consultas"]) / len(dados["consultas"]) if dados["consultas"] else None,
+            "consultas_max": max(dados["consultas"]) if dados["consultas"] else None,
+            "db_ms_media": sum(dados["db_ms"]) / len(dados["db_ms"]) if dados["db_ms"] else None,
+        }
+    resultado["_total"] = {"n": requisicoes, "duracao_s": duracao, "rps": requisicoes / duracao}
+    return resultado
+
+
+def _metricas_server_timing(resposta) -> Optional[tuple]:
+    """(tempo de banco em ms, quantidade de consultas) do header Server-Timing"""
+    encontrado = _SERVER_TIMING_DB.search(resposta.headers.get("server-timing", ""))
+    return (float(encontrado.group(1)), int(encontrado.group(2))) if encontrado else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Teste de carga dos endpoints de leitura")
+    parser.add_argument("--url", help="servidor em execução (padrão: aplicação no próprio processo)")
+    parser.add_argument("--token", help="JWT para os endpoints autenticados (modo --url)")
+    parser.add_argument("--requisicoes", type=int, default=1000)
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--aquecimento", type=int, default=50, help="requisições descartadas antes da medição")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    args = parser.parse_args()
+
+    if args.url:
+        import httpx
+        cliente = httpx.Client(base_url=args.url.rstrip("/"), timeout=60.0,
+                               limits=httpx.Limits(max_connections=args.concorrencia))
+    else:
+        cliente = _cliente_local()
+    cabecalhos = {"Authorization": f"Bearer {args.token}"} if args.token else None
+
+    try:
+        if args.aquecimento:
+            print(f"🔥 Aquecimento: {args.aquecimento} requisições")
+            executar(cliente, args.aquecimento, args.concorrencia, args.semente + 1, cabecalhos)
+        print(f"🚀 {args.requisicoes} requisições, concorrência {args.concorrencia}")
+        resultado = executar(cliente, args.requisicoes, args.concorrencia, args.semente,
+                             cabecalhos, _metricas_server_timing)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        cliente.close()
+
+    print(f"\n{'cenário':<20}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>8}"
+          f"{'SQL/req':>9}{'SQL máx':>9}{'DB ms':>9}  status")
+    for nome, r in resultado.items():
+        if nome.startswith("_"):
+            continue
+        media = f"{r['consultas_media']:.1f}" if r["consultas_media"] is not None else "n/d"
+        maximo = str(r["consultas_max"]) if r["consultas_max"] is not None else "n/d"
+        db_ms = f"{r['db_ms_media']:.1f}" if r["db_ms_media"] is not None else "n/d"
+        status = ", ".join(f"{k}×{v}" for k, v in sorted(r["status"].items()))
+        print(f"{nome:<20}{r['n']:>6}{r['p50']:>10.1f}{r['p95']:>10.1f}{r['p99']:>10.1f}"
+              f"{r['rps']:>8.1f}{media:>9}{maximo:>9}{db_ms:>9}  {status}")
+    total = resultado["_total"]
+    print(f"\n✅ {total['n']} requisições em {total['duracao_s']:.1f}s ({total['rps']:.1f} req/s)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f"📄 Resultado gravado em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
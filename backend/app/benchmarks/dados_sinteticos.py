@@ -0,0 +1,415 @@
+"""
+Gerador de dados sintéticos em escala de produção.
+
+Cria fornecedores, matérias-primas com histórico de preços (passeio aleatório),
+notas com itens, produtos com componentes e custos, produtos finais e logs de
+auditoria. As colunas são lidas do banco (reflexão), então funciona com o schema
+das migrações no PostgreSQL e com o do SQLite. No PostgreSQL a carga usa COPY;
+nos demais bancos, INSERT em lotes.
+
+Uso (a partir de backend/):
+    python -m app.benchmarks.dados_sinteticos --escala media
+    python -m app.benchmarks.dados_sinteticos --escala producao --notas 50000
+"""
+import argparse
+import csv
+import io
+import json
+import math
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import MetaData, func, insert, select, text
+
+from app.database import engine
+from app.services import embalagem, resumo_historicos
+
+ESCALAS: Dict[str, Dict[str, int]] = {
+    "pequena": dict(materias_primas=500, precos_por_mp=20, fornecedores=50, notas=500,
+                    itens_por_nota=20, produtos=100, componentes_por_produto=6,
+                    produtos_finais=50, logs=5000),
+    "media": dict(materias_primas=5000, precos_por_mp=40, fornecedores=200, notas=5000,
+                  itens_por_nota=50, produtos=1000, componentes_por_produto=8,
+                  produtos_finais=300, logs=50000),
+    "producao": dict(materias_primas=30000, precos_por_mp=60, fornecedores=800, notas=20000,
+                     itens_por_nota=150, produtos=3000, componentes_por_produto=10,
+                     produtos_finais=1000, logs=500000),
+}
+
+USUARIO_CARGA = {"email": "carga@local", "senha": "carga123", "nome": "Teste de carga"}
+
+# (família, unidade, especificações, embalagens) — nomes no padrão das notas reais
+_FAMILIAS = [
+    ("FIO DE COBRE ESMALTADO", "KG", ["0,25 MM", "0,40 MM", "0,55 MM", "0,80 MM", "1,20 MM", "2.0X7.0"], ["25 KG", "50 KG", "5 KG"]),
+    ("FIO DE ALUMINIO", "KG", ["1,00 MM", "1,50 MM", "2,50 MM"], ["25 KG", "40 KG"]),
+    ("VERNIZ ISOLANTE", "L", ["CLASSE F", "CLASSE H", "ASA 952 AMARELO"], ["5 L", "18 L", "200 L"]),
+    ("RESINA EPOXI", "KG", ["BICOMPONENTE", "FLEXIVEL", "RIGIDA"], ["1 KG", "5 KG", "20 KG"]),
+    ("ADESIVO PVA", "KG", ["DAS 403", "EXTRA FORTE"], ["1 KG", "5 KG"]),
+    ("FITA ISOLANTE", "UN", ["19MM", "25MM", "50MM"], ["20 M", "50 M"]),
+    ("CADARCO ALGODAO/POLIESTER", "M", ["12MM", "19MM", "25MM"], ["100 M", "500 M"]),
+    ("CORDOALHA NUA EXTRA FLEXIVEL", "M", ["6,0 MM", "8,0 MM", "10,0 MM"], ["50 M", "100 M"]),
+    ("PAPEL ISOLANTE NOMEX", "KG", ["0,05 MM", "0,13 MM", "0,25 MM"], ["10 KG", "25 KG"]),
+    ("TERMINAL OLHAL", "UN", ["4 MM", "6 MM", "10 MM", "16 MM"], ["100 PC", "500 PC"]),
+    ("TUBO ESPAGUETE", "M", ["2 MM", "4 MM", "6 MM"], ["50 M", "100 M"]),
+    ("CHAPA SILICIO", "KG", ["0,35 MM", "0,50 MM"], ["1000 KG"]),
+]
+_RAZOES = ["COMERCIAL", "INDUSTRIA", "DISTRIBUIDORA", "METALURGICA", "QUIMICA", "ELETRO"]
+_NOMES = ["SANTOS", "PAULISTA", "BRASIL", "MINEIRA", "SUL", "NORTE", "CENTRAL", "UNIAO", "PROGRESSO"]
+
+_TABELAS = [
+    "users", "unidades", "fornecedor", "materias_primas", "materia_prima_precos", "notas",
+    "nota_itens", "produtos", "produto_componentes", "produto_precos", "produtos_finais", "audit_logs",
+]
+
+
+class _NullCsv(int):
+    """NULL no COPY: numérico para o csv não colocar aspas"""
+
+    def __str__(self):
+        return "\\N"
+
+
+_NULL = _NullCsv()
+
+
+class _Carga:
+    """Recebe linhas (dicts) e grava em lotes: COPY no PostgreSQL, INSERT nos demais"""
+
+    def __init__(self, conn, tabela, lote: int = 10000, pai: Optional["_Carga"] = None):
+        self.conn = conn
+        self.tabela = tabela
+        self.lote = lote
+        self.pai = pai  # gravado antes, para as FKs já encontrarem as linhas referenciadas
+        self.colunas: Optional[List[str]] = None
+        self.linhas: List[Dict[str, Any]] = []
+        self.total = 0
+        self.postgres = conn.dialect.name == "postgresql"
+
+    def add(self, linha: Dict[str, Any]) -> None:
+        if self.colunas is None:
+            self.colunas = [c for c in linha if c in self.tabela.c]
+        self.linhas.append(linha)
+        if len(self.linhas) >= self.lote:
+            self.flush()
+
+    def _valor_csv(self, valor):
+        if valor is None:
+            return _NULL
+        if isinstance(valor, bool):
+            return "t" if valor else "f"
+        if isinstance(valor, (datetime, date)):
+            return valor.isoformat()
+        if isinstance(valor, (dict, list)):
+            return json.dumps(valor, ensure_ascii=False)
+        return valor
+
+    def flush(self) -> None:
+        if self.pai is not None:
+            self.pai.flush()
+        if not self.linhas:
+            return
+        if self.postgres:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC, lineterminator="\n")
+            for linha in self.linhas:
+                writer.writerow([self._valor_csv(linha.get(c)) for c in self.colunas])
+            buffer.seek(0)
+            cols = ", ".join(f'"{c}"' for c in self.colunas)
+            cursor = self.conn.connection.dbapi_connection.cursor()
+            cursor.copy_expert(
+                f"COPY {self.tabela.name} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+            )
+        else:
+            self.conn.execute(
+                insert(self.tabela), [{c: linha.get(c) for c in self.colunas} for linha in self.linhas]
+            )
+        self.total += len(self.linhas)
+        self.linhas = []
+
+
+def _proximo_id(conn, tabela, coluna: str = "id") -> int:
+    return (conn.execute(select(func.max(tabela.c[coluna]))).scalar() or 0) + 1
+
+
+def _ajustar_sequences(conn, tabelas) -> None:
+    if conn.dialect.name != "postgresql":
+        return
+    for tabela in tabelas:
+        for coluna in tabela.primary_key.columns:
+            seq = conn.execute(text("SELECT pg_get_serial_sequence(:t, :c)"),
+                               {"t": tabela.name, "c": coluna.name}).scalar()
+            if seq:
+                conn.execute(text(
+                    f'SELECT setval(:s, COALESCE(MAX("{coluna.name}"), 1), MAX("{coluna.name}") IS NOT NULL) '
+                    f"FROM {tabela.name}"
+                ), {"s": seq})
+
+
+def _unidades(conn, tabela) -> Dict[str, str]:
+    """{CÓDIGO MAIÚSCULO: código gravado}; cria as unidades básicas se o banco estiver vazio"""
+    codigos = conn.execute(select(tabela.c.codigo)).scalars().all()
+    if not codigos:
+        base = [("KG", "Quilograma"), ("L", "Litro"), ("M", "Metro"), ("UN", "Unidade")]
+        conn.execute(insert(tabela), [
+            {c: v for c, v in {"codigo": cod, "descricao": desc, "is_base": True}.items() if c in tabela.c}
+            for cod, desc in base
+        ])
+        codigos = [cod for cod, _ in base]
+    return {c.upper(): c for c in codigos}
+
+
+def gerar(materias_primas: int, precos_por_mp: int, fornecedores: int, notas: int, itens_por_nota: int,
+          produtos: int, componentes_por_produto: int, produtos_finais: int, logs: int,
+          semente: int = 42, progresso=print) -> Dict[str, int]:
+    """Gera o conjunto completo e retorna a quantidade de linhas por tabela"""
+    rng = random.Random(semente)
+    agora = datetime.now(timezone.utc)
+    inicio_historico = agora - timedelta(days=3 * 365)
+
+    meta = MetaData()
+    meta.reflect(bind=engine, only=[t for t in _TABELAS if t in _tabelas_existentes()])
+    t = meta.tables
+    totais: Dict[str, int] = {}
+
+    with engine.connect() as conn:
+        def etapa(nome: str, carga: _Carga, inicio: float) -> None:
+            carga.flush()
+            conn.commit()
+            totais[nome] = carga.total
+            progresso(f"   • {nome}: {carga.total} linhas em {time.perf_counter() - inicio:.1f}s")
+
+        unidades = _unidades(conn, t["unidades"])
+        conn.commit()
+
+        def unidade(codigo: str) -> str:
+            return unidades.get(codigo) or unidades.get("UN") or next(iter(unidades.values()))
+
+        # Usuário para o teste de carga
+        if "users" in t and not conn.execute(
+            select(t["users"].c.id).where(t["users"].c.email == USUARIO_CARGA["email"])
+        ).first():
+            from app.auth.jwt import get_password_hash
+            conn.execute(insert(t["users"]), [{
+                "name": USUARIO_CARGA["nome"], "email": USUARIO_CARGA["email"],
+                "password_hash": get_password_hash(USUARIO_CARGA["senha"]),
+                "role": "admin", "is_active": True, "created_at": agora, "updated_at": agora,
+            }])
+            conn.commit()
+        usuario_id = conn.execute(
+            select(t["users"].c.id).where(t["users"].c.email == USUARIO_CARGA["email"])
+        ).scalar()
+
+        # Fornecedores
+        inicio = time.perf_counter()
+        carga = _Carga(conn, t["fornecedor"])
+        primeiro_forn = _proximo_id(conn, t["fornecedor"], "id_fornecedor")
+        ids_forn = list(range(primeiro_forn, primeiro_forn + fornecedores))
+        for i in ids_forn:
+            cnpj = f"{i:08d}"
+            carga.add({
+                "id_fornecedor": i,
+                "cnpj": f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/0001-{i % 97:02d}",
+                "nome": f"{rng.choice(_RAZOES)} {rng.choice(_NOMES)} {i} LTDA",
+                "endereco": f"Rua {rng.choice(_NOMES).title()}, {rng.randint(1, 3000)}",
+                "ativo": True, "created_at": inicio_historico, "updated_at": inicio_historico,
+            })
+        etapa("fornecedor", carga, inicio)
+
+        # Matérias-primas e histórico de preços
+        inicio = time.perf_counter()
+        carga_mp = _Carga(conn, t["materias_primas"])
+        primeiro_mp = _proximo_id(conn, t["materias_primas"])
+        catalogo = []  # (id, nome, unidade, último preço)
+        for i in range(primeiro_mp, primeiro_mp + materias_primas):
+            familia, cod_unidade, specs, embalagens = rng.choice(_FAMILIAS)
+            nome = f"{familia} {rng.choice(specs)} - {rng.choice(embalagens)} REF{i:06d}"
+            carga_mp.add({
+                "id": i, "nome": nome, "unidade_codigo": unidade(cod_unidade),
+                "menor_unidade_codigo": unidade(cod_unidade), "is_active": rng.random() > 0.03,
+                "created_at": inicio_historico, "updated_at": inicio_historico,
+                **embalagem.interpretar(nome),
+            })
+            catalogo.append([i, nome, unidade(cod_unidade), math.exp(rng.uniform(0, 6))])
+        etapa("materias_primas", carga_mp, inicio)
+
+        inicio = time.perf_counter()
+        carga = _Carga(conn, t["materia_prima_precos"])
+        preco_id = _proximo_id(conn, t["materia_prima_precos"])
+        passo_medio = (agora - inicio_historico) / max(precos_por_mp, 1)
+        for item in catalogo:
+            desde = inicio_historico + rng.random() * passo_medio
+            valor = item[3]
+            for k in range(precos_por_mp):
+                ate = desde + passo_medio * rng.uniform(0.3, 1.7) if k < precos_por_mp - 1 else None
+                carga.add({
+                    "id": preco_id, "materia_prima_id": item[0], "valor_unitario": round(valor, 4),
+                    "moeda": "BRL", "vigente_desde": desde, "vigente_ate": ate, "origem": "manual",
+                    "fornecedor_id": rng.choice(ids_forn) if ids_forn else None, "created_at": desde,
+                })
+                preco_id += 1
+                valor *= math.exp(rng.gauss(0.004, 0.05))
+                desde = ate
+            item[3] = valor
+        etapa("materia_prima_precos", carga, inicio)
+
+        # Notas e itens
+        inicio = time.perf_counter()
+        carga_nota = _Carga(conn, t["notas"])
+        carga_item = _Carga(conn, t["nota_itens"], pai=carga_nota)
+        nota_id = _proximo_id(conn, t["notas"])
+        item_id = _proximo_id(conn, t["nota_itens"])
+        ids_notas = []
+        for _ in range(notas):
+            emissao = (inicio_historico + timedelta(days=rng.uniform(0, 3 * 365))).date()
+            total = 0.0
+            itens = []
+            for _ in range(max(1, int(rng.gauss(itens_por_nota, itens_por_nota / 4)))):
+                mp_id, nome, cod, valor = rng.choice(catalogo)
+                quantidade = round(rng.uniform(1, 200), 3)
+                unitario = round(valor * rng.uniform(0.95, 1.05), 4)
+                total += quantidade * unitario
+                itens.append({
+                    "id": item_id, "nota_id": nota_id,
+                    "materia_prima_id": mp_id if rng.random() > 0.05 else None,
+                    "nome_no_documento": nome, "unidade_codigo": cod, "quantidade": quantidade,
+                    "valor_unitario": unitario, "valor_total": round(quantidade * unitario, 2),
+                })
+                item_id += 1
+            criada = datetime.combine(emissao, datetime.min.time(), timezone.utc) + timedelta(hours=rng.uniform(1, 72))
+            carga_nota.add({
+                "id": nota_id, "numero": str(100000 + nota_id), "serie": "1",
+                "chave_acesso": f"{rng.randrange(10 ** 20):020d}{nota_id:024d}",
+                "fornecedor_id": rng.choice(ids_forn), "emissao_date": emissao,
+                "valor_total": round(total, 2), "status": "processada", "created_at": criada,
+                "updated_at": criada, "is_active": True, "is_pinned": False,
+            })
+            for item in itens:
+                carga_item.add(item)
+            ids_notas.append(nota_id)
+            nota_id += 1
+        carga_item.flush()
+        etapa("notas", carga_nota, inicio)
+        etapa("nota_itens", carga_item, inicio)
+
+        # Produtos, componentes e custos
+        inicio = time.perf_counter()
+        carga_prod = _Carga(conn, t["produtos"])
+        carga_comp = _Carga(conn, t["produto_componentes"], pai=carga_prod)
+        carga_custo = _Carga(conn, t["produto_precos"], pai=carga_prod)
+        produto_id = _proximo_id(conn, t["produtos"])
+        comp_id = _proximo_id(conn, t["produto_componentes"])
+        custo_id = _proximo_id(conn, t["produto_precos"])
+        for _ in range(produtos):
+            carga_prod.add({
+                "id": produto_id, "codigo": f"PRD{produto_id:06d}", "nome": f"BOBINA MCM{produto_id:05d}",
+                "ativo": True, "is_active": True, "created_at": inicio_historico, "updated_at": inicio_historico,
+            })
+            custo = 0.0
+            for mp_id, _, cod, valor in rng.sample(catalogo, min(componentes_por_produto, len(catalogo))):
+                quantidade = round(rng.uniform(0.01, 5), 4)
+                custo += quantidade * valor
+                carga_comp.add({
+                    "id": comp_id, "produto_id": produto_id, "materia_prima_id": mp_id,
+                    "quantidade": quantidade, "unidade_codigo": cod,
+                })
+                comp_id += 1
+            for k in range(12):
+                desde = agora - timedelta(days=30 * (12 - k))
+                carga_custo.add({
+                    "id": custo_id, "produto_id": produto_id,
+                    "custo_total": round(custo * rng.uniform(0.8, 1.0) ** (12 - k), 4),
+                    "vigente_desde": desde, "vigente_ate": desde + timedelta(days=30) if k < 11 else None,
+                    "created_at": desde,
+                })
+                custo_id += 1
+            produto_id += 1
+        carga_comp.flush()
+        carga_custo.flush()
+        etapa("produtos", carga_prod, inicio)
+        etapa("produto_componentes", carga_comp, inicio)
+        etapa("produto_precos", carga_custo, inicio)
+
+        # Produtos finais (componentes em JSON, referenciando matérias-primas pelo nome)
+        if "produtos_finais" in t:
+            inicio = time.perf_counter()
+            carga = _Carga(conn, t["produtos_finais"], lote=1000)
+            pf_id = _proximo_id(conn, t["produtos_finais"])
+            for _ in range(produtos_finais):
+                componentes = [
+                    {"id": str(n + 1), "materiaPrimaNome": nome, "quantidade": round(rng.uniform(0.01, 6), 3),
+                     "unidadeMedida": cod.upper(), "valorUnitario": round(valor, 2)}
+                    for n, (_, nome, cod, valor) in enumerate(rng.sample(catalogo, min(8, len(catalogo))))
+                ]
+                carga.add({
+                    "id": pf_id, "nome": f"MCM{pf_id:05d}-SINT", "id_unico": f"SINT_{pf_id}_{semente}",
+                    "componentes": componentes, "ativo": True, "created_at": agora, "updated_at": agora,
+                })
+                pf_id += 1
+            etapa("produtos_finais", carga, inicio)
+
+        # Auditoria
+        if logs and usuario_id:
+            inicio = time.perf_counter()
+            carga = _Carga(conn, t["audit_logs"])
+            log_id = _proximo_id(conn, t["audit_logs"])
+            for _ in range(logs):
+                entidade = rng.choice(["nota", "materia_prima", "produto"])
+                carga.add({
+                    "id": log_id, "user_id": usuario_id, "entity": entidade,
+                    "entity_id": rng.choice(ids_notas) if entidade == "nota" and ids_notas else rng.randint(1, materias_primas),
+                    "action": rng.choice(["create", "update", "update", "delete"]),
+                    "changes": {"campo": {"old": None, "new": "valor"}},
+                    "ip_address": "127.0.0.1", "created_at": agora - timedelta(days=rng.uniform(0, 60)),
+                })
+                log_id += 1
+            etapa("audit_logs", carga, inicio)
+
+        _ajustar_sequences(conn, t.values())
+        # Preços gravados via COPY/insert em lote não passam pelos hooks da sessão
+        if "variacoes_preco_diarias" in _tabelas_existentes():
+            inicio = time.perf_counter()
+            totais["variacoes_preco_diarias"] = resumo_historicos.reconstruir(conn)
+            progresso(f"   • variacoes_preco_diarias: {totais['variacoes_preco_diarias']} linhas "
+                      f"em {time.perf_counter() - inicio:.1f}s")
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("ANALYZE"))
+        conn.commit()
+
+    return totais
+
+
+def _tabelas_existentes() -> set:
+    from sqlalchemy import inspect
+    return set(inspect(engine).get_table_names())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos em escala configurável")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="pequena")
+    for campo in ESCALAS["pequena"]:
+        parser.add_argument(f"--{campo.replace('_', '-')}", type=int, help="sobrescreve o valor da escala")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    faltando = [t for t in _TABELAS if t not in _tabelas_existentes()]
+    if faltando:
+        print(f"❌ Tabelas ausentes: {', '.join(faltando)} (rode `alembic upgrade head`)")
+        sys.exit(1)
+
+    config = dict(ESCALAS[args.escala])
+    for campo in config:
+        valor = getattr(args, campo)
+        if valor is not None:
+            config[campo] = valor
+
+    print(f"🧪 Gerando dados sintéticos ({args.escala}): {config}")
+    inicio = time.perf_counter()
+    totais = gerar(semente=args.semente, **config)
+    print(f"✅ {sum(totais.values())} linhas em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
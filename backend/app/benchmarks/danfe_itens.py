@@ -0,0 +1,245 @@
+"""
+Benchmark da extração dos itens da DANFE em PDF.
+
+Compara uploads.extrair_itens_produtos (regex sobre o texto do pdfplumber) com
+app.services.danfe_itens (colunas pela geometria do quadro de produtos) em PDFs
+sintéticos gerados com PyMuPDF: com e sem linhas de grade, descrições quebradas
+em duas linhas, códigos de tamanhos variados e notas de mais de uma página.
+
+Mostra tempo por documento, itens extraídos corretamente e quantos documentos
+ficam acima de DANFE_CONFIANCA_MINIMA (dispensam o Document AI em uploads_ia).
+Com --pdfs, PDFs reais de um diretório entram só na contagem de itens e de
+confiança, já que não há gabarito.
+
+Uso (a partir de backend/):
+    python -m app.benchmarks.danfe_itens --documentos 100
+    python -m app.benchmarks.danfe_itens --pdfs ../notas_exemplo
+"""
+import argparse
+import io
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+import pdfplumber
+
+from app.api.uploads import extrair_itens_produtos
+from app.benchmarks.danfe_regex import _brl
+from app.config import settings
+from app.services import danfe_itens
+
+_PRODUTOS = ["FIO COBRE ESMALTADO", "FITA ISOLANTE", "VERNIZ CLASSE H", "PAPEL NOMEX", "RESINA EPOXI",
+             "TUBO ESPAGUETE", "TERMINAL OLHAL", "CABO FLEXIVEL", "FIO 2.0X7.0 CANTO QUADRADO"]
+_COMPLEMENTOS = ["LOTE 2024/118 CERTIFICADO DE QUALIDADE ANEXO", "CONFORME PEDIDO DE COMPRA 4512",
+                 "EMBALAGEM CARRETEL PLASTICO 25 KG"]
+
+# (rótulo em linhas, largura, alinhamento do valor)
+_COLUNAS = [
+    (["CÓDIGO", "PRODUTO"], 42, "e"),
+    (["DESCRIÇÃO DO PRODUTO / SERVIÇO"], 150, "e"),
+    (["NCM/SH"], 36, "e"),
+    (["O/CST"], 22, "e"),
+    (["CFOP"], 22, "e"),
+    (["UN"], 16, "e"),
+    (["QUANT"], 38, "d"),
+    (["VALOR", "UNIT"], 40, "d"),
+    (["VALOR", "TOTAL"], 44, "d"),
+    (["B.CÁLC", "ICMS"], 40, "d"),
+    (["VALOR", "ICMS"], 34, "d"),
+    (["VALOR", "IPI"], 28, "d"),
+    (["ALÍQ.", "ICMS"], 23, "d"),
+]
+_FONTE, _MARGEM, _ALTURA_LINHA, _ITENS_POR_PAGINA = 5.5, 20, 8.0, 60
+
+
+def _texto(page, x: float, y: float, texto: str, tamanho: float = _FONTE) -> None:
+    page.insert_text((x, y), texto, fontsize=tamanho, fontname="helv")
+
+
+def _celula(page, x0: float, largura: float, y: float, texto: str, alinhamento: str) -> None:
+    if alinhamento == "d":
+        x = x0 + largura - 2 - fitz.get_text_length(texto, fontname="helv", fontsize=_FONTE)
+    else:
+        x = x0 + 2
+    _texto(page, x, y, texto)
+
+
+def _gerar_itens(rng: random.Random) -> List[Dict]:
+    itens = []
+    for i in range(rng.randint(3, 140)):
+        qtd = round(rng.uniform(1, 900), 4)
+        unit = round(rng.uniform(0.5, 300), 4)
+        descricao = f"{rng.choice(_PRODUTOS)} {rng.randint(1, 99)}MM"
+        itens.append({
+            "codigo": rng.choice([f"{rng.randint(1, 999999):06d}", f"MP-{rng.randint(1, 9999)}",
+                                  str(rng.randint(10, 99999))]),
+            "descricao": descricao,
+            "complemento": rng.choice(_COMPLEMENTOS) if rng.random() < 0.2 else "",
+            "ncm": rng.choice(["85118090", "74081100", "39073029", "48119090"]),
+            "cst": rng.choice(["000", "0500", "102"]),
+            "cfop": rng.choice(["5101", "6101", "5102"]),
+            "unidade": rng.choice(["KG", "UN", "M", "RL"]),
+            "quantidade": qtd,
+            "valor_unitario": unit,
+            "valor_total": round(qtd * unit, 2),
+        })
+    return itens
+
+
+def _quadro_produtos(page, y: float, itens: List[Dict], grade: bool) -> float:
+    _texto(page, _MARGEM, y, "DADOS DOS PRODUTOS / SERVIÇOS", 6.5)
+    y_topo = y + 3
+    y_rotulo = y_topo + 7
+    x = _MARGEM
+    for rotulo, largura, _ in _COLUNAS:
+        for k, parte in enumerate(rotulo):
+            _celula(page, x, largura, y_rotulo + k * 6, parte, "e")
+        x += largura
+    y_linha = y_rotulo + 6 * max(len(r) for r, _, _ in _COLUNAS) + 4
+
+    for item in itens:
+        x = _MARGEM
+        valores = [item["codigo"], item["descricao"], item["ncm"], item["cst"], item["cfop"], item["unidade"],
+                   _brl4(item["quantidade"]), _brl4(item["valor_unitario"]), _brl(item["valor_total"]),
+                   _brl(item["valor_total"]), _brl(item["valor_total"] * 0.18), "0,00", "18,00"]
+        for (rotulo, largura, alinhamento), valor in zip(_COLUNAS, valores):
+            _celula(page, x, largura, y_linha, valor, alinhamento)
+            x += largura
+        y_linha += _ALTURA_LINHA
+        if item["complemento"]:
+            _celula(page, _MARGEM + _COLUNAS[0][1], _COLUNAS[1][1], y_linha, item["complemento"], "e")
+            y_linha += _ALTURA_LINHA
+
+    if grade:
+        x = _MARGEM
+        for _, largura, _ in _COLUNAS:
+            page.draw_line((x, y_topo), (x, y_linha), width=0.4)
+            x += largura
+        page.draw_line((x, y_topo), (x, y_linha), width=0.4)
+        page.draw_line((_MARGEM, y_topo), (x, y_topo), width=0.4)
+        page.draw_line((_MARGEM, y_linha), (x, y_linha), width=0.4)
+    return y_linha + 10
+
+
+def _brl4(valor: float) -> str:
+    return f"{valor:,.4f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def gerar_pdf(rng: random.Random) -> Tuple[bytes, List[Dict]]:
+    """PDF de DANFE e o gabarito dos itens"""
+    itens = _gerar_itens(rng)
+    grade = rng.random() < 0.7
+    total = sum(i["valor_total"] for i in itens)
+
+    doc = fitz.open()
+    for inicio in range(0, len(itens), _ITENS_POR_PAGINA):
+        page = doc.new_page(width=595, height=842)
+        y = 40.0
+        if inicio == 0:
+            _texto(page, _MARGEM, y, "METALURGICA SAO JORGE LTDA", 9)
+            _texto(page, 300, y, f"DANFE   Nº 000.{rng.randint(100, 999)}.{rng.randint(100, 999)}   SÉRIE 1", 8)
+            _texto(page, _MARGEM, y + 12, "CNPJ 12.345.678/0001-90", 7)
+            y += 30
+            _texto(page, _MARGEM, y, "CÁLCULO DO IMPOSTO", 6.5)
+            rotulos = [("BASE DE CÁLC. DO ICMS", _brl(total)), ("VALOR DO ICMS", _brl(total * 0.18)),
+                       ("VALOR DO FRETE", "0,00"), ("VALOR TOTAL DOS PRODUTOS", _brl(total))]
+            x = _MARGEM
+            for rotulo, valor in rotulos:
+                _texto(page, x + 2, y + 9, rotulo, 5)
+                _celula(page, x, 130, y + 18, valor, "d")
+                page.draw_rect(fitz.Rect(x, y + 3, x + 130, y + 21), width=0.4)
+                x += 130
+            y += 36
+        else:
+            _texto(page, _MARGEM, y, "CONTINUAÇÃO DA DANFE", 7)
+            y += 14
+        y = _quadro_produtos(page, y, itens[inicio:inicio + _ITENS_POR_PAGINA], grade)
+        if inicio + _ITENS_POR_PAGINA >= len(itens):
+            _texto(page, _MARGEM, y, "DADOS ADICIONAIS", 6.5)
+            _texto(page, _MARGEM, y + 10, "INFORMAÇÕES COMPLEMENTARES: PEDIDO 4512 VALOR 1.234,56", 5.5)
+    conteudo = doc.tobytes()
+    doc.close()
+
+    gabarito = [{**i, "descricao": f"{i['descricao']} {i['complemento']}".strip()} for i in itens]
+    return conteudo, gabarito
+
+
+# ---- Medição ----
+
+def _antes(pdf) -> List[Dict]:
+    texto = "\n".join(p.extract_text() or "" for p in pdf.pages)
+    return extrair_itens_produtos(texto)
+
+
+def _depois(pdf) -> danfe_itens.ResultadoItens:
+    return danfe_itens.extrair_itens(pdf)
+
+
+def _corretos(itens: List[Dict], gabarito: List[Dict]) -> int:
+    esperados = {(g["codigo"], round(g["quantidade"], 4), round(g["valor_total"], 2), g["descricao"])
+                 for g in gabarito}
+    return sum(
+        (i.get("codigo"), round(i["quantidade"], 4), round(i["valor_total"], 2), i.get("descricao")) in esperados
+        for i in itens
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compara a extração de itens de DANFE em PDF (antes x depois)")
+    parser.add_argument("--documentos", type=int, default=100)
+    parser.add_argument("--pdfs", type=Path, help="diretório com PDFs de DANFE reais")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.semente)
+    corpus: List[Tuple[bytes, Optional[List[Dict]]]] = [gerar_pdf(rng) for _ in range(args.documentos)]
+    if args.pdfs:
+        if not args.pdfs.is_dir():
+            print(f"❌ Diretório não encontrado: {args.pdfs}")
+            sys.exit(1)
+        reais = [(c.read_bytes(), None) for c in sorted(args.pdfs.glob("*.pdf"))]
+        print(f"📄 {len(reais)} PDFs reais adicionados ao corpus")
+        corpus += reais
+
+    minimo = settings.DANFE_CONFIANCA_MINIMA
+    total_itens = sum(len(g) for _, g in corpus if g is not None)
+    print(f"🧪 {len(corpus)} PDFs, {total_itens} itens no gabarito, confiança mínima {minimo:.2f}\n")
+
+    tempo_antes = tempo_depois = 0.0
+    corretos_antes = corretos_depois = 0
+    confiantes = confiantes_errados = 0
+    for conteudo, gabarito in corpus:
+        with pdfplumber.open(io.BytesIO(conteudo)) as pdf:
+            inicio = time.perf_counter()
+            antes = _antes(pdf)
+            tempo_antes += time.perf_counter() - inicio
+        with pdfplumber.open(io.BytesIO(conteudo)) as pdf:
+            inicio = time.perf_counter()
+            depois = _depois(pdf)
+            tempo_depois += time.perf_counter() - inicio
+
+        if depois.confianca >= minimo:
+            confiantes += 1
+        if gabarito is None:
+            continue
+        corretos_antes += _corretos(antes, gabarito)
+        acertos = _corretos(depois.itens, gabarito)
+        corretos_depois += acertos
+        if depois.confianca >= minimo and (acertos != len(gabarito) or len(depois.itens) != len(gabarito)):
+            confiantes_errados += 1
+
+    n = len(corpus)
+    print("📊 Itens da DANFE")
+    print(f"   {'texto + regex (antes)':<26}{tempo_antes / n * 1e3:>8.1f} ms/PDF"
+          f"   itens corretos {corretos_antes / max(total_itens, 1):.0%}")
+    print(f"   {'danfe_itens (layout)':<26}{tempo_depois / n * 1e3:>8.1f} ms/PDF"
+          f"   itens corretos {corretos_depois / max(total_itens, 1):.0%}")
+    print(f"   PDFs acima da confiança mínima (sem Document AI): {confiantes}/{n}")
+    print(f"   ... com algum item errado: {confiantes_errados}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Benchmark da extração de campos do texto de DANFEs.
+
+Compara as cadeias de re.search usadas antes em uploads.py / uploads_ia.py com
+app.services.danfe_texto (uma varredura por seção) em um corpus sintético de
+textos de DANFE (layout do DANFE e layout com rótulos na mesma linha), nos dois formatos que a API recebe: texto do pdfplumber (com
+quebras de linha e acentos) e texto normalizado do MCP (ASCII, espaços
+colapsados). Mostra tempo por documento e acerto de cada campo.
+
+Com --pdfs, o texto de PDFs reais de um diretório entra no corpus (só tempo e
+concordância entre as duas implementações, já que não há gabarito).
+
+Uso (a partir de backend/):
+    python -m app.benchmarks.danfe_regex --documentos 500 --repeticoes 5
+    python -m app.benchmarks.danfe_regex --pdfs ../notas_exemplo
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from unidecode import unidecode
+
+from app.services import danfe_texto
+
+_NOMES = ["METALURGICA SAO JORGE LTDA", "FIOS E CABOS PAULISTA S.A.", "ISOLANTES DO BRASIL INDUSTRIA LTDA",
+          "COMERCIAL ELETRICA BOBINAS & CIA LTDA", "RESINAS TECNICAS NORDESTE EIRELI"]
+_PRODUTOS = ["FIO COBRE ESMALTADO", "FITA ISOLANTE", "VERNIZ CLASSE H", "PAPEL NOMEX", "RESINA EPOXI",
+             "TUBO ESPAGUETE", "TERMINAL OLHAL", "CABO FLEXIVEL"]
+
+
+def _brl(valor: float) -> str:
+    return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _cnpj(rng: random.Random) -> Tuple[str, str]:
+    d = "".join(str(rng.randint(0, 9)) for _ in range(14))
+    return f"{d[:2]}.{d[2:5]}.{d[5:8]}/{d[8:12]}-{d[12:]}", d
+
+
+def gerar_documento(rng: random.Random) -> Tuple[str, Dict[str, str]]:
+    """Texto no formato do pdfplumber e o gabarito dos campos"""
+    numero = rng.randint(1, 999999)
+    serie = str(rng.randint(1, 9))
+    chave = "".join(str(rng.randint(0, 9)) for _ in range(44))
+    cnpj_fmt, cnpj = _cnpj(rng)
+    cnpj_dest, _ = _cnpj(rng)
+    emitente = rng.choice(_NOMES)
+    emissao = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2020, 2025)}"
+
+    itens, total = [], 0.0
+    for i in range(rng.randint(5, 80)):
+        qtd, unit = rng.uniform(1, 500), rng.uniform(0.5, 300)
+        total += qtd * unit
+        itens.append(f"{i + 1:06d} -{rng.choice(_PRODUTOS)} {rng.randint(1, 99)}MM 85118090 0500 5101 KG "
+                     f"{_brl(qtd)} {_brl(unit)} {_brl(qtd * unit)}")
+
+    rotulo_numero = rng.choice(["Nº", "N°", "No.", "NÚMERO:"])
+    numero_txt = f"{numero:09d}"
+    if rotulo_numero.startswith("N") and rng.random() < 0.5:
+        numero_txt = f"{numero_txt[:3]}.{numero_txt[3:6]}.{numero_txt[6:]}"
+    texto = "\n".join([
+        "RECEBEMOS DE " + emitente + " OS PRODUTOS CONSTANTES DA NOTA FISCAL INDICADA AO LADO",
+        "DATA DE RECEBIMENTO IDENTIFICAÇÃO E ASSINATURA DO RECEBEDOR",
+        "IDENTIFICAÇÃO DO EMITENTE",
+        emitente,
+        f"RUA {rng.choice(['DAS FLORES', 'XV DE NOVEMBRO', 'INDUSTRIAL'])}, {rng.randint(1, 9999)} - CEP "
+        f"{rng.randint(10000, 99999)}-{rng.randint(100, 999)} FONE (11) {rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+        "DANFE",
+        "DOCUMENTO AUXILIAR DA NOTA FISCAL ELETRÔNICA",
+        "0 - ENTRADA 1 - SAÍDA 1",
+        f"{rotulo_numero} {numero_txt}",
+        f"SÉRIE {serie} FOLHA 1/1",
+        "CHAVE DE ACESSO",
+        " ".join(chave[i:i + 4] for i in range(0, 44, 4)),
+        "NATUREZA DA OPERAÇÃO VENDA DE MERCADORIA",
+        f"INSCRIÇÃO ESTADUAL {rng.randint(100, 999)}.{rng.randint(100, 999)}.{rng.randint(100, 999)}.{rng.randint(100, 999)} "
+        f"CNPJ {cnpj_fmt}",
+        "DESTINATÁRIO/REMETENTE",
+        f"NOME/RAZÃO SOCIAL CLIENTE BOBINAS LTDA CNPJ/CPF {cnpj_dest} DATA DA EMISSÃO {emissao}",
+        "CÁLCULO DO IMPOSTO",
+        f"BASE DE CÁLCULO DO ICMS {_brl(total)} VALOR DO ICMS {_brl(total * 0.18)}",
+        f"VALOR TOTAL DOS PRODUTOS {_brl(total)} VALOR TOTAL DA NOTA {_brl(total)}",
+        "TRANSPORTADOR/VOLUMES TRANSPORTADOS",
+        "DADOS DOS PRODUTOS/SERVIÇOS",
+        *itens,
+        "DADOS ADICIONAIS",
+    ])
+    gabarito = {
+        "numero_nota": f"{numero:09d}",
+        "serie": serie,
+        "chave_acesso": chave,
+        "cnpj_digitos": cnpj,
+        "emitente": emitente,
+        "data_emissao": emissao,
+        "valor_total": round(total, 2),
+    }
+    return texto, gabarito
+
+
+def gerar_documento_rotulado(rng: random.Random) -> Tuple[str, Dict[str, str]]:
+    """Layout com rótulo e valor na mesma linha (CNPJ sem pontuação, sem âncoras de seção)"""
+    numero = rng.randint(1, 999999)
+    serie = str(rng.randint(1, 9))
+    _, cnpj = _cnpj(rng)
+    emitente = rng.choice(_NOMES)
+    emissao = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2020, 2025)}"
+
+    itens, total = [], 0.0
+    for i in range(rng.randint(5, 80)):
+        qtd, unit = rng.uniform(1, 500), rng.uniform(0.5, 300)
+        total += qtd * unit
+        itens.append(f"{i + 1:06d} -{rng.choice(_PRODUTOS)} {rng.randint(1, 99)}MM KG "
+                     f"{_brl(qtd)} {_brl(unit)} {_brl(qtd * unit)}")
+
+    texto = "\n".join([
+        f"NOTA FISCAL Nº {numero:09d} SÉRIE {serie}",
+        f"EMITENTE: {emitente} CNPJ: {cnpj} INSCRIÇÃO ESTADUAL: {rng.randint(100000000, 999999999)}",
+        f"DATA DE EMISSÃO: {emissao}",
+        f"VALOR TOTAL: {_brl(total)}",
+        "DADOS DOS PRODUTOS/SERVIÇOS",
+        *itens,
+    ])
+    gabarito = {
+        "numero_nota": f"{numero:09d}",
+        "serie": serie,
+        "cnpj_digitos": cnpj,
+        "emitente": emitente,
+        "data_emissao": emissao,
+        "valor_total": round(total, 2),
+    }
+    return texto, gabarito
+
+
+LAYOUTS = [gerar_documento, gerar_documento_rotulado]
+
+
+def normalizar_mcp(texto: str) -> str:
+    """Mesma normalização aplicada ao texto do MCP em uploads_ia.py"""
+    texto = unidecode(texto)
+    texto = re.sub(r"[^\x00-\x7F]+", "", texto)
+    return re.sub(r"\s+", " ", texto).strip()
+
+
+# ---- Implementações anteriores (cópia fiel, para comparação) ----
+
+def legado_uploads(texto: str) -> dict:
+    dados = {}
+    for pattern in [r'N[ºo°\.:\s]*(\d{6,})', r'NÚMERO[:\s]*(\d{6,})', r'(\d{6,})']:
+        m = re.search(pattern, texto, re.IGNORECASE)
+        if m:
+            dados['numero_nota'] = m.group(1)
+            break
+    for pattern in [r'(\d{2}\.?\d{3}\.?\d{3}\/?\d{4}-?\d{2})', r'CNPJ[:\s]*(\d{2}\.?\d{3}\.?\d{3}\/?\d{4}-?\d{2})']:
+        m = re.search(pattern, texto)
+        if m:
+            dados['cnpj_fornecedor'] = m.group(1)
+            break
+    for pattern in [r'EMITENTE[:\s]*([^\n\r]+)', r'RAZÃO\s+SOCIAL[:\s]*([^\n\r]+)', r'NOME[:\s]*([^\n\r]+)',
+                    r'FORNECEDOR[:\s]*([^\n\r]+)', r'([A-Z][A-Z\s\.&\-]{15,})', r'([A-Z][A-Z\s\.&\-]{10,})']:
+        m = re.search(pattern, texto, re.IGNORECASE)
+        if m:
+            nome = m.group(1).strip()
+            if (len(nome) > 10 and not nome.startswith('NF-') and not nome.startswith('NOTA')
+                    and not nome.startswith('IDENTIFICA') and 'CNPJ' not in nome and 'CPF' not in nome
+                    and 'INSCRIÇÃO' not in nome):
+                dados['fornecedor'] = nome
+                break
+    for pattern in [r'CNPJ[:\s]*(\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2})', r'(\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2})']:
+        m = re.search(pattern, texto)
+        if m:
+            dados['cnpj_fornecedor'] = m.group(1)
+            break
+    for pattern in [r'VALOR\s+TOTAL[:\s]*R?\$?\s*([\d.,]+)', r'TOTAL[:\s]*R?\$?\s*([\d.,]+)', r'R\$\s*([\d.,]+)']:
+        m = re.search(pattern, texto, re.IGNORECASE)
+        if m:
+            try:
+                dados['valor_total'] = float(m.group(1).replace('.', '').replace(',', '.'))
+                break
+            except ValueError:
+                continue
+    return dados
+
+
+def legado_ia(texto: str) -> dict:
+    dados = {"numero_nota": "", "valor_total": 0.0, "fornecedor": "", "cnpj_fornecedor": "", "data_emissao": ""}
+    m = re.search(r"(\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2})", texto)
+    if m:
+        dados["cnpj_fornecedor"] = m.group(1).replace(".", "").replace("/", "").replace("-", "")
+    m = re.search(r"valor total\s*[:\-]?\s*([\d.,]+)", texto, re.IGNORECASE)
+    if m:
+        try:
+            dados["valor_total"] = float(m.group(1).replace(".", "").replace(",", "."))
+        except ValueError:
+            pass
+    m = re.search(r"nota\s*fiscal\s*(?:n[oº])?\s*[:\-]?\s*(\d+)", texto, re.IGNORECASE)
+    if m:
+        dados["numero_nota"] = m.group(1)
+    m = re.search(r"(\d{2}/\d{2}/\d{4})", texto)
+    if m:
+        dados["data_emissao"] = m.group(1)
+    m = re.search(r"fornecedor\s*[:\-]?\s*([A-Z0-9\s\.\-&]+)", texto, re.IGNORECASE)
+    if m:
+        dados["fornecedor"] = m.group(1).strip()
+    return dados
+
+
+# ---- Medição ----
+
+def _novo(texto: str) -> dict:
+    campos = danfe_texto.extrair_campos(texto)
+    return {
+        "numero_nota": campos.get("numero_nota", ""),
+        "cnpj_fornecedor": campos.get("cnpj_emitente", ""),
+        "fornecedor": campos.get("emitente", ""),
+        "data_emissao": campos.get("data_emissao", ""),
+        "valor_total": danfe_texto.valor_brl(campos.get("valor_total", "")),
+    }
+
+
+def _acertos(extraido: dict, gabarito: dict) -> Dict[str, bool]:
+    numero = (extraido.get("numero_nota") or "").replace(".", "")
+    valor = extraido.get("valor_total")
+    return {
+        "numero_nota": bool(numero) and numero.lstrip("0") == gabarito["numero_nota"].lstrip("0"),
+        "cnpj": re.sub(r"\D", "", extraido.get("cnpj_fornecedor") or "") == gabarito["cnpj_digitos"],
+        "fornecedor": (extraido.get("fornecedor") or "").strip() == gabarito["emitente"],
+        "data_emissao": extraido.get("data_emissao") == gabarito["data_emissao"]
+                        if "data_emissao" in extraido else None,
+        "valor_total": valor is not None and abs(valor - gabarito["valor_total"]) < 0.01,
+    }
+
+
+def medir(extrator: Callable[[str], dict], corpus: List[Tuple[str, Optional[dict]]],
+          repeticoes: int) -> dict:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for texto, _ in corpus:
+            extrator(texto)
+    segundos = time.perf_counter() - inicio
+
+    acertos: Dict[str, List[bool]] = {}
+    for texto, gabarito in corpus:
+        if gabarito is None:
+            continue
+        for campo, ok in _acertos(extrator(texto), gabarito).items():
+            if ok is not None:
+                acertos.setdefault(campo, []).append(ok)
+    return {
+        "us_por_documento": segundos / (repeticoes * len(corpus)) * 1e6,
+        "acerto": {campo: sum(v) / len(v) for campo, v in acertos.items()},
+    }
+
+
+def _corpus_pdfs(diretorio: Path) -> List[str]:
+    import pdfplumber
+
+    textos = []
+    for caminho in sorted(diretorio.glob("*.pdf")):
+        with pdfplumber.open(caminho) as pdf:
+            textos.append("\n".join(p.extract_text() or "" for p in pdf.pages))
+    return textos
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compara a extração de campos de DANFE (antes x depois)")
+    parser.add_argument("--documentos", type=int, default=300)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--pdfs", type=Path, help="diretório com PDFs de DANFE reais")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.semente)
+    plumber, mcp = [], []
+    for i in range(args.documentos):
+        texto, gabarito = LAYOUTS[i % len(LAYOUTS)](rng)
+        plumber.append((texto, gabarito))
+        mcp.append((normalizar_mcp(texto), gabarito))
+    if args.pdfs:
+        if not args.pdfs.is_dir():
+            print(f"❌ Diretório não encontrado: {args.pdfs}")
+            sys.exit(1)
+        reais = _corpus_pdfs(args.pdfs)
+        print(f"📄 {len(reais)} PDFs reais adicionados ao corpus")
+        plumber += [(t, None) for t in reais]
+        mcp += [(normalizar_mcp(t), None) for t in reais]
+
+    tamanho = sum(len(t) for t, _ in plumber) / len(plumber)
+    print(f"🧪 {len(plumber)} documentos por formato (~{tamanho:.0f} caracteres), {args.repeticoes} repetições\n")
+
+    cenarios = [
+        ("pdfplumber", plumber, "uploads.py (antes)", legado_uploads),
+        ("mcp", mcp, "uploads_ia.py (antes)", legado_ia),
+    ]
+    for formato, corpus, nome_legado, legado in cenarios:
+        antes = medir(legado, corpus, args.repeticoes)
+        depois = medir(_novo, corpus, args.repeticoes)
+        ganho = antes["us_por_documento"] / depois["us_por_documento"]
+        print(f"📊 Texto {formato}")
+        print(f"   {nome_legado:<24}{antes['us_por_documento']:>10.1f} µs/doc")
+        print(f"   {'danfe_texto':<24}{depois['us_por_documento']:>10.1f} µs/doc  ({ganho:.1f}x)")
+        campos = sorted(set(antes["acerto"]) | set(depois["acerto"]))
+        for campo in campos:
+            a, d = antes["acerto"].get(campo), depois["acerto"].get(campo)
+            a_txt = f"{a:.0%}" if a is not None else "n/d"
+            d_txt = f"{d:.0%}" if d is not None else "n/d"
+            print(f"   acerto {campo:<16}{a_txt:>8} → {d_txt}")
+        if args.pdfs:
+            iguais = sum(
+                legado(t).get("numero_nota") == _novo(t)["numero_nota"]
+                for t, g in corpus if g is None
+            )
+            print(f"   PDFs reais com o mesmo número de nota: {iguais}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Benchmark dos índices da migração 0004 (PostgreSQL).
+
+Gera um conjunto de dados sintético, executa as consultas mais frequentes da API
+com EXPLAIN ANALYZE sem os índices (revisão 0003) e com eles (0004) e mostra
+plano e tempo lado a lado.
+
+Uso (a partir de backend/, com DATABASE_URL apontando para um banco descartável):
+    python -m app.benchmarks.indices --gerar --materias-primas 20000
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+
+from app.database import engine
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+# Consultas equivalentes às geradas pelos endpoints e tarefas
+CONSULTAS = {
+    "preco_atual_mp": (
+        "SELECT * FROM materia_prima_precos "
+        "WHERE materia_prima_id = :mp AND vigente_ate IS NULL LIMIT 1"
+    ),
+    "ultimo_preco_encerrado": (
+        "SELECT * FROM materia_prima_precos "
+        "WHERE materia_prima_id = :mp AND vigente_ate IS NOT NULL "
+        "ORDER BY vigente_ate DESC LIMIT 1"
+    ),
+    "historico_mp": (
+        "SELECT * FROM materia_prima_precos "
+        "WHERE materia_prima_id = :mp ORDER BY vigente_desde DESC"
+    ),
+    "historico_periodo": (
+        "SELECT * FROM materia_prima_precos "
+        "WHERE vigente_desde >= :ini AND vigente_desde <= :fim "
+        "ORDER BY vigente_desde DESC LIMIT 50"
+    ),
+    "custo_atual_produto": (
+        "SELECT * FROM produto_precos WHERE produto_id = :produto AND vigente_ate IS NULL LIMIT 1"
+    ),
+    "itens_da_nota": "SELECT * FROM nota_itens WHERE nota_id = :nota",
+    "mp_usada_em_notas": "SELECT count(*) FROM nota_itens WHERE materia_prima_id = :mp",
+    "mp_usada_em_produtos": "SELECT count(*) FROM produto_componentes WHERE materia_prima_id = :mp",
+    "notas_recentes": "SELECT * FROM notas ORDER BY created_at DESC LIMIT 50",
+    "notas_fornecedor_periodo": (
+        "SELECT * FROM notas WHERE fornecedor_id = :fornecedor "
+        "AND emissao_date >= :ini AND emissao_date <= :fim "
+        "ORDER BY created_at DESC LIMIT 50"
+    ),
+    "auditoria_entidade": (
+        "SELECT * FROM audit_logs WHERE entity = 'nota' AND entity_id = :nota "
+        "ORDER BY created_at DESC"
+    ),
+}
+
+
+def gerar_dados(conn, materias_primas: int, precos_por_mp: int, notas: int, itens_por_nota: int,
+                produtos: int, fornecedores: int = 500, logs: int = 200000) -> None:
+    """Popula o banco com dados sintéticos usando generate_series"""
+    params = {
+        "n_mp": materias_primas, "p": precos_por_mp, "n_notas": notas, "itens": itens_por_nota,
+        "n_prod": produtos, "n_forn": fornecedores, "n_logs": logs,
+    }
+    passos = [
+        ("usuário", """
+            INSERT INTO users (name, email, password_hash, role, is_active)
+            VALUES ('Benchmark', 'benchmark@local', 'x', 'admin', true)
+            ON CONFLICT (email) DO NOTHING
+        """),
+        ("fornecedores", """
+            INSERT INTO fornecedor (cnpj, nome, ativo)
+            SELECT 'B' || lpad(g::text, 13, '0'), 'Fornecedor sintético ' || g, true
+            FROM generate_series(1, :n_forn) g
+        """),
+        ("matérias-primas", """
+            INSERT INTO materias_primas (nome, unidade_codigo, menor_unidade_codigo, is_active)
+            SELECT 'MP sintética ' || g, u.codigo, u.codigo, true
+            FROM generate_series(1, :n_mp) g,
+                 (SELECT codigo FROM unidades ORDER BY id LIMIT 1) u
+        """),
+        ("preços", """
+            INSERT INTO materia_prima_precos
+                (materia_prima_id, valor_unitario, moeda, vigente_desde, vigente_ate, origem)
+            SELECT mp.id, round((1 + random() * 100)::numeric, 4), 'BRL',
+                   timestamptz '2020-01-01' + k * interval '7 days',
+                   CASE WHEN k < :p THEN timestamptz '2020-01-01' + (k + 1) * interval '7 days' END,
+                   'manual'
+            FROM materias_primas mp CROSS JOIN generate_series(1, :p) k
+            WHERE mp.nome LIKE 'MP sintética %'
+        """),
+        ("notas", """
+            INSERT INTO notas (numero, serie, fornecedor_id, emissao_date, valor_total, status, created_at)
+            SELECT g::text, 'BENCH',
+                   (SELECT min(id_fornecedor) FROM fornecedor WHERE nome LIKE 'Fornecedor sintético %')
+                       + (g % :n_forn),
+                   date '2020-01-01' + (g % 2000),
+                   round((random() * 10000)::numeric, 2), 'processada',
+                   timestamptz '2020-01-01' + (g % 2000) * interval '1 day' + random() * interval '1 day'
+            FROM generate_series(1, :n_notas) g
+        """),
+        ("itens de nota", """
+            WITH faixa AS (SELECT min(id) AS primeiro FROM materias_primas WHERE nome LIKE 'MP sintética %'),
+                 u AS (SELECT codigo FROM unidades ORDER BY id LIMIT 1)
+            INSERT INTO nota_itens
+                (nota_id, materia_prima_id, nome_no_documento, unidade_codigo, quantidade, valor_unitario, valor_total)
+            SELECT n.id, faixa.primeiro + floor(random() * :n_mp)::int, 'Item ' || i, u.codigo, 1, 10, 10
+            FROM notas n CROSS JOIN generate_series(1, :itens) i CROSS JOIN faixa CROSS JOIN u
+            WHERE n.serie = 'BENCH'
+        """),
+        ("produtos", """
+            INSERT INTO produtos (nome, is_active)
+            SELECT 'Produto sintético ' || g, true FROM generate_series(1, :n_prod) g
+        """),
+        ("componentes", """
+            WITH faixa AS (SELECT min(id) AS primeiro FROM materias_primas WHERE nome LIKE 'MP sintética %'),
+                 u AS (SELECT codigo FROM unidades ORDER BY id LIMIT 1)
+            INSERT INTO produto_componentes (produto_id, materia_prima_id, quantidade, unidade_codigo)
+            SELECT p.id, faixa.primeiro + floor(random() * :n_mp)::int, 1, u.codigo
+            FROM produtos p CROSS JOIN generate_series(1, 10) c CROSS JOIN faixa CROSS JOIN u
+            WHERE p.nome LIKE 'Produto sintético %'
+        """),
+        ("custos de produtos", """
+            INSERT INTO produto_precos (produto_id, custo_total, vigente_desde, vigente_ate)
+            SELECT p.id, round((random() * 1000)::numeric, 4),
+                   timestamptz '2020-01-01' + k * interval '30 days',
+                   CASE WHEN k < 20 THEN timestamptz '2020-01-01' + (k + 1) * interval '30 days' END
+            FROM produtos p CROSS JOIN generate_series(1, 20) k
+            WHERE p.nome LIKE 'Produto sintético %'
+        """),
+        ("auditoria", """
+            INSERT INTO audit_logs (user_id, entity, entity_id, action, created_at)
+            SELECT (SELECT id FROM users WHERE email = 'benchmark@local'),
+                   (ARRAY['nota', 'materia_prima', 'produto'])[1 + g % 3],
+                   1 + floor(random() * :n_notas)::int, 'update',
+                   now() - random() * interval '60 days'
+            FROM generate_series(1, :n_logs) g
+        """),
+    ]
+    for nome, sql in passos:
+        inicio = time.perf_counter()
+        conn.execute(text(sql), params)
+        conn.commit()
+        print(f"   • {nome}: {time.perf_counter() - inicio:.1f}s")
+
+
+def parametros(conn) -> dict:
+    """Escolhe valores representativos (do meio das faixas) para as consultas"""
+    linha = conn.execute(text("""
+        SELECT
+            (SELECT materia_prima_id FROM materia_prima_precos ORDER BY id
+             OFFSET (SELECT count(*) / 2 FROM materia_prima_precos) LIMIT 1),
+            (SELECT produto_id FROM produto_precos ORDER BY id
+             OFFSET (SELECT count(*) / 2 FROM produto_precos) LIMIT 1),
+            (SELECT nota_id FROM nota_itens ORDER BY id
+             OFFSET (SELECT count(*) / 2 FROM nota_itens) LIMIT 1),
+            (SELECT fornecedor_id FROM notas ORDER BY id
+             OFFSET (SELECT count(*) / 2 FROM notas) LIMIT 1)
+    """)).one()
+    return {
+        "mp": linha[0], "produto": linha[1], "nota": linha[2], "fornecedor": linha[3],
+        "ini": "2022-01-01", "fim": "2022-03-31",
+    }
+
+
+def _tipos_de_no(plano: dict) -> list:
+    tipos = []
+    no = plano.get("Node Type")
+    if no:
+        indice = plano.get("Index Name")
+        tipos.append(f"{no} ({indice})" if indice else no)
+    for filho in plano.get("Plans", []):
+        tipos.extend(_tipos_de_no(filho))
+    return tipos
+
+
+def medir(conn, params: dict, repeticoes: int = 5) -> dict:
+    """Melhor tempo de execução e nós do plano de cada consulta"""
+    conn.execute(text("ANALYZE"))
+    resultados = {}
+    for nome, sql in CONSULTAS.items():
+        melhor, plano = None, None
+        for _ in range(repeticoes):
+            saida = conn.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}"), params).scalar()
+            saida = saida if isinstance(saida, list) else json.loads(saida)
+            tempo = saida[0]["Execution Time"]
+            if melhor is None or tempo < melhor:
+                melhor, plano = tempo, saida[0]["Plan"]
+        resultados[nome] = {"ms": melhor, "nos": _tipos_de_no(plano)}
+    conn.rollback()
+    return resultados
+
+
+def _alembic(revisao: str) -> None:
+    cfg = Config(str(BACKEND_DIR / "alembic.ini"))
+    cfg.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    if revisao == "head":
+        command.upgrade(cfg, "head")
+    else:
+        command.downgrade(cfg, revisao)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compara planos de consulta sem e com os índices da 0004")
+    parser.add_argument("--gerar", action="store_true", help="gera os dados sintéticos antes de medir")
+    parser.add_argument("--materias-primas", type=int, default=20000)
+    parser.add_argument("--precos-por-mp", type=int, default=50)
+    parser.add_argument("--notas", type=int, default=20000)
+    parser.add_argument("--itens-por-nota", type=int, default=20)
+    parser.add_argument("--produtos", type=int, default=2000)
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        print("❌ O benchmark de índices requer PostgreSQL (DATABASE_URL)")
+        sys.exit(1)
+
+    _alembic("head")
+    with engine.connect() as conn:
+        if args.gerar:
+            print("🧪 Gerando dados sintéticos...")
+            gerar_dados(conn, args.materias_primas, args.precos_por_mp, args.notas,
+                        args.itens_por_nota, args.produtos)
+        params = parametros(conn)
+        if params["mp"] is None:
+            print("❌ Banco sem dados: execute com --gerar")
+            sys.exit(1)
+
+    print("📉 Medindo sem os índices (revisão 0003)...")
+    _alembic("0003")
+    with engine.connect() as conn:
+        antes = medir(conn, params)
+
+    print("📈 Medindo com os índices (revisão 0004)...")
+    _alembic("head")
+    with engine.connect() as conn:
+        depois = medir(conn, params)
+
+    print(f"\n{'consulta':<28}{'antes (ms)':>12}{'depois (ms)':>13}{'ganho':>9}")
+    for nome in CONSULTAS:
+        a, d = antes[nome]["ms"], depois[nome]["ms"]
+        print(f"{nome:<28}{a:>12.3f}{d:>13.3f}{a / d if d else float('inf'):>8.1f}x")
+    print("\nPlanos:")
+    for nome in CONSULTAS:
+        print(f"  {nome}")
+        print(f"    antes:  {' > '.join(antes[nome]['nos'])}")
+        print(f"    depois: {' > '.join(depois[nome]['nos'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,11 @@
 from celery import Celery
+from celery.signals import worker_init
 from app.config import get_settings
+from app.utils.metrics import conectar_sinais_celery
+# Registra nas sessões dos workers a invalidação do cache de respostas (tags no Redis)
+import app.utils.http_cache  # noqa: F401
+# ...e a manutenção do agregado do resumo dos históricos
+import app.services.resumo_historicos  # noqa: F401
 
 settings = get_settings()
 
@@ -11,7 +17,8 @@ celery_app = Celery(
     include=[
         "app.tasks.email_tasks",
         "app.tasks.parsing_tasks",
-        "app.tasks.price_tasks"
+        "app.tasks.price_tasks",
+        "app.tasks.maintenance_tasks"
     ]
 )
 
@@ -54,7 +61,34 @@ celery_app.conf.beat_schedule = {
         "task": "app.tasks.maintenance_tasks.limpar_logs_antigos",
         "schedule": 86400.0,  # A cada dia
     },
+    "corrigir-precos-sobrepostos": {
+        "task": "app.tasks.maintenance_tasks.corrigir_precos_sobrepostos",
+        "schedule": 86400.0,  # A cada dia, só relata; a correção é disparada manualmente
+        "kwargs": {"apenas_verificar": True},
+    },
+    "verificar-integridade": {
+        "task": "app.tasks.maintenance_tasks.verificar_integridade",
+        "schedule": 86400.0,  # A cada dia, só o que mudou desde a última verificação
+        "kwargs": {"incremental": True},
+    },
+    "verificar-integridade-completa": {
+        "task": "app.tasks.maintenance_tasks.verificar_integridade",
+        "schedule": 604800.0,  # A cada semana, todas as linhas
+    },
 }
 
+
+@worker_init.connect
+def _atualizar_esquema_sqlite(**_):
+    """SQLite (docker-compose): mesmo ajuste de esquema que a API faz ao iniciar"""
+    from app import esquema_sqlite
+    from app.database import engine
+    esquema_sqlite.atualizar(engine)
+
+
+# Duração e falhas das tarefas, exportadas pela API em /metrics
+if settings.METRICS_ENABLED:
+    conectar_sinais_celery()
+
 if __name__ == "__main__":
     celery_app.start() 
\ No newline at end of file
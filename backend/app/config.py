@@ -61,19 +61,61 @@ class Settings(BaseSettings):
     # ---- Hosts confiáveis ----
     ALLOWED_HOSTS: list[str] = ["*"]  # pode ser sobrescrito por ALLOWED_HOSTS no .env
     
+    # ---- Redis / Celery ----
+    REDIS_URL: str = "redis://localhost:6379/0"
+
     # ---- Upload ----
     UPLOAD_DIR: str = "uploads"  # diretório para uploads de arquivos
+    UPLOAD_SESSAO_IA_HORAS: int = 24  # PDFs de sessão do uploads-ia sem nota são removidos após esse prazo
     
     # ---- API Server ----
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
 
+    # ---- Autenticação ----
+    AUTH_USER_CACHE_TTL: int = 30  # segundos; 0 desativa o cache de usuários
+    AUTH_USER_CACHE_MAX_SIZE: int = 1000
+    BCRYPT_ROUNDS: int = 12  # alterar o custo faz os hashes serem refeitos no próximo login
+    PASSWORD_HASH_WORKERS: int = 4
+
+    # ---- Auditoria ----
+    AUDIT_BUFFER_ENABLED: bool = True  # False grava cada log na própria requisição
+    AUDIT_BUFFER_MAX_SIZE: int = 10000  # acima disso log_audit grava de forma síncrona
+    AUDIT_FLUSH_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_INTERVAL: float = 2.0  # segundos
+
+    # ---- Logging ----
+    LOG_LEVEL: str = "INFO"  # DEBUG liga o detalhamento de parsing, notas e produtos finais
+    LOG_FORMAT: str = "texto"  # "json" para uma linha estruturada por registro
+
+    # ---- Profiling de requisições ----
+    PROFILER_ENABLED: bool = True  # Server-Timing e contagem de consultas SQL por requisição
+    SLOW_REQUEST_MS: float = 1000.0  # acima disso a requisição é registrada com as instruções SQL
+    SLOW_REQUEST_QUERIES: int = 100  # idem para a quantidade de consultas (N+1)
+    PROFILER_TOP_QUERIES: int = 5  # instruções listadas no log de requisição lenta
+
+    # ---- Cache de respostas (ETag / Redis) ----
+    HTTP_CACHE_TTL: int = 300  # segundos; sem Redis limita o atraso entre workers. 0 desativa o cache
+    HTTP_CACHE_MAX_ENTRIES: int = 256
+    HTTP_CACHE_REDIS: bool = True  # versões e respostas compartilhadas entre workers via REDIS_URL
+
+    # ---- Métricas ----
+    METRICS_ENABLED: bool = True  # expõe /metrics (Prometheus)
+
+    # ---- Análise de variações de preço ----
+    ANALISE_VARIACAO_ZSCORE: float = 3.0  # |z| acima disso conta como variação anômala
+
+    # ---- Backup ----
+    BACKUP_DIR: str = "backups"
+    BACKUP_CHUNK_MB: int = 64  # tamanho (não compactado) de cada parte do arquivo
+
     # ---- Document AI / IA ----
     GOOGLE_APPLICATION_CREDENTIALS: Optional[str] = None
     GCP_PROJECT_ID: Optional[str] = None
     GCP_LOCATION: str = "us"
     GCP_PROCESSOR_ID_INVOICE: Optional[str] = None
     USE_DOCUMENT_AI: bool = True
+    DANFE_CONFIANCA_MINIMA: float = 0.9  # itens lidos do layout do PDF acima disso dispensam o Document AI
 
     @property
     def cors_origins_list(self) -> list[str]:
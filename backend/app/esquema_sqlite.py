@@ -0,0 +1,133 @@
+"""
+Atualização do esquema no banco SQLite (padrão do docker-compose).
+
+O SQLite não passa pelas migrações do Alembic (a 0001 é específica do
+PostgreSQL), então as colunas, tabelas e índices das migrações seguintes de que
+os modelos dependem são criados aqui, na inicialização da API e dos workers.
+Cada passo confere o esquema antes de alterar e pode rodar a cada início.
+"""
+import logging
+from typing import Callable, List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.models import Base
+from app.models.historico_resumo import AnaliseVariacaoPreco, VariacaoPrecoDiaria
+from app.models.verificacao_integridade import VerificacaoIntegridade
+from app.services import embalagem, resumo_historicos
+from app.utils import http_cache
+
+logger = logging.getLogger(__name__)
+
+LOTE = 5000
+ESPERA_LOCK_MS = 120_000  # outro processo aplicando os passos (carga inicial em bases grandes)
+
+
+def _colunas(conn: Connection, tabela: str) -> set:
+    return {coluna["name"] for coluna in inspect(conn).get_columns(tabela)}
+
+
+def _dados_alterados(conn: Connection, tabela: str) -> None:
+    """Tabelas cujos dados o passo reescreveu: o cache HTTP é invalidado após o commit"""
+    conn.info.setdefault("tabelas_alteradas", set()).add(tabela)
+
+
+def _embalagem_materias_primas(conn: Connection) -> None:
+    """Migração 0006: tamanho de embalagem interpretado do nome"""
+    if not inspect(conn).has_table("materias_primas"):
+        return
+    novas = [
+        ("nome_exibicao", "VARCHAR"),
+        ("embalagem_quantidade", "NUMERIC(14, 4)"),
+        ("embalagem_unidade", "VARCHAR(10)"),
+    ]
+    existentes = _colunas(conn, "materias_primas")
+    faltando = [(nome, tipo) for nome, tipo in novas if nome not in existentes]
+    if not faltando:
+        return
+    for nome, tipo in faltando:
+        conn.execute(text(f"ALTER TABLE materias_primas ADD COLUMN {nome} {tipo}"))
+
+    atualizar = text(
+        "UPDATE materias_primas SET nome_exibicao = :nome_exibicao, "
+        "embalagem_quantidade = :embalagem_quantidade, embalagem_unidade = :embalagem_unidade WHERE id = :id"
+    )
+    linhas = [{"id": id_, **embalagem.interpretar(nome)}
+              for id_, nome in conn.execute(text("SELECT id, nome FROM materias_primas"))]
+    for inicio in range(0, len(linhas), LOTE):
+        conn.execute(atualizar, linhas[inicio:inicio + LOTE])
+    _dados_alterados(conn, "materias_primas")
+    logger.info("SQLite: colunas de embalagem adicionadas em materias_primas (%s linhas)", len(linhas))
+
+
+def _variacoes_preco_diarias(conn: Connection) -> None:
+    """Migração 0005: agregado diário do resumo dos históricos, mantido a cada flush de preços"""
+    if inspect(conn).has_table("variacoes_preco_diarias"):
+        return
+    VariacaoPrecoDiaria.__table__.create(conn)
+    # Carga inicial só dos tipos cuja tabela de preços existe neste banco
+    tipos = [tipo for tipo, (modelo, _, _) in resumo_historicos.TIPOS.items()
+             if inspect(conn).has_table(modelo.__tablename__)]
+    linhas = resumo_historicos.reconstruir(conn, tipos)
+    _dados_alterados(conn, VariacaoPrecoDiaria.__tablename__)
+    logger.info("SQLite: variacoes_preco_diarias criada (%s linhas)", linhas)
+
+
+def _criar_tabelas(conn: Connection) -> None:
+    """Tabelas novas sem carga inicial (migrações 0008 em diante)"""
+    for tabela in (AnaliseVariacaoPreco.__table__, VerificacaoIntegridade.__table__):
+        if not inspect(conn).has_table(tabela.name):
+            tabela.create(conn)
+            logger.info("SQLite: tabela %s criada", tabela.name)
+
+
+def _indices(conn: Connection) -> None:
+    """Índices declarados nos modelos (migrações 0004 e 0007, ix_audit_logs_created_at...)"""
+    criados = []
+    for tabela in Base.metadata.sorted_tables:
+        if not inspect(conn).has_table(tabela.name):
+            continue
+        colunas = _colunas(conn, tabela.name)
+        for indice in sorted(tabela.indexes, key=lambda i: i.name):
+            # Índices únicos falhariam com duplicados já gravados; as restrições do banco ficam como estão.
+            # Só a chave primária (index=True no id) é redundante: no SQLite ela já é o rowid.
+            nomes = {c.name for c in indice.columns}
+            if indice.unique or not nomes <= colunas or nomes <= {c.name for c in tabela.primary_key}:
+                continue
+            if indice.name not in {i["name"] for i in inspect(conn).get_indexes(tabela.name)}:
+                indice.create(conn)
+                criados.append(indice.name)
+    if criados:
+        # Estatísticas para o planejador escolher os índices novos
+        conn.execute(text("ANALYZE"))
+        logger.info("SQLite: índices criados: %s", ", ".join(criados))
+
+
+PASSOS: List[Callable[[Connection], None]] = [
+    _embalagem_materias_primas,
+    _variacoes_preco_diarias,
+    _criar_tabelas,
+    _indices,
+]
+
+
+def atualizar(engine: Engine) -> None:
+    """Aplica os passos pendentes; no PostgreSQL o esquema vem do Alembic"""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        espera_original = conn.exec_driver_sql("PRAGMA busy_timeout").scalar()
+        conn.exec_driver_sql(f"PRAGMA busy_timeout = {ESPERA_LOCK_MS}")
+        try:
+            # API e workers iniciam juntos: o lock de escrita vem antes de conferir o esquema,
+            # então os outros processos esperam e encontram os passos já aplicados
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            for passo in PASSOS:
+                passo(conn)
+        finally:
+            conn.exec_driver_sql(f"PRAGMA busy_timeout = {espera_original}")
+        alteradas = conn.info.pop("tabelas_alteradas", set())
+    # Respostas em cache no Redis sobrevivem ao reinício
+    if alteradas:
+        http_cache.invalidar(*alteradas)
@@ -1,7 +1,8 @@
 ﻿from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from sqlalchemy import text
@@ -10,20 +11,24 @@ import time
 from contextlib import asynccontextmanager
 
 from app.config import get_settings
+from app import esquema_sqlite
 from app.database import engine
 from app.models import load_all_models
+from app.utils.audit import start_audit_writer, stop_audit_writer
+from app.utils import metrics, profiler
+# Mantém o agregado do resumo dos históricos a cada preço gravado pelas sessões
+from app.services import resumo_historicos  # noqa: F401
+from app.utils.log import configurar_logging, encerrar_logging
 from app.api import integracoes_router, usuarios_router, fornecedores_router, produtos_router, produtos_finais_router
 from app.api.uploads import router as uploads_router
 from app.api.uploads_ia import router as uploads_ia_router
 from app.api.notas import router as notas_router
 from app.api.unidades import router as unidades_router
 from app.api.materias_primas import router as materias_primas_router
+from app.api.historicos import router as historicos_router
 
 # ConfiguraÃ§Ã£o de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+configurar_logging()
 logger = logging.getLogger(__name__)
 
 # Garante que todos os modelos sejam carregados
@@ -31,6 +36,14 @@ load_all_models()
 
 settings = get_settings()
 
+# Contagem/tempo de consultas SQL por requisição (Server-Timing)
+if settings.PROFILER_ENABLED:
+    profiler.instalar(engine)
+
+# Pool do banco e métricas dos workers Celery em /metrics
+if settings.METRICS_ENABLED:
+    metrics.registrar_coletores(engine)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -51,8 +64,17 @@ async def lifespan(app: FastAPI):
         logger.error(f"Erro ao conectar com banco de dados: {e}")
         raise
     
+    # SQLite (docker-compose) não roda as migrações do Alembic
+    esquema_sqlite.atualizar(engine)
+    
+    start_audit_writer()
+    
     yield
     
+    stop_audit_writer()
+    metrics.encerrar_processo()
+    encerrar_logging()
+    
     # Shutdown
     logger.info("Encerrando aplicaÃ§Ã£o NFE...")
 
@@ -114,23 +136,37 @@ async def log_requests(request: Request, call_next):
         request_id = str(uuid.uuid4())
     
     # Adicionar request_id ao logger
-    logger.info(
-        f"[{request_id}] Request: {request.method} {request.url.path} - "
-        f"Client: {request.client.host if request.client else 'unknown'} - "
-        f"User-Agent: {request.headers.get('user-agent', 'unknown')}"
+    logger.debug(
+        "[%s] Request: %s %s - Client: %s - User-Agent: %s",
+        request_id, request.method, request.url.path,
+        request.client.host if request.client else "unknown",
+        request.headers.get("user-agent", "unknown"),
     )
     
-    response = await call_next(request)
+    token_perfil = profiler.iniciar() if settings.PROFILER_ENABLED else None
+    try:
+        response = await call_next(request)
+    finally:
+        perfil = profiler.encerrar(token_perfil) if token_perfil is not None else None
     
     # Adicionar X-Request-ID ao response
     response.headers["X-Request-ID"] = request_id
     
     # Log da resposta
     process_time = time.time() - start_time
+    if settings.METRICS_ENABLED:
+        metrics.observar_requisicao(request, response.status_code, process_time)
+    consultas, tempo_db = 0, 0.0
+    if perfil is not None:
+        response.headers["Server-Timing"] = perfil.server_timing(process_time)
+        consultas, tempo_db = perfil.consultas, perfil.tempo_db
+        profiler.registrar_requisicao(
+            perfil, request_id, request.method, request.url.path, response.status_code, process_time
+        )
     logger.info(
-        f"[{request_id}] Response: {request.method} {request.url.path} - "
-        f"Status: {response.status_code} - "
-        f"Time: {process_time:.3f}s"
+        "[%s] Response: %s %s - Status: %s - Time: %.3fs - DB: %d consultas em %.1fms",
+        request_id, request.method, request.url.path, response.status_code,
+        process_time, consultas, tempo_db * 1000,
     )
     
     return response
@@ -140,7 +176,7 @@ async def log_requests(request: Request, call_next):
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handler para erros de validaÃ§Ã£o de requisiÃ§Ã£o"""
-    logger.warning(f"Validation error: {exc.errors()}")
+    logger.warning("Validation error: %s", exc.errors())
     return JSONResponse(
         status_code=422,
         content={
@@ -154,7 +190,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     """Handler para exceÃ§Ãµes HTTP"""
-    logger.warning(f"HTTP error {exc.status_code}: {exc.detail}")
+    logger.warning("HTTP error %s: %s", exc.status_code, exc.detail)
     return JSONResponse(
         status_code=exc.status_code,
         content={
@@ -212,6 +248,15 @@ async def health_check():
         "debug": DEBUG
     }
 
+# Métricas no formato Prometheus
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    if not settings.METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    # A coleta lê o Redis de forma síncrona
+    conteudo, content_type = await run_in_threadpool(metrics.gerar)
+    return Response(content=conteudo, headers={"Content-Type": content_type})
+
 # Test endpoint simples
 @app.get("/test")
 async def test_endpoint():
@@ -255,6 +300,7 @@ app.include_router(uploads_router)
 app.include_router(uploads_ia_router)
 app.include_router(unidades_router)
 app.include_router(materias_primas_router)
+app.include_router(historicos_router)
 
 
 if __name__ == "__main__":
@@ -7,6 +7,8 @@ from .unidade import Unidade
 from .materia_prima import MateriaPrima
 from .nota import Nota
 from .audit import AuditLog
+from .historico_resumo import VariacaoPrecoDiaria, AnaliseVariacaoPreco
+from .verificacao_integridade import VerificacaoIntegridade
 
 def load_all_models() -> None:
     import app.models.user
@@ -17,6 +19,8 @@ def load_all_models() -> None:
     import app.models.produto
     import app.models.produto_final
     import app.models.audit
+    import app.models.historico_resumo
+    import app.models.verificacao_integridade
 
 __all__ = [
     "Base",
@@ -28,5 +32,8 @@ __all__ = [
     "Unidade",
     "MateriaPrima",
     "Nota",
-    "AuditLog"
+    "AuditLog",
+    "VariacaoPrecoDiaria",
+    "AnaliseVariacaoPreco",
+    "VerificacaoIntegridade"
 ] 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, DateTime, ForeignKey, JSON
+from sqlalchemy import String, Integer, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.dialects.postgresql import ENUM
 from sqlalchemy.sql import func
 from app.models.base import Base
@@ -7,6 +7,9 @@ from app.models.enums import AuditAction
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("ix_audit_logs_entity", "entity", "entity_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
@@ -15,6 +18,7 @@ class AuditLog(Base):
     action: Mapped[AuditAction] = mapped_column(ENUM(AuditAction, name='auditaction', create_type=False), nullable=False)
     changes: Mapped[dict | None] = mapped_column(JSON, nullable=True)
     ip_address: Mapped[str | None] = mapped_column(nullable=True)
-    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default="now()")
+    # No PostgreSQL a tabela é particionada por mês em created_at (migração 0003)
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default="now()", index=True)
 
     user: Mapped["User"] = relationship("User") 
\ No newline at end of file
@@ -0,0 +1,42 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Integer, Float, Date, DateTime, Index
+from app.models.base import Base
+
+
+class VariacaoPrecoDiaria(Base):
+    """Agregado diário das variações de preço por item (matéria-prima ou produto)
+
+    Mantido por app.services.resumo_historicos a cada preço gravado; o resumo
+    dos históricos soma estas linhas em vez de percorrer as tabelas de preços.
+    """
+    __tablename__ = "variacoes_preco_diarias"
+    __table_args__ = (
+        Index("ix_variacoes_preco_diarias_tipo_dia", "tipo", "dia"),
+    )
+
+    tipo: Mapped[str] = mapped_column(String(20), primary_key=True)  # "materia_prima" | "produto"
+    item_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    dia: Mapped[Date] = mapped_column(Date, primary_key=True)
+    total_precos: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Soma de |preço - preço anterior do item| (0 para o primeiro preço)
+    soma_variacao_abs: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+class AnaliseVariacaoPreco(Base):
+    """Estatísticas das variações de preço de cada matéria-prima numa janela de dias
+
+    Gravada por app.tasks.price_tasks.analisar_variacoes_precos (uma linha por
+    matéria-prima e janela; cada execução substitui as linhas da sua janela).
+    """
+    __tablename__ = "analises_variacao_preco"
+
+    periodo_dias: Mapped[int] = mapped_column(Integer, primary_key=True)
+    materia_prima_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    analisado_em: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+    total_variacoes: Mapped[int] = mapped_column(Integer, nullable=False)
+    maior_variacao_abs: Mapped[float] = mapped_column(Float, nullable=False)
+    maior_variacao_pct: Mapped[float] = mapped_column(Float, nullable=False)
+    variacao_media_pct: Mapped[float] = mapped_column(Float, nullable=False)
+    volatilidade_pct: Mapped[float] = mapped_column(Float, nullable=False)  # desvio padrão das variações %
+    maior_zscore: Mapped[float] = mapped_column(Float, nullable=False)
+    anomalias: Mapped[int] = mapped_column(Integer, nullable=False)  # variações com |z| acima do limite
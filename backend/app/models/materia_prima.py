@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, Boolean, Float, DateTime, ForeignKey, Numeric
+from sqlalchemy import String, Integer, Boolean, Float, DateTime, ForeignKey, Numeric, Index, event, inspect, text
 from app.models.base import Base
+from app.services import embalagem
 from typing import Optional
 
 
@@ -12,6 +13,10 @@ class MateriaPrima(Base):
     unidade_codigo: Mapped[str] = mapped_column(String(10), ForeignKey("unidades.codigo"), nullable=False)
     menor_unidade_codigo: Mapped[Optional[str]] = mapped_column(String(10), ForeignKey("unidades.codigo"), nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    # Derivados do nome ao gravar (app.services.embalagem)
+    nome_exibicao: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    embalagem_quantidade: Mapped[Optional[float]] = mapped_column(Numeric(14, 4), nullable=True)
+    embalagem_unidade: Mapped[Optional[str]] = mapped_column(String(10), nullable=True)
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default="now()")
     updated_at: Mapped[Optional[DateTime]] = mapped_column(DateTime(timezone=True), server_default="now()", onupdate="now()", nullable=True)
     
@@ -23,8 +28,24 @@ class MateriaPrima(Base):
     produto_componentes: Mapped[list["ProdutoComponente"]] = relationship("ProdutoComponente", back_populates="materia_prima")
 
 
+@event.listens_for(MateriaPrima, "before_insert")
+@event.listens_for(MateriaPrima, "before_update")
+def _derivar_embalagem(mapper, connection, alvo):
+    if alvo.nome_exibicao is None or inspect(alvo).attrs.nome.history.has_changes():
+        for coluna, valor in embalagem.interpretar(alvo.nome).items():
+            setattr(alvo, coluna, valor)
+
+
 class MateriaPrimaPreco(Base):
     __tablename__ = "materia_prima_precos"
+    __table_args__ = (
+        Index("ix_materia_prima_precos_atual", "materia_prima_id",
+              postgresql_where=text("vigente_ate IS NULL"), sqlite_where=text("vigente_ate IS NULL")),
+        Index("ix_materia_prima_precos_mp_vigente_ate", "materia_prima_id", "vigente_ate"),
+        Index("ix_materia_prima_precos_mp_vigente_desde", "materia_prima_id", "vigente_desde"),
+        Index("ix_materia_prima_precos_vigente_desde", "vigente_desde"),
+        # No PostgreSQL com btree_gist: GiST (materia_prima_id, intervalo de vigência), migração 0007
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     materia_prima_id: Mapped[int] = mapped_column(ForeignKey("materias_primas.id"), nullable=False)
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, Float, DateTime, ForeignKey, Boolean, Numeric, Date
+from sqlalchemy import String, Integer, Float, DateTime, ForeignKey, Boolean, Numeric, Date, Index, text
 from app.models.base import Base
 from app.models.enums import StatusNota
 from typing import Optional, List
@@ -8,6 +8,10 @@ from sqlalchemy import func
 
 class Nota(Base):
     __tablename__ = "notas"
+    __table_args__ = (
+        Index("ix_notas_created_at", "created_at"),
+        Index("ix_notas_fornecedor_emissao", "fornecedor_id", "emissao_date"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     numero: Mapped[str] = mapped_column(String(50), nullable=False)
@@ -33,6 +37,12 @@ class Nota(Base):
 
 class NotaItem(Base):
     __tablename__ = "nota_itens"
+    __table_args__ = (
+        Index("ix_nota_itens_nota_id", "nota_id"),
+        Index("ix_nota_itens_materia_prima_id", "materia_prima_id",
+              postgresql_where=text("materia_prima_id IS NOT NULL"),
+              sqlite_where=text("materia_prima_id IS NOT NULL")),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     nota_id: Mapped[int] = mapped_column(ForeignKey("notas.id"), nullable=False)
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, Boolean, Float, DateTime, ForeignKey
+from sqlalchemy import String, Integer, Boolean, Float, DateTime, ForeignKey, Index, text
 from app.models.base import Base
 
 class Produto(Base):
@@ -25,6 +25,10 @@ class Produto(Base):
 
 class ProdutoComponente(Base):
     __tablename__ = "produto_componentes"
+    __table_args__ = (
+        Index("ix_produto_componentes_materia_prima_id", "materia_prima_id"),
+        Index("ix_produto_componentes_produto_id", "produto_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     produto_id: Mapped[int] = mapped_column(ForeignKey("produtos.id"), nullable=False)
@@ -38,6 +42,13 @@ class ProdutoComponente(Base):
 
 class ProdutoPreco(Base):
     __tablename__ = "produto_precos"
+    __table_args__ = (
+        Index("ix_produto_precos_atual", "produto_id",
+              postgresql_where=text("vigente_ate IS NULL"), sqlite_where=text("vigente_ate IS NULL")),
+        Index("ix_produto_precos_produto_vigente_desde", "produto_id", "vigente_desde"),
+        Index("ix_produto_precos_vigente_desde", "vigente_desde"),
+        # No PostgreSQL com btree_gist: GiST (produto_id, intervalo de vigência), migração 0007
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     produto_id: Mapped[int] = mapped_column(ForeignKey("produtos.id"), nullable=False)
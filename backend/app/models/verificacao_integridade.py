@@ -0,0 +1,22 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Integer, DateTime, JSON, Index
+from app.models.base import Base
+
+
+class VerificacaoIntegridade(Base):
+    """Execuções de app.tasks.maintenance_tasks.verificar_integridade
+
+    O iniciada_em da última execução concluída é a marca d'água do modo
+    incremental: só linhas criadas/alteradas a partir dela são examinadas.
+    """
+    __tablename__ = "verificacoes_integridade"
+    __table_args__ = (
+        Index("ix_verificacoes_integridade_concluida_em", "concluida_em"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    modo: Mapped[str] = mapped_column(String(20), nullable=False)  # "completa" | "incremental"
+    iniciada_em: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+    concluida_em: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)  # null = falhou
+    problemas_encontrados: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    problemas: Mapped[list | None] = mapped_column(JSON, nullable=True)
@@ -3,7 +3,7 @@ from .fornecedor import FornecedorCreate, FornecedorUpdate, FornecedorResponse
 from .unidade import UnidadeResponse
 from .materia_prima import MateriaPrimaCreate, MateriaPrimaUpdate, MateriaPrimaResponse, MateriaPrimaPrecoCreate
 from .nota import NotaCreate, NotaUpdate, NotaResponse, NotaItemCreate, NotaItemResponse
-from .produto import ProdutoCreate, ProdutoUpdate, ProdutoResponse, ProdutoComponenteCreate
+from .produto import ProdutoCreate, ProdutoUpdate, ProdutoResponse, ProdutoComponenteCreate, SimulacaoPrecosRequest
 from .common import PaginatedResponse
 
 __all__ = [
@@ -12,6 +12,6 @@ __all__ = [
     "UnidadeResponse",
     "MateriaPrimaCreate", "MateriaPrimaUpdate", "MateriaPrimaResponse", "MateriaPrimaPrecoCreate",
     "NotaCreate", "NotaUpdate", "NotaResponse", "NotaItemCreate", "NotaItemResponse",
-    "ProdutoCreate", "ProdutoUpdate", "ProdutoResponse", "ProdutoComponenteCreate",
+    "ProdutoCreate", "ProdutoUpdate", "ProdutoResponse", "ProdutoComponenteCreate", "SimulacaoPrecosRequest",
     "PaginatedResponse"
 ] 
\ No newline at end of file
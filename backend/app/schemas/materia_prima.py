@@ -1,5 +1,6 @@
 from pydantic import BaseModel, validator
 from typing import Optional, List
+from datetime import datetime
 from decimal import Decimal
 
 
@@ -62,4 +63,19 @@ class MateriaPrimaResponse(BaseModel):
     precos: Optional[List[MateriaPrimaPrecoResponse]] = []
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+
+class PrecoVigenteConsulta(BaseModel):
+    materia_prima_id: int
+    data: datetime
+
+
+class PrecosVigentesRequest(BaseModel):
+    consultas: List[PrecoVigenteConsulta]
+
+    @validator('consultas')
+    def validate_consultas(cls, v):
+        if len(v) > 5000:
+            raise ValueError('Máximo de 5000 consultas por requisição')
+        return v
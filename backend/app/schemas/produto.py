@@ -67,4 +67,42 @@ class ProdutoResponse(BaseModel):
     historico_precos: List[ProdutoPrecoResponse] = []
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class VariacaoPreco(BaseModel):
+    materia_prima_id: Optional[int] = None
+    nome_contem: Optional[str] = None  # todas as matérias-primas cujo nome contém o trecho
+    percentual: Optional[float] = None  # sobre o preço vigente
+    preco: Optional[Decimal] = None  # preço absoluto (tem precedência sobre percentual)
+
+    @validator('nome_contem', always=True)
+    def validate_alvo(cls, v, values):
+        if values.get('materia_prima_id') is None and not (v or '').strip():
+            raise ValueError('Deve fornecer materia_prima_id ou nome_contem')
+        return v
+
+    @validator('preco', always=True)
+    def validate_valor(cls, v, values):
+        if v is None and values.get('percentual') is None:
+            raise ValueError('Deve fornecer percentual ou preco')
+        if v is not None and v < 0:
+            raise ValueError('Preço não pode ser negativo')
+        return v
+
+
+class CenarioPreco(BaseModel):
+    nome: str
+    variacoes: List[VariacaoPreco]
+
+
+class SimulacaoPrecosRequest(BaseModel):
+    cenarios: List[CenarioPreco]
+    limite_produtos: int = 50  # produtos mais afetados listados por cenário
+
+    @validator('cenarios')
+    def validate_cenarios(cls, v):
+        if not v:
+            raise ValueError('Informe ao menos um cenário')
+        if len(v) > 500:
+            raise ValueError('Máximo de 500 cenários por simulação')
+        return v
@@ -0,0 +1,93 @@
+"""
+Estatísticas das variações consecutivas de preço das matérias-primas numa janela.
+
+Uma consulta só, com janelas: os preços criados na janela recebem o preço
+anterior da mesma matéria-prima (lag por vigente_desde), cada par vira uma
+variação absoluta e percentual, e a média e a variância das variações % de
+cada matéria-prima saem de janelas por materia_prima_id. O agrupamento final
+devolve uma linha por matéria-prima: quantidade, maiores variações, média,
+variância, maior desvio quadrático e quantas variações passam do z-score limite.
+
+A variância é avg(x²) - avg(x)² e a comparação com o limite é feita ao quadrado,
+sem stddev/sqrt no SQL, para o mesmo cálculo rodar no PostgreSQL e no SQLite.
+
+O resultado vai para analises_variacao_preco (uma linha por matéria-prima e
+janela), e não para o resultado da tarefa no Redis.
+"""
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import and_, case, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.historico_resumo import AnaliseVariacaoPreco
+from app.models.materia_prima import MateriaPrimaPreco
+
+
+def _consulta(limite: datetime, zscore: float):
+    precos = MateriaPrimaPreco.__table__
+    anterior = func.lag(precos.c.valor_unitario).over(
+        partition_by=precos.c.materia_prima_id, order_by=(precos.c.vigente_desde, precos.c.id)
+    )
+    base = select(
+        precos.c.materia_prima_id, precos.c.valor_unitario.label("valor"), anterior.label("anterior"),
+    ).where(precos.c.created_at >= limite).subquery("base")
+
+    diferenca = base.c.valor - base.c.anterior
+    variacoes = select(
+        base.c.materia_prima_id,
+        diferenca.label("abs"),
+        case((base.c.anterior > 0, diferenca * 100.0 / base.c.anterior), else_=0.0).label("pct"),
+    ).where(base.c.anterior.isnot(None)).subquery("variacoes")
+
+    janela = {"partition_by": variacoes.c.materia_prima_id}
+    media = func.avg(variacoes.c.pct).over(**janela)
+    estatisticas = select(
+        variacoes.c.materia_prima_id, variacoes.c.abs, variacoes.c.pct,
+        media.label("media"),
+        (func.avg(variacoes.c.pct * variacoes.c.pct).over(**janela) - media * media).label("variancia"),
+    ).subquery("estatisticas")
+
+    desvio = (estatisticas.c.pct - estatisticas.c.media) * (estatisticas.c.pct - estatisticas.c.media)
+    anomala = and_(estatisticas.c.variancia > 0, desvio > zscore * zscore * estatisticas.c.variancia)
+    return select(
+        estatisticas.c.materia_prima_id,
+        func.count().label("total"),
+        func.max(estatisticas.c.abs).label("maior_abs"),
+        func.max(estatisticas.c.pct).label("maior_pct"),
+        func.max(estatisticas.c.media).label("media"),
+        func.max(estatisticas.c.variancia).label("variancia"),
+        func.max(desvio).label("maior_desvio"),
+        func.sum(case((anomala, 1), else_=0)).label("anomalias"),
+    ).group_by(estatisticas.c.materia_prima_id)
+
+
+def analisar(db: Session, periodo_dias: int, zscore: float) -> List[Dict]:
+    """Uma linha (colunas de analises_variacao_preco) por matéria-prima com variação na janela"""
+    agora = datetime.now()
+    linhas = []
+    for mp_id, total, maior_abs, maior_pct, media, variancia, maior_desvio, anomalias in db.execute(
+        _consulta(agora - timedelta(days=periodo_dias), zscore)
+    ):
+        volatilidade = math.sqrt(max(float(variancia), 0.0))
+        linhas.append({
+            "periodo_dias": periodo_dias,
+            "materia_prima_id": mp_id,
+            "analisado_em": agora,
+            "total_variacoes": total,
+            "maior_variacao_abs": float(maior_abs),
+            "maior_variacao_pct": float(maior_pct),
+            "variacao_media_pct": float(media),
+            "volatilidade_pct": volatilidade,
+            "maior_zscore": math.sqrt(max(float(maior_desvio), 0.0)) / volatilidade if volatilidade else 0.0,
+            "anomalias": int(anomalias or 0),
+        })
+    return linhas
+
+
+def gravar(db: Session, periodo_dias: int, linhas: List[Dict]) -> None:
+    """Substitui as linhas da janela (commit fica com quem chama)"""
+    db.execute(delete(AnaliseVariacaoPreco).where(AnaliseVariacaoPreco.periodo_dias == periodo_dias))
+    if linhas:
+        db.execute(insert(AnaliseVariacaoPreco), linhas)
@@ -0,0 +1,388 @@
+"""
+Backup do banco em arquivos CSV/SQLite compactados e divididos em partes.
+
+PostgreSQL: cada tabela é exportada com COPY ... TO STDOUT dentro de uma única
+transação REPEATABLE READ somente leitura (snapshot consistente, sem bloquear
+escritas). SQLite: o backup completo usa a API de backup online; o incremental
+exporta as linhas alteradas em CSV. Nada é carregado inteiro em memória.
+"""
+from __future__ import annotations
+
+import csv
+import gzip
+import hashlib
+import io
+import json
+import logging
+import sqlite3
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.database import engine
+from app.models import Base, load_all_models
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+_READ_SIZE = 1024 * 1024
+
+# Tabelas sem colunas de data: no modo incremental seguem as alterações da tabela pai
+_INCREMENTAL_PARENT = {
+    "nota_itens": ("nota_id", "notas", "id"),
+    "produto_componentes": ("produto_id", "produtos", "id"),
+}
+
+
+class _HashingFile:
+    """Arquivo binário que calcula sha256 e tamanho do que é gravado"""
+
+    def __init__(self, path: Path):
+        self._file = open(path, "wb")
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.sha256.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ChunkedGzipWriter:
+    """Grava um fluxo em partes gzip de até chunk_bytes (não compactados) cada"""
+
+    def __init__(self, directory: Path, name: str, chunk_bytes: int):
+        self.directory = directory
+        self.name = name
+        self.chunk_bytes = chunk_bytes
+        self.parts: List[Dict[str, Any]] = []
+        self._raw: Optional[_HashingFile] = None
+        self._gzip: Optional[gzip.GzipFile] = None
+        self._written = 0
+
+    def _open_part(self) -> None:
+        path = self.directory / f"{self.name}.gz.{len(self.parts):03d}"
+        self._raw = _HashingFile(path)
+        self._gzip = gzip.GzipFile(filename=self.name, mode="wb", fileobj=self._raw)
+        self._written = 0
+        self.parts.append({"arquivo": path.name})
+
+    def _close_part(self) -> None:
+        if self._gzip is None:
+            return
+        self._gzip.close()
+        self._raw.close()
+        self.parts[-1].update({"bytes": self._raw.size, "sha256": self._raw.sha256.hexdigest()})
+        self._gzip = None
+        self._raw = None
+
+    def write(self, data) -> int:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        data = bytes(data)
+        view = memoryview(data)
+        while view:
+            if self._gzip is None or self._written >= self.chunk_bytes:
+                self._close_part()
+                self._open_part()
+            take = min(len(view), self.chunk_bytes - self._written)
+            self._gzip.write(view[:take])
+            self._written += take
+            view = view[take:]
+        return len(data)
+
+    def close(self) -> List[Dict[str, Any]]:
+        if not self.parts:
+            self._open_part()
+        self._close_part()
+        return self.parts
+
+
+class _CsvRecordCounter:
+    """Repassa o CSV a outro arquivo contando os registros (quebras de linha fora de aspas)"""
+
+    def __init__(self, target):
+        self.target = target
+        self.records = 0
+        self._in_quotes = False
+
+    def write(self, data) -> int:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        data = bytes(data)
+        # Entre aspas a quebra de linha é parte do campo; aspas escapadas ("") alternam duas vezes
+        for i, segment in enumerate(data.split(b'"')):
+            if i:
+                self._in_quotes = not self._in_quotes
+            if not self._in_quotes:
+                self.records += segment.count(b"\n")
+        return self.target.write(data)
+
+
+def _tables() -> list:
+    load_all_models()
+    return list(Base.metadata.sorted_tables)
+
+
+def _watermark_expr(table) -> Optional[str]:
+    cols = [c for c in ("updated_at", "created_at") if c in table.c]
+    if not cols:
+        return None
+    return cols[0] if len(cols) == 1 else f"COALESCE({cols[0]}, {cols[1]})"
+
+
+def _incremental_filter(table, watermarks: Dict[str, str]) -> Optional[str]:
+    """Cláusula WHERE das linhas alteradas desde o último backup (None = tabela inteira)"""
+    expr = _watermark_expr(table)
+    if expr is not None:
+        desde = watermarks.get(table.name)
+        if not desde:
+            return None
+        # watermark vem do nosso próprio manifesto; valida o formato antes de interpolar.
+        # Mantém o texto original: no SQLite a comparação é textual com o valor gravado
+        datetime.fromisoformat(desde)
+        return f"{expr} > '{desde}'"
+    parent = _INCREMENTAL_PARENT.get(table.name)
+    if parent:
+        fk, parent_table, parent_pk = parent
+        parent_filter = _incremental_filter(Base.metadata.tables[parent_table], watermarks)
+        if parent_filter:
+            return f"{fk} IN (SELECT {parent_pk} FROM {parent_table} WHERE {parent_filter})"
+    return None
+
+
+def latest_backup(backup_dir: Path) -> Optional[Dict[str, Any]]:
+    """Manifesto do backup verificado mais recente"""
+    if not backup_dir.exists():
+        return None
+    for candidate in sorted(backup_dir.iterdir(), reverse=True):
+        manifest_path = candidate / MANIFEST_NAME
+        if not manifest_path.is_file():
+            continue
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if manifest.get("verificado"):
+            manifest["diretorio"] = str(candidate)
+            return manifest
+    return None
+
+
+def verify_backup(directory: Path) -> List[str]:
+    """Confere sha256, tamanho e integridade gzip de todas as partes do backup"""
+    manifest = json.loads((directory / MANIFEST_NAME).read_text(encoding="utf-8"))
+    erros = []
+    for nome, info in manifest["tabelas"].items():
+        for part in info["partes"]:
+            path = directory / part["arquivo"]
+            if not path.is_file():
+                erros.append(f"{nome}: parte ausente {part['arquivo']}")
+                continue
+            sha = hashlib.sha256()
+            size = 0
+            with open(path, "rb") as fh:
+                for block in iter(lambda: fh.read(_READ_SIZE), b""):
+                    sha.update(block)
+                    size += len(block)
+            if size != part["bytes"] or sha.hexdigest() != part["sha256"]:
+                erros.append(f"{nome}: checksum divergente em {part['arquivo']}")
+                continue
+            try:
+                with gzip.open(path, "rb") as gz:
+                    while gz.read(_READ_SIZE):
+                        pass
+            except (OSError, EOFError) as e:
+                erros.append(f"{nome}: gzip corrompido em {part['arquivo']}: {e}")
+    return erros
+
+
+def _backup_postgres(directory: Path, chunk_bytes: int, watermarks: Dict[str, str],
+                     progress: Callable[[str], None]) -> Dict[str, Any]:
+    tabelas: Dict[str, Any] = {}
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        # Snapshot único e somente leitura: consistente entre tabelas e sem locks de escrita
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        for table in _tables():
+            progress(f"Exportando {table.name}...")
+            where = _incremental_filter(table, watermarks)
+            select = f"SELECT * FROM {table.name}" + (f" WHERE {where}" if where else "")
+
+            watermark = None
+            expr = _watermark_expr(table)
+            if expr is not None:
+                cursor.execute(f"SELECT MAX({expr}) FROM {table.name}")
+                value = cursor.fetchone()[0]
+                watermark = value.isoformat() if value else watermarks.get(table.name)
+
+            writer = ChunkedGzipWriter(directory, f"{table.name}.csv", chunk_bytes)
+            # rowcount depois do COPY não é confiável: conta os registros gravados (menos o cabeçalho)
+            counter = _CsvRecordCounter(writer)
+            copy_sql = f"COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+            if hasattr(cursor, "copy_expert"):  # psycopg2
+                cursor.copy_expert(copy_sql, counter)
+            else:  # psycopg 3
+                with cursor.copy(copy_sql) as copy:
+                    for block in copy:
+                        counter.write(block)
+            tabelas[table.name] = {
+                "linhas": counter.records - 1,
+                "incremental": where is not None,
+                "watermark": watermark,
+                "partes": writer.close(),
+            }
+    finally:
+        raw.rollback()
+        raw.close()
+    return tabelas
+
+
+def _backup_sqlite_full(directory: Path, chunk_bytes: int,
+                        progress: Callable[[str], None]) -> Dict[str, Any]:
+    raw = engine.raw_connection()
+    try:
+        source: sqlite3.Connection = raw.driver_connection
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot_path = Path(tmp) / "snapshot.db"
+            target = sqlite3.connect(snapshot_path)
+            try:
+                progress("Copiando banco SQLite (backup online)...")
+                # Em passos curtos para não segurar o lock do banco durante toda a cópia
+                source.backup(target, pages=1024, sleep=0.001)
+            finally:
+                target.close()
+
+            watermarks = {}
+            snapshot = sqlite3.connect(snapshot_path)
+            try:
+                existing = {r[0] for r in snapshot.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+                for table in _tables():
+                    expr = _watermark_expr(table)
+                    if expr is not None and table.name in existing:
+                        value = snapshot.execute(f"SELECT MAX({expr}) FROM {table.name}").fetchone()[0]
+                        watermarks[table.name] = str(value) if value else None
+            finally:
+                snapshot.close()
+
+            writer = ChunkedGzipWriter(directory, "banco.sqlite3", chunk_bytes)
+            with open(snapshot_path, "rb") as fh:
+                for block in iter(lambda: fh.read(_READ_SIZE), b""):
+                    writer.write(block)
+            partes = writer.close()
+    finally:
+        raw.close()
+    tabelas: Dict[str, Any] = {"__banco__": {"incremental": False, "partes": partes}}
+    for nome, watermark in watermarks.items():
+        tabelas[nome] = {"incremental": False, "watermark": watermark, "partes": []}
+    return tabelas
+
+
+def _backup_sqlite_incremental(directory: Path, chunk_bytes: int, watermarks: Dict[str, str],
+                               progress: Callable[[str], None]) -> Dict[str, Any]:
+    tabelas: Dict[str, Any] = {}
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.driver_connection.cursor()
+        existing = {r[0] for r in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table in _tables():
+            if table.name not in existing:
+                continue
+            progress(f"Exportando {table.name}...")
+            where = _incremental_filter(table, watermarks)
+            watermark = None
+            expr = _watermark_expr(table)
+            if expr is not None:
+                value = cursor.execute(f"SELECT MAX({expr}) FROM {table.name}").fetchone()[0]
+                watermark = str(value) if value else watermarks.get(table.name)
+
+            cursor.execute(f"SELECT * FROM {table.name}" + (f" WHERE {where}" if where else ""))
+            writer = ChunkedGzipWriter(directory, f"{table.name}.csv", chunk_bytes)
+            buffer = io.StringIO()
+            csv_writer = csv.writer(buffer)
+            csv_writer.writerow([d[0] for d in cursor.description])
+            linhas = 0
+            while True:
+                rows = cursor.fetchmany(5000)
+                if not rows:
+                    break
+                csv_writer.writerows(rows)
+                linhas += len(rows)
+                writer.write(buffer.getvalue())
+                buffer.seek(0)
+                buffer.truncate()
+            writer.write(buffer.getvalue())
+            tabelas[table.name] = {
+                "linhas": linhas,
+                "incremental": where is not None,
+                "watermark": watermark,
+                "partes": writer.close(),
+            }
+    finally:
+        raw.close()
+    return tabelas
+
+
+def run_backup(tipo: str = "completo", progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """Executa o backup ('completo' ou 'incremental') e verifica os checksums"""
+    if tipo not in ("completo", "incremental"):
+        raise ValueError(f"Tipo de backup inválido: {tipo}")
+    progress = progress or (lambda status: None)
+
+    backup_dir = Path(settings.BACKUP_DIR)
+    backup_dir.mkdir(parents=True, exist_ok=True)
+
+    base = latest_backup(backup_dir) if tipo == "incremental" else None
+    if tipo == "incremental" and base is None:
+        logger.info("Nenhum backup anterior verificado; executando backup completo")
+        tipo = "completo"
+    watermarks = {
+        nome: info.get("watermark")
+        for nome, info in (base or {}).get("tabelas", {}).items()
+        if info.get("watermark")
+    }
+
+    criado_em = datetime.now(timezone.utc)
+    directory = backup_dir / f"backup_{criado_em:%Y%m%d_%H%M%S_%f}_{tipo}"
+    directory.mkdir()
+    chunk_bytes = settings.BACKUP_CHUNK_MB * 1024 * 1024
+    dialect = engine.dialect.name
+
+    if dialect == "postgresql":
+        tabelas = _backup_postgres(directory, chunk_bytes, watermarks, progress)
+    elif tipo == "completo":
+        tabelas = _backup_sqlite_full(directory, chunk_bytes, progress)
+    else:
+        tabelas = _backup_sqlite_incremental(directory, chunk_bytes, watermarks, progress)
+
+    manifest = {
+        "tipo": tipo,
+        "dialeto": dialect,
+        "criado_em": criado_em.isoformat(),
+        "base": Path(base["diretorio"]).name if base else None,
+        "verificado": False,
+        "tabelas": tabelas,
+    }
+    manifest_path = directory / MANIFEST_NAME
+    manifest_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    progress("Verificando checksums...")
+    erros = verify_backup(directory)
+    manifest["verificado"] = not erros
+    manifest_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    return {
+        "diretorio": str(directory),
+        "tipo": tipo,
+        "base": manifest["base"],
+        "tamanho_bytes": sum(p["bytes"] for t in tabelas.values() for p in t["partes"]),
+        "tabelas": len(tabelas),
+        "verificado": manifest["verificado"],
+        "erros": erros,
+    }
@@ -0,0 +1,131 @@
+"""
+Conversão entre unidades de medida a partir das cadeias fator_para_menor /
+menor_unidade_id da tabela unidades.
+
+O grafo é carregado uma vez e fechado: cada unidade é levada até a unidade base
+da sua cadeia (fator acumulado), e a matriz de fatores entre todos os pares
+conversíveis é montada a partir daí. Uma conversão é então uma consulta a
+dicionário + posição de lista, sem consulta ao banco nem leitura de nomes.
+
+A tabela é recarregada quando a versão da tag "unidades" do cache HTTP muda
+(qualquer escrita confirmada em unidades pelo ORM, em qualquer worker quando há
+Redis) e, sem Redis, no máximo a cada RECARGA_LOCAL segundos.
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.unidade import Unidade
+from app.utils import http_cache
+
+logger = logging.getLogger(__name__)
+
+RECARGA_LOCAL = 60  # segundos; só vale quando as versões não vêm do Redis
+
+
+class TabelaConversao(NamedTuple):
+    indice: Dict[str, int]  # código -> posição na matriz
+    indice_minusculo: Dict[str, int]  # código em minúsculas (unidades vindas de notas/front)
+    base: List[str]  # código da unidade base de cada posição
+    matriz: List[List[Optional[float]]]  # matriz[i][j]: quantas unidades j há em 1 unidade i
+
+    def posicao(self, codigo: Optional[str]) -> Optional[int]:
+        if not codigo:
+            return None
+        i = self.indice.get(codigo)
+        return i if i is not None else self.indice_minusculo.get(codigo.lower())
+
+    def fator(self, origem: Optional[str], destino: Optional[str]) -> Optional[float]:
+        """Multiplicador de origem para destino; None se não forem conversíveis"""
+        i, j = self.posicao(origem), self.posicao(destino)
+        if i is None or j is None:
+            return 1.0 if origem and destino and origem.lower() == destino.lower() else None
+        return self.matriz[i][j]
+
+    def converter(self, quantidade: float, origem: Optional[str], destino: Optional[str]) -> Optional[float]:
+        fator = self.fator(origem, destino)
+        return None if fator is None else quantidade * fator
+
+
+def montar(unidades: List[tuple]) -> TabelaConversao:
+    """Fecha o grafo; unidades = [(id, codigo, fator_para_menor, menor_unidade_id)]"""
+    # Linhas sem id ou código (importações antigas no SQLite) não entram no grafo
+    por_id = {uid: (codigo, fator, menor) for uid, codigo, fator, menor in unidades
+              if uid is not None and codigo}
+
+    # (base, fator) de cada unidade até a base da sua cadeia, memorizado
+    ate_base: Dict[int, tuple] = {}
+
+    def resolver(uid: int) -> tuple:
+        caminho = []
+        atual = uid
+        while atual not in ate_base:
+            codigo, fator, menor = por_id[atual]
+            if atual in caminho:
+                # Ciclo: a unidade em que ele fecha vira a base
+                caminho = caminho[:caminho.index(atual)]
+                ate_base[atual] = (atual, 1.0)
+                break
+            if menor is None or menor == atual or menor not in por_id:
+                ate_base[atual] = (atual, 1.0)
+                break
+            if fator is None or float(fator) <= 0:
+                # Cadeia sem fator: a unidade só converte para si mesma
+                logger.warning("Unidade '%s' sem fator_para_menor válido; tratada como base", codigo)
+                ate_base[atual] = (atual, 1.0)
+                break
+            caminho.append(atual)
+            atual = menor
+        raiz, acumulado = ate_base[atual]
+        for passo in reversed(caminho):
+            acumulado *= float(por_id[passo][1])
+            ate_base[passo] = (raiz, acumulado)
+        return ate_base[uid]
+
+    ids = sorted(por_id)
+    fechamento = [resolver(uid) for uid in ids]
+    codigos = [por_id[uid][0] for uid in ids]
+    matriz = [
+        [fator_i / fator_j if raiz_i == raiz_j else None for raiz_j, fator_j in fechamento]
+        for raiz_i, fator_i in fechamento
+    ]
+    indice = {codigo: i for i, codigo in enumerate(codigos)}
+    indice_minusculo: Dict[str, int] = {}
+    for i, codigo in enumerate(codigos):
+        indice_minusculo.setdefault(codigo.lower(), i)
+    base = [por_id[raiz][0] for raiz, _ in fechamento]
+    return TabelaConversao(indice, indice_minusculo, base, matriz)
+
+
+_tabela: Optional[TabelaConversao] = None
+_versao: Optional[tuple] = None
+_carregada_em = 0.0
+_lock = threading.Lock()
+
+
+def tabela(db: Session) -> TabelaConversao:
+    """Tabela de conversão atual (recarregada se as unidades mudaram)"""
+    global _tabela, _versao, _carregada_em
+    atual = http_cache.versoes(["unidades"])
+    agora = time.monotonic()
+    with _lock:
+        if (_tabela is not None and _versao == atual
+                and (atual[0] == "redis" or agora - _carregada_em < RECARGA_LOCAL)):
+            return _tabela
+
+    linhas = db.query(Unidade.id, Unidade.codigo, Unidade.fator_para_menor, Unidade.menor_unidade_id).all()
+    nova = montar([tuple(linha) for linha in linhas])
+    logger.debug("Tabela de conversão carregada: %d unidades", len(nova.indice))
+    with _lock:
+        _tabela, _versao, _carregada_em = nova, atual, agora
+    return nova
+
+
+def invalidar() -> None:
+    """Descarta a tabela do processo (a próxima chamada recarrega do banco)"""
+    global _tabela
+    with _lock:
+        _tabela = None
@@ -0,0 +1,260 @@
+"""
+Extração local dos itens da DANFE (quadro DADOS DO PRODUTO/SERVIÇO) a partir da
+geometria do PDF, sem depender do texto corrido.
+
+Por página:
+    1. As palavras do pdfplumber (com coordenadas) são agrupadas em linhas.
+    2. O cabeçalho do quadro é a faixa de linhas em torno da palavra NCM.
+    3. As colunas vêm das linhas verticais da grade que cruzam o cabeçalho; sem
+       grade, dos blocos de palavras do próprio cabeçalho.
+    4. Cada linha abaixo do cabeçalho tem suas palavras distribuídas pelas
+       colunas: linha com quantidade e valor total abre um item, linha só com
+       descrição continua a descrição do item anterior.
+
+A confiança (0 a 1) é a fração de itens em que quantidade x valor unitário bate
+com o valor total, limitada a 0,5 quando a soma dos itens não bate com o VALOR
+TOTAL DOS PRODUTOS do quadro de cálculo do imposto. Abaixo de
+settings.DANFE_CONFIANCA_MINIMA, uploads_ia consulta o Document AI.
+"""
+import io
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import pdfplumber
+from unidecode import unidecode
+
+CONFIANCA_TETO_SEM_TOTAL = 0.5  # soma dos itens diverge do total dos produtos
+
+_NUMERO_BRL = re.compile(r"\d{1,3}(?:\.\d{3})*(?:,\d+)?|\d+(?:,\d+)?")
+_FIM_QUADRO = ("DADOS ADICIONAIS", "INFORMACOES COMPLEMENTARES", "CALCULO DO ISSQN")
+_TOLERANCIA_LINHA = 3.0  # pontos entre os topos de palavras da mesma linha
+_DISTANCIA_CABECALHO = 6.0  # pontos entre linhas do cabeçalho (rótulos em 2-3 linhas)
+
+# Ordem importa: UNIT antes de UN, TOTAL só quando não é de imposto/desconto
+_COLUNAS: List[Tuple[str, Tuple[str, ...], Tuple[str, ...]]] = [
+    # (campo, contém algum, não contém nenhum)
+    ("ncm", ("NCM",), ()),
+    ("cfop", ("CFOP",), ()),
+    ("cst", ("CST", "CSOSN"), ()),
+    ("descricao", ("DESCRI",), ()),
+    ("codigo", ("COD",), ()),
+    ("quantidade", ("QUANT", "QTD"), ()),
+    ("valor_unitario", ("UNIT",), ()),
+    ("valor_total", ("TOTAL",), ("ICMS", "IPI", "DESC", "BC", "B.C")),
+    ("unidade", ("UN", "UND", "UNID"), ()),
+]
+_OBRIGATORIAS = {"descricao", "quantidade", "valor_total"}
+_NUMERICAS = {"quantidade", "valor_unitario", "valor_total"}
+
+
+class ResultadoItens(NamedTuple):
+    itens: List[Dict]
+    confianca: float
+    total_produtos: Optional[float]  # VALOR TOTAL DOS PRODUTOS lido do PDF, se encontrado
+
+
+class _Coluna(NamedTuple):
+    x0: float
+    x1: float
+    campo: Optional[str]
+
+
+def numero_brl(texto: str) -> Optional[float]:
+    """'22.374,50' -> 22374.5; None se não for um número no formato da nota"""
+    texto = (texto or "").strip()
+    if not _NUMERO_BRL.fullmatch(texto):
+        return None
+    return float(texto.replace(".", "").replace(",", "."))
+
+
+def _normalizado(texto: str) -> str:
+    return unidecode(texto).upper()
+
+
+def _linhas(palavras: List[dict]) -> List[List[dict]]:
+    linhas: List[List[dict]] = []
+    for palavra in sorted(palavras, key=lambda p: (p["top"], p["x0"])):
+        if linhas and palavra["top"] - linhas[-1][0]["top"] <= _TOLERANCIA_LINHA:
+            linhas[-1].append(palavra)
+        else:
+            linhas.append([palavra])
+    for linha in linhas:
+        linha.sort(key=lambda p: p["x0"])
+    return linhas
+
+
+def _texto(linha: List[dict]) -> str:
+    return _normalizado(" ".join(p["text"] for p in linha))
+
+
+def _tem_valor(linha: List[dict]) -> bool:
+    return any("," in p["text"] and numero_brl(p["text"]) is not None for p in linha)
+
+
+def _faixa_cabecalho(linhas: List[List[dict]]) -> Optional[Tuple[int, int]]:
+    """(primeira, última) linha do cabeçalho do quadro de itens"""
+    for i, linha in enumerate(linhas):
+        if not any(_normalizado(p["text"]).startswith("NCM") for p in linha):
+            continue
+        primeira = ultima = i
+
+        def pertence(j: int, vizinha: int) -> bool:
+            texto = _texto(linhas[j])
+            perto = abs(linhas[j][0]["top"] - linhas[vizinha][0]["top"]) <= _DISTANCIA_CABECALHO + _TOLERANCIA_LINHA
+            return perto and not _tem_valor(linhas[j]) and not ("DADOS" in texto and "PRODUTO" in texto)
+
+        while primeira > 0 and pertence(primeira - 1, primeira):
+            primeira -= 1
+        while ultima + 1 < len(linhas) and pertence(ultima + 1, ultima):
+            ultima += 1
+        return primeira, ultima
+    return None
+
+
+def _campo(rotulo: str) -> Optional[str]:
+    palavras = set(re.split(r"[\s/]+", rotulo))
+    for campo, contem, exclui in _COLUNAS:
+        if campo == "unidade":
+            # "UN" é curto demais para busca por substring
+            if palavras & set(contem):
+                return campo
+        elif any(c in rotulo for c in contem) and not any(e in rotulo for e in exclui):
+            return campo
+    return None
+
+
+def _colunas(page, cabecalho: List[dict]) -> List[_Coluna]:
+    topo = min(p["top"] for p in cabecalho)
+    base = max(p["bottom"] for p in cabecalho)
+    bordas = sorted({
+        round(e["x0"], 1) for e in page.edges
+        if e["orientation"] == "v" and e["top"] <= topo + 1 and e["bottom"] >= base - 1
+    })
+
+    if len(bordas) >= 4:
+        limites = list(zip(bordas, bordas[1:]))
+    else:
+        # Sem grade: blocos de palavras do cabeçalho separados por mais que um espaço. Cada
+        # coluna vai do início do seu rótulo ao início do próximo: texto alinhado à
+        # esquerda começa no rótulo e número alinhado à direita termina antes do vizinho.
+        blocos: List[List[float]] = []
+        for p in sorted(cabecalho, key=lambda p: p["x0"]):
+            espaco = (p["bottom"] - p["top"]) * 0.5
+            if blocos and p["x0"] <= blocos[-1][1] + espaco:
+                blocos[-1][1] = max(blocos[-1][1], p["x1"])
+            else:
+                blocos.append([p["x0"], p["x1"]])
+        inicios = [b[0] for b in blocos[1:]]
+        limites = list(zip([0.0] + inicios, inicios + [float(page.width)]))
+
+    colunas, usados = [], set()
+    for x0, x1 in limites:
+        rotulo = _normalizado(" ".join(
+            p["text"] for p in sorted(cabecalho, key=lambda p: (p["top"], p["x0"]))
+            if x0 <= (p["x0"] + p["x1"]) / 2 < x1
+        ))
+        campo = _campo(rotulo) if rotulo else None
+        if campo in usados:
+            campo = None
+        usados.add(campo)
+        colunas.append(_Coluna(x0, x1, campo))
+    return colunas
+
+
+def _celulas(linha: List[dict], colunas: List[_Coluna]) -> Dict[str, str]:
+    celulas: Dict[str, List[str]] = {}
+    for p in linha:
+        centro = (p["x0"] + p["x1"]) / 2
+        for coluna in colunas:
+            if coluna.x0 <= centro < coluna.x1:
+                if coluna.campo:
+                    celulas.setdefault(coluna.campo, []).append(p["text"])
+                break
+    return {campo: " ".join(textos) for campo, textos in celulas.items()}
+
+
+def _itens_pagina(page, linhas: List[List[dict]]) -> List[Dict]:
+    faixa = _faixa_cabecalho(linhas)
+    if faixa is None:
+        return []
+    primeira, ultima = faixa
+    colunas = _colunas(page, [p for linha in linhas[primeira:ultima + 1] for p in linha])
+    if not _OBRIGATORIAS <= {c.campo for c in colunas}:
+        return []
+
+    itens: List[Dict] = []
+    for linha in linhas[ultima + 1:]:
+        if any(marca in _texto(linha) for marca in _FIM_QUADRO):
+            break
+        celulas = _celulas(linha, colunas)
+        quantidade = numero_brl(celulas.get("quantidade", ""))
+        valor_total = numero_brl(celulas.get("valor_total", ""))
+        if quantidade is not None and valor_total is not None:
+            itens.append({
+                "codigo": celulas.get("codigo", ""),
+                "descricao": celulas.get("descricao", ""),
+                "ncm": celulas.get("ncm", ""),
+                "cfop": celulas.get("cfop", ""),
+                "unidade": celulas.get("unidade", "").upper() or "UN",
+                "quantidade": quantidade,
+                "valor_unitario": numero_brl(celulas.get("valor_unitario", "")) or 0.0,
+                "valor_total": valor_total,
+            })
+        elif itens and celulas and not _NUMERICAS & set(celulas):
+            # Descrição quebrada em mais de uma linha (pode avançar sobre as colunas vizinhas)
+            continuacao = " ".join(p["text"] for p in linha)
+            itens[-1]["descricao"] = f"{itens[-1]['descricao']} {continuacao}".strip()
+    return itens
+
+
+def _total_produtos(page, linhas: List[List[dict]]) -> Optional[float]:
+    """Valor abaixo (ou ao lado) do rótulo VALOR TOTAL DOS PRODUTOS"""
+    for i, linha in enumerate(linhas):
+        textos = [_normalizado(p["text"]) for p in linha]
+        for j in range(2, len(textos)):
+            if textos[j].startswith("PRODUTOS") and textos[j - 1] == "DOS" and textos[j - 2] == "TOTAL":
+                inicio = linha[j - 3]["x0"] if j >= 3 and textos[j - 3] == "VALOR" else linha[j - 2]["x0"]
+                if j + 1 < len(linha):
+                    ao_lado = numero_brl(linha[j + 1]["text"])
+                    if ao_lado is not None:
+                        return ao_lado
+                    fim = linha[j + 1]["x0"]
+                else:
+                    fim = float(page.width)
+                for abaixo in linhas[i + 1:i + 3]:
+                    for p in abaixo:
+                        if inicio - 2 <= (p["x0"] + p["x1"]) / 2 < fim and "," in p["text"]:
+                            valor = numero_brl(p["text"])
+                            if valor is not None:
+                                return valor
+    return None
+
+
+def _confere(item: Dict) -> bool:
+    esperado = item["quantidade"] * item["valor_unitario"]
+    return item["quantidade"] > 0 and abs(esperado - item["valor_total"]) <= max(0.02, item["valor_total"] * 0.005)
+
+
+def extrair_itens(pdf: "pdfplumber.PDF") -> ResultadoItens:
+    """Itens (codigo, descricao, ncm, cfop, unidade, quantidade, valor_unitario, valor_total) e confiança"""
+    itens: List[Dict] = []
+    total_produtos: Optional[float] = None
+    for page in pdf.pages:
+        linhas = _linhas(page.extract_words())
+        itens.extend(_itens_pagina(page, linhas))
+        if total_produtos is None:
+            total_produtos = _total_produtos(page, linhas)
+
+    if not itens:
+        return ResultadoItens([], 0.0, total_produtos)
+    confianca = sum(_confere(item) for item in itens) / len(itens)
+    if total_produtos is not None:
+        soma = sum(item["valor_total"] for item in itens)
+        if abs(soma - total_produtos) > 0.01 * (len(itens) + 1):  # arredondamento dos itens
+            confianca = min(confianca, CONFIANCA_TETO_SEM_TOTAL)
+    return ResultadoItens(itens, round(confianca, 3), total_produtos)
+
+
+def extrair_itens_pdf(content: bytes) -> ResultadoItens:
+    with pdfplumber.open(io.BytesIO(content)) as pdf:
+        return extrair_itens(pdf)
@@ -0,0 +1,206 @@
+"""
+Extração dos campos de cabeçalho do texto de uma DANFE (PDF convertido em texto).
+
+Os padrões de uma seção são compilados numa única alternância com grupos
+nomeados, e a seção é percorrida uma vez: para cada campo fica o primeiro trecho
+do padrão de maior prioridade, e a varredura termina assim que todos os campos
+têm o padrão preferido.
+
+Os padrões com rótulo (CNPJ, SÉRIE, VALOR TOTAL DA NOTA...) rodam sobre o texto
+em maiúsculas e sem IGNORECASE: todas as alternativas começam por um literal, e
+o re pula direto para as posições candidatas. Os padrões sem rótulo (CNPJ ou
+chave soltos, linha em maiúsculas) anulam essa otimização, então só rodam numa
+segunda varredura, restrita aos campos que a primeira não encontrou.
+
+Seções (a tabela de itens, que é a maior parte do texto, não é percorrida):
+    emitente     — do início até DESTINATÁRIO/REMETENTE (nome, CNPJ, número, série, chave)
+    destinatario — de DESTINATÁRIO/REMETENTE até CÁLCULO DO IMPOSTO (data de emissão)
+    totais       — de CÁLCULO DO IMPOSTO até TRANSPORTADOR / DADOS DOS PRODUTOS
+Se a âncora de uma seção não aparece (layout diferente), emitente e destinatario
+vão até o início da tabela de itens (DADOS DOS PRODUTOS) e totais vale pelo
+documento inteiro, já que o total pode vir depois dos itens.
+
+Funciona tanto com o texto do pdfplumber (com quebras de linha e acentos) quanto
+com o texto normalizado do MCP (ASCII, espaços colapsados).
+"""
+import re
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+
+class Padrao(NamedTuple):
+    campo: str
+    regex: str  # com um grupo (?P<valor>...)
+    secao: str
+
+
+_NAO_FORNECEDOR = re.compile(r"^(?:NF-|NOTA|IDENTIFICA|DANFE|DOCUMENTO|DESTINAT)|CNPJ|CPF|INSCRI", re.IGNORECASE)
+# Rótulos que encerram o nome quando o texto não tem quebras de linha
+_ROTULOS_FIM_NOME = r"CNPJ|CPF|ENDERE[ÇC]O|INSCRI[ÇC][ÃA]O|RUA|AV\.|AVENIDA|CEP|FONE|DANFE"
+_FIM_NOME = re.compile(rf"\s+(?:{_ROTULOS_FIM_NOME})\b.*$", re.IGNORECASE)
+
+_NUMERO_NF = r"\d{1,3}\.\d{3}\.\d{3}|\d{6,9}"
+_CNPJ = r"\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}"
+_CHAVE = r"(?:\d{4}[ ]?){10}\d{4}"
+_VALOR = r"\d{1,3}(?:\.\d{3})*,\d{2}|\d+(?:[.,]\d{1,2})?"
+# Nome após o rótulo; para antes do próximo rótulo (CNPJ...) para não consumir o trecho dele
+_NOME = rf"(?P<valor>(?:(?!\s+(?:{_ROTULOS_FIM_NOME})\b)[^\n\r:]){{3,80}})"
+
+# Rotulados, aplicados ao texto em maiúsculas (Nº vira "NDEG" no texto do MCP, via
+# unidecode); em ordem de prioridade por campo.
+# Entre campos, a ordem decide quem fica com o trecho quando dois padrões começam
+# na mesma posição.
+ROTULADOS: List[Padrao] = [
+    Padrao("chave_acesso", rf"CHAVE\s+DE\s+ACESSO\D{{0,30}}?(?P<valor>{_CHAVE})", "emitente"),
+    Padrao("numero_nota", rf"N(?:[º°O]|DEG)?\.?\s*:?\s*(?P<valor>{_NUMERO_NF})(?!\d)", "emitente"),
+    Padrao("numero_nota", rf"N[ÚU]MERO\s*:?\s*(?P<valor>{_NUMERO_NF})(?!\d)", "emitente"),
+    Padrao("numero_nota", r"NOTA\s*FISCAL\s*(?:N[º°O]\.?)?\s*[:\-]?\s*(?P<valor>\d{1,9})(?!\d)", "emitente"),
+    Padrao("serie", r"S[ÉE]RIE\s*:?\s*(?P<valor>\d{1,3})(?!\d)", "emitente"),
+    Padrao("cnpj_emitente", rf"CNPJ\s*[:\-]?\s*(?P<valor>{_CNPJ})(?!\d)", "emitente"),
+    Padrao("emitente", r"(?:NOME\s*/\s*)?RAZ[ÃA]O\s+SOCIAL\s*[:\-]?\s*" + _NOME, "emitente"),
+    Padrao("emitente", r"(?:FORNECEDOR|EMITENTE)\s*[:\-]?\s*" + _NOME, "emitente"),
+    Padrao("emitente", r"NOME\s*:\s*" + _NOME, "emitente"),
+    Padrao("data_emissao", r"DATA\s+(?:DE\s+|DA\s+)?EMISS[ÃA]O\s*:?\s*(?P<valor>\d{2}/\d{2}/\d{4})", "destinatario"),
+    Padrao("valor_total", rf"VALOR\s+TOTAL\s+DA\s+NOTA\s*:?\s*(?:R\$)?\s*(?P<valor>{_VALOR})", "totais"),
+    Padrao("valor_total", rf"VALOR\s+TOTAL\s*[:\-]?\s*(?:R\$)?\s*(?P<valor>{_VALOR})", "totais"),
+    Padrao("valor_total", rf"R\$\s*(?P<valor>{_VALOR})", "totais"),
+]
+
+# Sem rótulo, aplicados ao texto original só para os campos ainda ausentes
+SEM_ROTULO: List[Padrao] = [
+    Padrao("chave_acesso", rf"(?<!\d)(?P<valor>{_CHAVE})(?!\d)", "emitente"),
+    Padrao("cnpj_emitente", r"(?<![\d.])(?P<valor>\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2})(?!\d)", "emitente"),
+    # Linha inteira em maiúsculas (nome do emitente no topo da DANFE); só com quebras de linha
+    Padrao("emitente", r"(?m:^[ \t]*(?P<valor>[A-Z][A-Z .&\-]{9,79})[ \t]*$)", "emitente"),
+    Padrao("numero_nota", r"(?<![\d.,/])(?P<valor>\d{6,9})(?![\d.,/])", "emitente"),
+    Padrao("data_emissao", r"(?<!\d)(?P<valor>\d{2}/\d{2}/\d{4})(?!\d)", "destinatario"),
+]
+
+
+def _limpar_emitente(valor: str) -> Optional[str]:
+    nome = _FIM_NOME.sub("", valor).strip(" -:")
+    if len(nome) <= 10 or _NAO_FORNECEDOR.search(nome):
+        return None
+    return nome
+
+
+# Normalização/validação por campo; None descarta o trecho e a varredura continua
+_LIMPEZA: Dict[str, Callable[[str], Optional[str]]] = {
+    "numero_nota": lambda v: v.replace(".", ""),
+    "chave_acesso": lambda v: v.replace(" ", ""),
+    "emitente": _limpar_emitente,
+}
+
+# Aplicado ao texto em maiúsculas
+_ANCORAS = re.compile(
+    r"(?P<destinatario>DESTINAT[ÁA]RIO\s*/?\s*REMETENTE)"
+    r"|(?P<calculo>C[ÁA]LCULO\s+DO\s+IMPOSTO)"
+    r"|(?P<fim_totais>TRANSPORTADOR)"
+    r"|(?P<itens>DADOS\s+DOS\s+PRODUTOS)"
+)
+
+
+class _Varredura(NamedTuple):
+    regex: "re.Pattern"
+    grupos: Dict[str, Tuple[str, int, str]]  # grupo externo -> (campo, prioridade, grupo do valor)
+    campos: FrozenSet[str]
+
+
+def _compilar(padroes: List[Padrao]) -> _Varredura:
+    alternativas, grupos, prioridade = [], {}, {}
+    for i, padrao in enumerate(padroes):
+        grupo, grupo_valor = f"p{i}", f"v{i}"
+        alternativas.append(f"(?P<{grupo}>{padrao.regex.replace('(?P<valor>', f'(?P<{grupo_valor}>')})")
+        grupos[grupo] = (padrao.campo, prioridade.setdefault(padrao.campo, 0), grupo_valor)
+        prioridade[padrao.campo] += 1
+    return _Varredura(re.compile("|".join(alternativas)), grupos, frozenset(prioridade))
+
+
+_ROTULADOS = {
+    secao: _compilar([p for p in ROTULADOS if p.secao == secao])
+    for secao in dict.fromkeys(p.secao for p in ROTULADOS)
+}
+
+
+@lru_cache(maxsize=64)
+def _sem_rotulo(secao: str, campos: FrozenSet[str]) -> Optional[_Varredura]:
+    padroes = [p for p in SEM_ROTULO if p.secao == secao and p.campo in campos]
+    return _compilar(padroes) if padroes else None
+
+
+def _limites(alvo: str) -> Dict[str, Tuple[int, int]]:
+    """(início, fim) de cada seção; a seção ausente vai até a tabela de itens (totais: documento inteiro)"""
+    destinatario = calculo = fim_totais = itens = None
+    for ancora in _ANCORAS.finditer(alvo):
+        tipo = ancora.lastgroup
+        if tipo == "itens" and itens is None:
+            itens = ancora.start()
+        if tipo == "destinatario" and destinatario is None:
+            destinatario = ancora.start()
+        elif tipo == "calculo" and calculo is None:
+            calculo = ancora.start()
+        elif tipo in ("fim_totais", "itens") and calculo is not None:
+            fim_totais = ancora.start()
+            break
+
+    cabecalho = (0, itens if itens is not None else len(alvo))
+    return {
+        "emitente": (0, destinatario) if destinatario is not None else cabecalho,
+        "destinatario": (destinatario, calculo or fim_totais or len(alvo)) if destinatario is not None else cabecalho,
+        "totais": (calculo, fim_totais or len(alvo)) if calculo is not None else (0, len(alvo)),
+    }
+
+
+def _varrer(varredura: _Varredura, alvo: str, texto: str, inicio: int, fim: int,
+            resultado: Dict[str, str]) -> None:
+    """Percorre alvo[inicio:fim] uma vez; os valores são lidos de texto (mesmas posições)"""
+    melhores: Dict[str, int] = {}  # campo -> prioridade do trecho guardado
+    for trecho in varredura.regex.finditer(alvo, inicio, fim):
+        campo, prioridade, grupo_valor = varredura.grupos[trecho.lastgroup]
+        if prioridade >= melhores.get(campo, len(varredura.grupos)):
+            continue
+        valor = texto[trecho.start(grupo_valor):trecho.end(grupo_valor)]
+        limpeza = _LIMPEZA.get(campo)
+        valor = limpeza(valor) if limpeza else valor.strip()
+        if not valor:
+            continue
+        melhores[campo] = prioridade
+        resultado[campo] = valor
+        if len(melhores) == len(varredura.campos) and not any(melhores.values()):
+            break
+
+
+def extrair_campos(texto: str) -> Dict[str, str]:
+    """Campos do cabeçalho encontrados no texto (ausentes ficam fora do dicionário)
+
+    Chaves possíveis: numero_nota, serie, chave_acesso, cnpj_emitente, emitente,
+    data_emissao, valor_total (texto no formato da nota, ver valor_brl).
+    """
+    if not texto:
+        return {}
+    maiusculo = texto.upper()
+    if len(maiusculo) != len(texto):
+        # upper() mudou o tamanho (ß -> SS...): posições não batem, valores saem em maiúsculas
+        texto = maiusculo
+
+    resultado: Dict[str, str] = {}
+    for secao, (inicio, fim) in _limites(maiusculo).items():
+        rotulados = _ROTULADOS.get(secao)
+        if rotulados is not None:
+            _varrer(rotulados, maiusculo, texto, inicio, fim, resultado)
+        faltando = frozenset(p.campo for p in SEM_ROTULO if p.secao == secao and p.campo not in resultado)
+        if faltando:
+            sem_rotulo = _sem_rotulo(secao, faltando)
+            if sem_rotulo is not None:
+                _varrer(sem_rotulo, texto, texto, inicio, fim, resultado)
+    return resultado
+
+
+def valor_brl(texto: str) -> Optional[float]:
+    """'1.234,56' -> 1234.56 (também aceita '1234.56')"""
+    if "," in texto:
+        texto = texto.replace(".", "").replace(",", ".")
+    try:
+        return float(texto)
+    except ValueError:
+        return None
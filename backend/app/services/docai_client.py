@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import logging
 import os
 from functools import lru_cache
 from typing import Optional
@@ -8,6 +9,7 @@ from google.cloud import documentai_v1 as documentai
 
 from app.config import settings
 
+logger = logging.getLogger(__name__)
 
 @lru_cache()
 def _credentials_path() -> Optional[str]:
@@ -25,9 +27,9 @@ def configure_credentials() -> None:
     cred_path = _credentials_path()
     if cred_path and os.path.exists(cred_path):
         os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = cred_path
-        print(f"DEBUG: Document AI credentials loaded from: {cred_path}")
+        logger.debug("Document AI credentials loaded from: %s", cred_path)
     elif cred_path:
-        print(f"AVISO: Credenciais do Document AI não encontradas em: {cred_path}")
+        logger.warning("Credenciais do Document AI não encontradas em: %s", cred_path)
 
 
 def process_invoice_pdf(pdf_bytes: bytes) -> documentai.Document:
@@ -46,7 +48,7 @@ def process_invoice_pdf(pdf_bytes: bytes) -> documentai.Document:
         settings.GCP_PROCESSOR_ID_INVOICE,
     )
 
-    print(f"DEBUG: Processor path: {name}")
+    logger.debug("Processor path: %s", name)
 
     request = documentai.ProcessRequest(
         name=name,
@@ -56,10 +58,10 @@ def process_invoice_pdf(pdf_bytes: bytes) -> documentai.Document:
         ),
     )
 
-    print("DEBUG: Enviando request para Document AI...")
     result = client.process_document(request=request)
-    print("DEBUG: ✓ Document AI processou com sucesso!")
-    print(f"  Páginas: {len(result.document.pages)}")
-    print(f"  Entidades: {len(result.document.entities)}")
+    logger.debug(
+        "Document AI processou: %d páginas, %d entidades",
+        len(result.document.pages), len(result.document.entities),
+    )
     return result.document
 
@@ -0,0 +1,26 @@
+"""
+Tamanho de embalagem escrito no fim do nome da matéria-prima ("OLEO ISOLANTE 18L",
+"VERNIZ 3.6 KG").
+
+Interpretado uma vez, quando o nome é gravado (evento do modelo MateriaPrima),
+e guardado em nome_exibicao / embalagem_quantidade / embalagem_unidade; a
+listagem de matérias-primas disponíveis lê as colunas em vez de reaplicar a
+regex a cada requisição.
+"""
+import re
+from typing import Dict, Optional
+
+_EMBALAGEM = re.compile(r"\s*(\d+(?:\.\d+)?)\s*(L|KG|PC|UN|MT|M)$", re.IGNORECASE)
+
+
+def interpretar(nome: Optional[str]) -> Dict[str, object]:
+    """Colunas derivadas do nome: nome sem a embalagem, quantidade e unidade (None se não houver)"""
+    nome = nome or ""
+    encontrado = _EMBALAGEM.search(nome)
+    if not encontrado:
+        return {"nome_exibicao": nome, "embalagem_quantidade": None, "embalagem_unidade": None}
+    return {
+        "nome_exibicao": nome[:encontrado.start()].strip() or nome,
+        "embalagem_quantidade": float(encontrado.group(1)),
+        "embalagem_unidade": encontrado.group(2).upper(),
+    }
@@ -0,0 +1,141 @@
+"""
+Verificação de integridade dos dados: regras agrupadas por tabela.
+
+Cada tabela é lida uma vez: as linhas examinadas formam a CTE "alvo" e todas as
+regras da tabela são agregados sobre ela na mesma consulta (SUM(CASE ...)),
+em vez de um COUNT completo por regra.
+
+No modo incremental a CTE só traz o que mudou desde a marca d'água (início da
+última verificação concluída):
+    notas      — created_at/updated_at
+    nota_itens — itens das notas alteradas (a tabela não tem datas)
+    preços     — matérias-primas com preço criado desde a marca
+    produtos   — created_at/updated_at
+Componentes removidos sem alterar o produto só aparecem na verificação
+completa, que continua agendada com frequência menor.
+
+Grupos cujas tabelas não existem no banco (SQLite do docker-compose, que não
+roda as migrações) são pulados e listados em "ignoradas".
+"""
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from app.models.verificacao_integridade import VerificacaoIntegridade
+
+
+class Regra(NamedTuple):
+    tipo: str
+    severidade: str
+    descricao: str  # {n} é a quantidade encontrada
+    contagem: str  # agregado sobre a CTE alvo
+
+
+class VerificacaoTabela(NamedTuple):
+    nome: str  # chave em linhas_verificadas / estatísticas
+    alvo: str  # SELECT das linhas examinadas; {filtro} recebe o filtro incremental
+    filtro_incremental: str  # usa :desde
+    regras: List[Regra]
+    tabelas: Tuple[str, ...]  # todas precisam existir para o grupo rodar
+
+
+VERIFICACOES: List[VerificacaoTabela] = [
+    VerificacaoTabela(
+        "notas",
+        "SELECT fornecedor_id FROM notas {filtro}",
+        "WHERE created_at >= :desde OR updated_at >= :desde",
+        [Regra("notas_sem_fornecedor", "media", "{n} notas sem fornecedor associado",
+               "SUM(CASE WHEN fornecedor_id IS NULL THEN 1 ELSE 0 END)")],
+        ("notas",),
+    ),
+    VerificacaoTabela(
+        "nota_itens",
+        "SELECT i.materia_prima_id FROM nota_itens i {filtro}",
+        "JOIN notas n ON n.id = i.nota_id WHERE n.created_at >= :desde OR n.updated_at >= :desde",
+        [Regra("itens_sem_materia_prima", "alta", "{n} itens sem matéria-prima associada",
+               "SUM(CASE WHEN materia_prima_id IS NULL THEN 1 ELSE 0 END)")],
+        ("nota_itens", "notas"),
+    ),
+    VerificacaoTabela(
+        # Uma linha por matéria-prima com preço em aberto (índice parcial vigente_ate IS NULL)
+        "materias_primas_com_preco",
+        "SELECT materia_prima_id, COUNT(*) AS abertos FROM materia_prima_precos "
+        "WHERE vigente_ate IS NULL {filtro} GROUP BY materia_prima_id",
+        "AND materia_prima_id IN (SELECT materia_prima_id FROM materia_prima_precos WHERE created_at >= :desde)",
+        [Regra("precos_duplicados", "alta", "{n} matérias-primas com múltiplos preços vigentes",
+               "SUM(CASE WHEN abertos > 1 THEN 1 ELSE 0 END)")],
+        ("materia_prima_precos",),
+    ),
+    VerificacaoTabela(
+        "produtos",
+        "SELECT EXISTS (SELECT 1 FROM produto_componentes c WHERE c.produto_id = p.id) AS tem_componentes "
+        "FROM produtos p {filtro}",
+        "WHERE p.created_at >= :desde OR p.updated_at >= :desde",
+        [Regra("produtos_sem_componentes", "baixa", "{n} produtos sem componentes",
+               "SUM(CASE WHEN tem_componentes THEN 0 ELSE 1 END)")],
+        ("produtos", "produto_componentes"),
+    ),
+]
+
+
+def _consulta(verificacao: VerificacaoTabela, incremental: bool) -> str:
+    alvo = verificacao.alvo.format(filtro=verificacao.filtro_incremental if incremental else "")
+    contagens = ", ".join(f"COALESCE({r.contagem}, 0) AS {r.tipo}" for r in verificacao.regras)
+    return f"WITH alvo AS ({alvo}) SELECT COUNT(*) AS linhas, {contagens} FROM alvo"
+
+
+def _tabelas(db: Session) -> Set[str]:
+    return set(inspect(db.get_bind()).get_table_names())
+
+
+def _marca_como_parametro(db: Session, desde: datetime):
+    """No SQLite as datas são texto comparado como texto: UTC sem fuso, no formato em que o SQLAlchemy grava"""
+    if db.get_bind().dialect.name != "sqlite":
+        return desde
+    if desde.tzinfo is not None:
+        desde = desde.astimezone(timezone.utc).replace(tzinfo=None)
+    return desde.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def contar(db: Session, tabela: str) -> Optional[int]:
+    """COUNT(*) da tabela; None se ela não existe"""
+    if tabela not in _tabelas(db):
+        return None
+    return db.execute(text(f"SELECT COUNT(*) FROM {tabela}")).scalar()
+
+
+def marca_dagua(db: Session) -> Optional[datetime]:
+    """Início da última verificação concluída"""
+    return db.query(VerificacaoIntegridade.iniciada_em).filter(
+        VerificacaoIntegridade.concluida_em.isnot(None)
+    ).order_by(VerificacaoIntegridade.concluida_em.desc()).limit(1).scalar()
+
+
+def verificar(db: Session, desde: Optional[datetime] = None) -> Dict:
+    """Problemas encontrados; com desde, só nas linhas alteradas a partir dessa data"""
+    incremental = desde is not None
+    parametros = {"desde": _marca_como_parametro(db, desde)} if incremental else {}
+    problemas: List[Dict] = []
+    linhas_verificadas: Dict[str, int] = {}
+    ignoradas: List[str] = []
+    existentes = _tabelas(db)
+
+    for verificacao in VERIFICACOES:
+        if not existentes.issuperset(verificacao.tabelas):
+            ignoradas.append(verificacao.nome)
+            continue
+        resultado = db.execute(text(_consulta(verificacao, incremental)), parametros).mappings().one()
+        linhas_verificadas[verificacao.nome] = resultado["linhas"]
+        for regra in verificacao.regras:
+            quantidade = int(resultado[regra.tipo])
+            if quantidade > 0:
+                problemas.append({
+                    "tipo": regra.tipo,
+                    "descricao": regra.descricao.format(n=quantidade),
+                    "severidade": regra.severidade,
+                    "quantidade": quantidade,
+                })
+
+    return {"problemas": problemas, "linhas_verificadas": linhas_verificadas, "ignoradas": ignoradas}
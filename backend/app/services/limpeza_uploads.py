@@ -0,0 +1,130 @@
+"""
+Remoção de arquivos órfãos do diretório de uploads.
+
+Os caminhos referenciados pelas notas (arquivo_xml_path / arquivo_pdf_path) são
+lidos uma vez, normalizados (realpath) e guardados num set; o diretório é
+percorrido com os.scandir, em lotes, e cada entrada é conferida contra o set
+em memória, sem consulta ao banco por arquivo.
+
+    referenciado            — mantido, qualquer que seja a idade
+    PDF de sessão do IA     — órfão após UPLOAD_SESSAO_IA_HORAS (o uploads-ia
+                              grava <nome>_<uuid>.pdf só para reextrações)
+    demais                  — órfão após dias_manter
+
+O prazo mínimo também protege arquivos gravados entre a leitura das referências
+e a varredura (o arquivo é salvo antes do commit da nota).
+"""
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.nota import Nota
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+LOTE_ARQUIVOS = 500  # entradas conferidas / removidas por vez
+
+_SESSAO_IA_RE = re.compile(r"_[0-9a-f]{32}\.pdf$")
+
+
+def diretorio_uploads() -> Path:
+    """UPLOAD_DIR relativo à raiz do backend, como em uploads_ia"""
+    return Path(settings.UPLOAD_DIR) if os.path.isabs(settings.UPLOAD_DIR) else BASE_DIR / settings.UPLOAD_DIR
+
+
+def _normalizar(caminho: str) -> Iterable[str]:
+    if os.path.isabs(caminho):
+        return [os.path.realpath(caminho)]
+    # Caminho relativo gravado pelas tarefas: relativo ao diretório de trabalho ou à raiz do backend
+    return [os.path.realpath(caminho), os.path.realpath(BASE_DIR / caminho)]
+
+
+def caminhos_referenciados(db: Session) -> Set[str]:
+    referenciados: Set[str] = set()
+    consulta = db.query(Nota.arquivo_xml_path, Nota.arquivo_pdf_path).filter(
+        or_(Nota.arquivo_xml_path.isnot(None), Nota.arquivo_pdf_path.isnot(None))
+    ).yield_per(5000)
+    for xml_path, pdf_path in consulta:
+        for caminho in (xml_path, pdf_path):
+            if caminho:
+                referenciados.update(_normalizar(caminho))
+    return referenciados
+
+
+def _remover(lote: List[Tuple[os.DirEntry, int]], erros: List[str]) -> Tuple[int, int]:
+    """(arquivos removidos, bytes liberados)"""
+    removidos = liberados = 0
+    for entrada, tamanho in lote:
+        try:
+            os.remove(entrada.path)
+            removidos += 1
+            liberados += tamanho
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            erros.append(f"Erro ao remover {entrada.name}: {e}")
+    return removidos, liberados
+
+
+def limpar(db: Session, dias_manter: int, horas_sessao_ia: Optional[int] = None,
+           progresso: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Remove os arquivos órfãos vencidos de UPLOAD_DIR; referenciados nunca são removidos"""
+    diretorio = diretorio_uploads()
+    if not diretorio.is_dir():
+        return {"diretorio": str(diretorio), "arquivos_verificados": 0, "arquivos_removidos": 0,
+                "arquivos_referenciados": 0, "bytes_liberados": 0, "erros": []}
+
+    horas_sessao_ia = settings.UPLOAD_SESSAO_IA_HORAS if horas_sessao_ia is None else horas_sessao_ia
+    agora = datetime.now()
+    limite = (agora - timedelta(days=dias_manter)).timestamp()
+    limite_sessao_ia = (agora - timedelta(hours=horas_sessao_ia)).timestamp()
+    referenciados = caminhos_referenciados(db)
+
+    verificados = removidos = mantidos_referencia = bytes_liberados = 0
+    erros: List[str] = []
+    with os.scandir(diretorio) as entradas:
+        while True:
+            lote = list(islice(entradas, LOTE_ARQUIVOS))
+            if not lote:
+                break
+            orfaos = []
+            for entrada in lote:
+                try:
+                    if not entrada.is_file(follow_symlinks=False):
+                        continue
+                    verificados += 1
+                    if os.path.realpath(entrada.path) in referenciados:
+                        mantidos_referencia += 1
+                        continue
+                    info = entrada.stat(follow_symlinks=False)
+                    prazo = limite_sessao_ia if _SESSAO_IA_RE.search(entrada.name) else limite
+                    if info.st_mtime < prazo:
+                        orfaos.append((entrada, info.st_size))
+                except OSError as e:
+                    erros.append(f"Erro ao verificar {entrada.name}: {e}")
+            removidos_lote, liberados_lote = _remover(orfaos, erros)
+            removidos += removidos_lote
+            bytes_liberados += liberados_lote
+            if progresso:
+                progresso({"arquivos_verificados": verificados, "arquivos_removidos": removidos})
+
+    for erro in erros:
+        logger.error(erro)
+    return {
+        "diretorio": str(diretorio),
+        "arquivos_verificados": verificados,
+        "arquivos_removidos": removidos,
+        "arquivos_referenciados": mantidos_referencia,
+        "bytes_liberados": bytes_liberados,
+        "erros": erros,
+    }
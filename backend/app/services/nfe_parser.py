@@ -4,6 +4,7 @@ em estrutura de DANFE utilizada pelo sistema.
 """
 from __future__ import annotations
 
+import logging
 from dataclasses import dataclass, field
 from typing import Any, Dict, Optional
 
@@ -12,6 +13,8 @@ try:  # type-check friendly
 except Exception:  # pragma: no cover - em testes sem lib instalada
     Document = Any  # type: ignore
 
+logger = logging.getLogger(__name__)
+
 
 def _clean_text(value: Optional[str]) -> str:
     if not value:
@@ -105,7 +108,8 @@ def parse_invoice_document(doc: Document) -> Dict[str, Any]:
     }
 
     entities = getattr(doc, "entities", None) or []
-    print(f"DEBUG: Parseando {len(entities)} entidades do Document AI...")
+    logger.debug("Parseando %d entidades do Document AI", len(entities))
+    debug = logger.isEnabledFor(logging.DEBUG)  # evita a chamada por propriedade no laço interno
 
     line_items: Dict[str, LineItem] = {}
     order: list[str] = []
@@ -131,10 +135,7 @@ def parse_invoice_document(doc: Document) -> Dict[str, Any]:
                 if key not in line_items:
                     line_items[key] = LineItem()
                     order.append(key)
-                print("DEBUG: ---- LINE ITEM ----")
-                print(f"DEBUG: entity.id       : {entity_id}")
-                print(f"DEBUG: entity.parent_id: {parent_id}")
-                print(f"DEBUG: mention_text    : {mention}")
+                logger.debug("Line item id=%s parent_id=%s mention=%r", entity_id, parent_id, mention)
             else:
                 if key and key in line_items:
                     current_key = key
@@ -153,11 +154,11 @@ def parse_invoice_document(doc: Document) -> Dict[str, Any]:
 
             for prop in entity.properties:
                 key_name = prop.type_ or ""
-                print(f"   PROP type      : {prop.type_}")
-                print(f"   PROP mention   : {prop.mention_text}")
-                normalized = getattr(prop, "normalized_value", None)
-                if normalized:
-                    print(f"   PROP normalized: {normalized}")
+                if debug:
+                    logger.debug(
+                        "  prop %s: %r (normalizado: %s)",
+                        prop.type_, prop.mention_text, getattr(prop, "normalized_value", None) or "-",
+                    )
                 item.update_from_property(key_name, prop)
 
         else:
@@ -165,35 +166,35 @@ def parse_invoice_document(doc: Document) -> Dict[str, Any]:
                 cnpj = mention.replace(".", "").replace("/", "").replace("-", "").strip()
                 if len(cnpj) == 14:
                     result["cnpj_fornecedor"] = cnpj
-                    print(f"  ✓ CNPJ: {result['cnpj_fornecedor']}")
+                    logger.debug("CNPJ: %s", cnpj)
             elif "supplier" in entity_type or "vendor" in entity_type:
                 if "name" in entity_type:
                     result["fornecedor"] = mention.strip()
-                    print(f"  ✓ Fornecedor: {result['fornecedor']}")
+                    logger.debug("Fornecedor: %s", result["fornecedor"])
             elif "invoice_id" in entity_type or "invoice_number" in entity_type:
                 result["numero_nota"] = mention.strip()
-                print(f"  ✓ Número NF: {result['numero_nota']}")
+                logger.debug("Número NF: %s", result["numero_nota"])
             elif (
                 "total_amount" in entity_type
                 or "net_amount" in entity_type
                 or "amount_due" in entity_type
             ):
                 result["valor_total"] = _to_float(mention)
-                print(f"  ✓ Valor Total: R$ {result['valor_total']:.2f}")
+                logger.debug("Valor Total: R$ %.2f", result["valor_total"])
             elif "invoice_date" in entity_type or "issue_date" in entity_type:
                 result["data_emissao"] = mention.strip()
-                print(f"  ✓ Data Emissão: {result['data_emissao']}")
+                logger.debug("Data Emissão: %s", result["data_emissao"])
             elif "supplier_address" in entity_type or "vendor_address" in entity_type:
                 result["endereco"] = mention.strip()
-                print(f"  ✓ Endereço: {result['endereco'][:50]}...")
+                logger.debug("Endereço: %.50s", result["endereco"])
 
     for key in order:
         item = line_items[key]
         item_dict = item.as_dict()
         if item_dict["descricao"] or item_dict["codigo"]:
             result["itens"].append(item_dict)
-            print(f"DEBUG: ✓ Item final ({key}): {item_dict}")
+            logger.debug("Item final (%s): %s", key, item_dict)
 
-    print(f"DEBUG: ✓ Parser extraiu {len(result['itens'])} itens")
+    logger.debug("Parser extraiu %d itens", len(result["itens"]))
     return result
 
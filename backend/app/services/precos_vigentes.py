@@ -0,0 +1,145 @@
+"""
+Preço de matéria-prima e custo de produto vigentes numa data.
+
+materia_prima_precos e produto_precos guardam intervalos [vigente_desde,
+vigente_ate), com vigente_ate nulo para o valor atual. O valor numa data é o do
+intervalo que a contém:
+    PostgreSQL — tstzrange(vigente_desde, vigente_ate) @> instante, atendido pelo
+                 índice GiST (item, intervalo) da migração 0007;
+    outros     — vigente_desde <= instante pelo índice (item, vigente_desde), do
+                 mais recente para trás, conferindo vigente_ate. O SQLite guarda
+                 as datas em UTC: o instante é convertido para UTC e comparado
+                 sem fuso (instante sem fuso já é tomado como UTC).
+Se dois intervalos se sobrepõem (preço aberto duplicado), vale o que começou por
+último. Data fora de qualquer intervalo (antes do primeiro preço ou num buraco
+do histórico) não tem valor.
+
+O lote (muitos pares item x data) é uma consulta só: no PostgreSQL, VALUES com
+LATERAL ... LIMIT 1 por par; nos demais bancos, o histórico dos itens pedidos
+numa consulta e busca binária por data em Python (recuando só enquanto um
+intervalo anterior ainda pode conter a data).
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import DateTime, Integer, and_, cast, column, func, or_, select, true, values
+from sqlalchemy.orm import Session
+
+from app.models.materia_prima import MateriaPrimaPreco
+from app.models.produto import ProdutoPreco
+
+
+class PrecoVigente(NamedTuple):
+    id: int
+    valor: float  # valor_unitario da matéria-prima ou custo_total do produto
+    vigente_desde: datetime
+    vigente_ate: Optional[datetime]
+
+
+def _colunas(modelo, coluna_valor) -> tuple:
+    return modelo.id, coluna_valor, modelo.vigente_desde, modelo.vigente_ate
+
+
+def _registro(linha) -> Optional[PrecoVigente]:
+    if linha is None or linha[0] is None:
+        return None
+    id_, valor, desde, ate = linha
+    return PrecoVigente(id_, float(valor), desde, ate)
+
+
+def _postgresql(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _utc_sem_fuso(instante: datetime) -> datetime:
+    if instante.tzinfo is None:
+        return instante
+    return instante.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _vigente_em(db: Session, modelo, instante):
+    if _postgresql(db):
+        # Mesma expressão do índice GiST; data sem fuso vale no fuso da sessão
+        intervalo = func.tstzrange(modelo.vigente_desde, modelo.vigente_ate, "[)")
+        return intervalo.op("@>")(cast(instante, DateTime(timezone=True)))
+    instante = _utc_sem_fuso(instante)
+    return and_(modelo.vigente_desde <= instante,
+                or_(modelo.vigente_ate.is_(None), modelo.vigente_ate > instante))
+
+
+def _em(db: Session, modelo, coluna_item, coluna_valor, item_id: int, instante: datetime) -> Optional[PrecoVigente]:
+    return _registro(db.query(*_colunas(modelo, coluna_valor)).filter(
+        coluna_item == item_id, _vigente_em(db, modelo, instante)
+    ).order_by(modelo.vigente_desde.desc(), modelo.id.desc()).first())
+
+
+def preco_materia_prima_em(db: Session, materia_prima_id: int, instante: datetime) -> Optional[PrecoVigente]:
+    return _em(db, MateriaPrimaPreco, MateriaPrimaPreco.materia_prima_id, MateriaPrimaPreco.valor_unitario,
+               materia_prima_id, instante)
+
+
+def custo_produto_em(db: Session, produto_id: int, instante: datetime) -> Optional[PrecoVigente]:
+    return _em(db, ProdutoPreco, ProdutoPreco.produto_id, ProdutoPreco.custo_total, produto_id, instante)
+
+
+def _lote_postgresql(db: Session, modelo, coluna_item, coluna_valor,
+                     pares: Sequence[Tuple[int, datetime]]) -> List[Optional[PrecoVigente]]:
+    pedidos = values(
+        column("k", Integer), column("item_id", Integer), column("instante", DateTime(timezone=True)),
+        name="pedidos",
+    ).data([(k, item_id, instante) for k, (item_id, instante) in enumerate(pares)])
+    escolhido = select(*_colunas(modelo, coluna_valor)).where(
+        coluna_item == pedidos.c.item_id,
+        _vigente_em(db, modelo, pedidos.c.instante),
+    ).order_by(modelo.vigente_desde.desc(), modelo.id.desc()).limit(1).lateral("escolhido")
+
+    resultado: List[Optional[PrecoVigente]] = [None] * len(pares)
+    consulta = select(pedidos.c.k, *escolhido.c).select_from(pedidos).outerjoin(escolhido, true())
+    for k, *linha in db.execute(consulta):
+        resultado[k] = _registro(linha)
+    return resultado
+
+
+def _lote_historico(db: Session, modelo, coluna_item, coluna_valor,
+                    pares: Sequence[Tuple[int, datetime]]) -> List[Optional[PrecoVigente]]:
+    historicos: Dict[int, List[PrecoVigente]] = defaultdict(list)
+    consulta = db.query(coluna_item, *_colunas(modelo, coluna_valor)).filter(
+        coluna_item.in_({item_id for item_id, _ in pares})
+    ).order_by(coluna_item, modelo.vigente_desde, modelo.id)
+    for item_id, *linha in consulta:
+        historicos[item_id].append(_registro(linha))
+    # Comparação em UTC sem fuso: o SQLite devolve datas com e sem fuso conforme foram gravadas
+    inicios: Dict[int, List[datetime]] = {}
+    fins_ate: Dict[int, List[datetime]] = {}  # maior vigente_ate até cada posição (aberto: datetime.max)
+    for item_id, registros in historicos.items():
+        inicios[item_id] = [_utc_sem_fuso(r.vigente_desde) for r in registros]
+        maior = datetime.min
+        fins_ate[item_id] = []
+        for r in registros:
+            maior = max(maior, datetime.max if r.vigente_ate is None else _utc_sem_fuso(r.vigente_ate))
+            fins_ate[item_id].append(maior)
+
+    resultado: List[Optional[PrecoVigente]] = []
+    for item_id, instante in pares:
+        instante = _utc_sem_fuso(instante)
+        registros = historicos.get(item_id, [])
+        i = bisect_right(inicios.get(item_id, []), instante) - 1
+        registro = None
+        # Do último que começou até o instante para trás, enquanto algum ainda pode contê-lo
+        while i >= 0 and fins_ate[item_id][i] > instante:
+            if registros[i].vigente_ate is None or _utc_sem_fuso(registros[i].vigente_ate) > instante:
+                registro = registros[i]
+                break
+            i -= 1
+        resultado.append(registro)
+    return resultado
+
+
+def precos_materias_primas_em(db: Session, pares: Sequence[Tuple[int, datetime]]) -> List[Optional[PrecoVigente]]:
+    """Preço vigente de cada par (materia_prima_id, instante), na ordem dos pares"""
+    if not pares:
+        return []
+    lote = _lote_postgresql if _postgresql(db) else _lote_historico
+    return lote(db, MateriaPrimaPreco, MateriaPrimaPreco.materia_prima_id, MateriaPrimaPreco.valor_unitario, pares)
@@ -0,0 +1,169 @@
+"""
+Resumo dos históricos de preços a partir do agregado diário (variacoes_preco_diarias).
+
+Cada linha guarda, por item e dia de vigente_desde, quantos preços começaram
+naquele dia e a soma de |preço - preço anterior do item|. Quando a sessão
+insere, altera ou remove preços, as linhas dos itens afetados são recalculadas
+na mesma transação (after_flush) a partir do histórico só desses itens.
+Escritas feitas fora do ORM (COPY, DELETE/UPDATE em lote) devem chamar
+recalcular() para os itens afetados ou reconstruir().
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy import String, delete, event, func, inspect, literal, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models.historico_resumo import VariacaoPrecoDiaria
+from app.models.materia_prima import MateriaPrima, MateriaPrimaPreco
+from app.models.produto import Produto, ProdutoPreco
+from app.utils import http_cache
+
+# tipo -> (modelo de preço, coluna do item, coluna do valor)
+TIPOS = {
+    "materia_prima": (MateriaPrimaPreco, "materia_prima_id", "valor_unitario"),
+    "produto": (ProdutoPreco, "produto_id", "custo_total"),
+}
+
+LOTE_ITENS = 500  # itens por DELETE/INSERT (tamanho da lista IN)
+
+
+def _agregado(tipo: str, itens: Optional[list] = None):
+    """SELECT (tipo, item_id, dia, total_precos, soma_variacao_abs) a partir da tabela de preços"""
+    modelo, coluna_item, coluna_valor = TIPOS[tipo]
+    tabela = modelo.__table__
+    item = tabela.c[coluna_item]
+    valor = tabela.c[coluna_valor]
+    anterior = func.lag(valor).over(partition_by=item, order_by=(tabela.c.vigente_desde, tabela.c.id))
+
+    variacoes = select(
+        item.label("item_id"),
+        func.date(tabela.c.vigente_desde).label("dia"),
+        func.abs(func.coalesce(valor - anterior, 0)).label("variacao"),
+    )
+    if itens is not None:
+        # A janela é particionada por item, então filtrar antes dela não muda o resultado
+        variacoes = variacoes.where(item.in_(itens))
+    v = variacoes.subquery()
+    return select(
+        literal(tipo, String(20)), v.c.item_id, v.c.dia, func.count(), func.sum(v.c.variacao)
+    ).group_by(v.c.item_id, v.c.dia)
+
+
+def _inserir(conn: Connection, tipo: str, itens: Optional[list] = None) -> None:
+    t = VariacaoPrecoDiaria.__table__
+    conn.execute(
+        t.insert().from_select(
+            ["tipo", "item_id", "dia", "total_precos", "soma_variacao_abs"], _agregado(tipo, itens)
+        )
+    )
+
+
+def recalcular(conn: Connection, tipo: str, itens: Iterable[int]) -> None:
+    """Refaz as linhas dos itens informados (na transação de conn)"""
+    t = VariacaoPrecoDiaria.__table__
+    itens = sorted(set(itens))
+    for inicio in range(0, len(itens), LOTE_ITENS):
+        lote = itens[inicio:inicio + LOTE_ITENS]
+        conn.execute(delete(t).where(t.c.tipo == tipo, t.c.item_id.in_(lote)))
+        _inserir(conn, tipo, lote)
+
+
+def reconstruir(conn: Connection, tipos: Optional[Iterable[str]] = None) -> int:
+    """Recalcula o agregado (todos os tipos ou só os informados); retorna a quantidade de linhas"""
+    t = VariacaoPrecoDiaria.__table__
+    tipos = list(TIPOS) if tipos is None else list(tipos)
+    conn.execute(delete(t).where(t.c.tipo.in_(tipos)))
+    for tipo in tipos:
+        _inserir(conn, tipo)
+    return conn.execute(select(func.count()).select_from(t)).scalar()
+
+
+# ---- Manutenção a partir das sessões ----
+
+def _itens_alterados(obj, coluna_item: str, coluna_valor: str, novo_ou_removido: bool) -> Set[int]:
+    if novo_ou_removido:
+        return {getattr(obj, coluna_item)}
+    estado = inspect(obj)
+    historico_item = estado.attrs[coluna_item].history
+    if not (historico_item.has_changes()
+            or estado.attrs[coluna_valor].history.has_changes()
+            or estado.attrs["vigente_desde"].history.has_changes()):
+        return set()
+    # Preço movido de item: os dois históricos mudam
+    return {getattr(obj, coluna_item), *historico_item.deleted}
+
+
+@event.listens_for(Session, "after_flush")
+def _ao_flush(session, contexto):
+    afetados: Dict[str, Set[int]] = defaultdict(set)
+    for objetos, novo_ou_removido in ((session.new, True), (session.deleted, True), (session.dirty, False)):
+        for obj in objetos:
+            for tipo, (modelo, coluna_item, coluna_valor) in TIPOS.items():
+                if isinstance(obj, modelo):
+                    afetados[tipo] |= _itens_alterados(obj, coluna_item, coluna_valor, novo_ou_removido)
+    conn = session.connection() if afetados else None
+    for tipo, itens in afetados.items():
+        itens.discard(None)
+        if itens:
+            recalcular(conn, tipo, itens)
+            # Gravado pela conexão, fora dos hooks de cache da sessão
+            http_cache.marcar_alteradas(session, VariacaoPrecoDiaria.__tablename__)
+
+
+# ---- Consulta ----
+
+def resumo(db: Session, periodo_ini: Optional[date] = None, periodo_fim: Optional[date] = None,
+           limite_top: int = 5) -> dict:
+    """Totais, variação média absoluta e itens com mais preços no período (dias inclusivos)"""
+    t = VariacaoPrecoDiaria
+
+    def no_periodo(consulta, tipo: str):
+        consulta = consulta.filter(t.tipo == tipo)
+        if periodo_ini:
+            consulta = consulta.filter(t.dia >= periodo_ini)
+        if periodo_fim:
+            consulta = consulta.filter(t.dia <= periodo_fim)
+        return consulta
+
+    def estatisticas(tipo: str, modelo_item):
+        total, soma = no_periodo(
+            db.query(func.sum(t.total_precos), func.sum(t.soma_variacao_abs)), tipo
+        ).one()
+        if not total:
+            # Sem preços no período; no SQLite a tabela do item pode nem existir (produtos)
+            return 0, 0, []
+        total_item = func.sum(t.total_precos).label("total")
+        top = no_periodo(
+            db.query(modelo_item.nome, total_item).select_from(t)
+            .join(modelo_item, modelo_item.id == t.item_id), tipo
+        ).group_by(modelo_item.id, modelo_item.nome).order_by(total_item.desc(), modelo_item.id).limit(limite_top).all()
+        return int(total), float(soma) / total, top
+
+    total_mp, variacao_mp, top_mp = estatisticas("materia_prima", MateriaPrima)
+    total_prod, variacao_prod, top_prod = estatisticas("produto", Produto)
+
+    return {
+        "periodo": {
+            "inicio": periodo_ini,
+            "fim": periodo_fim
+        },
+        "materias_primas": {
+            "total_precos": total_mp,
+            "variacao_media_absoluta": variacao_mp,
+            "top_variacoes": [
+                {"nome": nome, "total_precos": int(total)}
+                for nome, total in top_mp
+            ]
+        },
+        "produtos": {
+            "total_custos": total_prod,
+            "variacao_media_absoluta": variacao_prod,
+            "top_variacoes": [
+                {"nome": nome, "total_custos": int(total)}
+                for nome, total in top_prod
+            ]
+        }
+    }
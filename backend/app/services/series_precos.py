@@ -0,0 +1,151 @@
+"""
+Séries de preço por matéria-prima agrupadas por dia, semana ou mês, para gráficos.
+
+O agrupamento sai de uma consulta só: cada preço ganha o início do seu período
+(date_trunc no PostgreSQL, date/strftime no SQLite; semana começando na
+segunda-feira nos dois) e as janelas por (matéria-prima, período) dão último,
+mínimo, máximo, média e quantidade; fica uma linha por período, a do último preço.
+
+Quando uma série tem mais períodos que o orçamento de pontos pedido, ela é
+reduzida por LTTB (Largest-Triangle-Three-Buckets) sobre o último preço de cada
+período: o primeiro e o último período ficam, e de cada faixa intermediária fica
+o período que forma o maior triângulo com os vizinhos, o que preserva picos e
+quedas. Os períodos mantidos levam seus próprios mínimo/máximo/média.
+
+Cada resposta traz no máximo MAX_SERIES séries (as de menor id entre as pedidas,
+ou entre todas as ativas com histórico quando nenhuma é pedida); "truncado"
+indica que havia mais.
+"""
+from datetime import date, datetime, time
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.materia_prima import MateriaPrima, MateriaPrimaPreco
+
+GRANULARIDADES = ("dia", "semana", "mes")
+COLUNAS = ["periodo", "ultimo", "minimo", "maximo", "media", "quantidade"]
+
+MAX_SERIES = 50
+
+_DATE_TRUNC = {"dia": "day", "semana": "week", "mes": "month"}
+
+
+def _periodo(db: Session, granularidade: str):
+    coluna = MateriaPrimaPreco.vigente_desde
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc(_DATE_TRUNC[granularidade], coluna)
+    if granularidade == "dia":
+        return func.date(coluna)
+    if granularidade == "semana":
+        # Próximo domingo (ou o próprio) menos 6 dias = segunda-feira da semana
+        return func.date(coluna, "weekday 0", "-6 days")
+    return func.strftime("%Y-%m-01", coluna)
+
+
+def _data(valor) -> str:
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return str(valor)[:10]
+
+
+def lttb(pontos: Sequence[Sequence[float]], limite: int) -> List[int]:
+    """Índices dos pontos (x, y) mantidos pelo LTTB; x crescente"""
+    n = len(pontos)
+    if limite >= n or limite < 3:
+        return list(range(n))
+
+    largura = (n - 2) / (limite - 2)
+    escolhidos = [0]
+    a = 0
+    for faixa in range(limite - 2):
+        inicio = int(faixa * largura) + 1
+        fim = int((faixa + 1) * largura) + 1
+        # Média da faixa seguinte (ou o último ponto) como terceiro vértice
+        prox_inicio, prox_fim = fim, min(int((faixa + 2) * largura) + 1, n)
+        if prox_inicio >= prox_fim:
+            prox_inicio, prox_fim = n - 1, n
+        quantidade = prox_fim - prox_inicio
+        media_x = sum(pontos[i][0] for i in range(prox_inicio, prox_fim)) / quantidade
+        media_y = sum(pontos[i][1] for i in range(prox_inicio, prox_fim)) / quantidade
+
+        ax, ay = pontos[a]
+        melhor, maior_area = inicio, -1.0
+        for i in range(inicio, fim):
+            x, y = pontos[i]
+            area = abs((ax - media_x) * (y - ay) - (ax - x) * (media_y - ay))
+            if area > maior_area:
+                melhor, maior_area = i, area
+        escolhidos.append(melhor)
+        a = melhor
+    escolhidos.append(n - 1)
+    return escolhidos
+
+
+def series(db: Session, granularidade: str = "semana", materia_prima_ids: Optional[Sequence[int]] = None,
+           periodo_ini: Optional[date] = None, periodo_fim: Optional[date] = None,
+           pontos: int = 200) -> dict:
+    """Série agrupada por matéria-prima ativa com histórico, até MAX_SERIES (pontos no formato de COLUNAS)"""
+    periodo = _periodo(db, granularidade).label("periodo")
+    item = MateriaPrimaPreco.materia_prima_id
+    janela = {"partition_by": (item, periodo)}
+
+    def filtrar(consulta):
+        consulta = consulta.join(MateriaPrima, MateriaPrima.id == item).filter(MateriaPrima.is_active == True)
+        if materia_prima_ids:
+            consulta = consulta.filter(item.in_(list(materia_prima_ids)))
+        if periodo_ini:
+            consulta = consulta.filter(MateriaPrimaPreco.vigente_desde >= datetime.combine(periodo_ini, time.min))
+        if periodo_fim:
+            consulta = consulta.filter(MateriaPrimaPreco.vigente_desde <= datetime.combine(periodo_fim, time.max))
+        return consulta
+
+    # Uma a mais que o limite só para saber se a resposta foi cortada
+    selecionadas = [mp_id for (mp_id,) in filtrar(db.query(item)).distinct().order_by(item).limit(MAX_SERIES + 1)]
+    truncado = len(selecionadas) > MAX_SERIES
+    selecionadas = selecionadas[:MAX_SERIES]
+
+    precos = db.query(
+        item.label("materia_prima_id"),
+        periodo,
+        MateriaPrimaPreco.valor_unitario.label("ultimo"),
+        func.row_number().over(
+            order_by=(MateriaPrimaPreco.vigente_desde.desc(), MateriaPrimaPreco.id.desc()), **janela
+        ).label("ordem"),
+        func.min(MateriaPrimaPreco.valor_unitario).over(**janela).label("minimo"),
+        func.max(MateriaPrimaPreco.valor_unitario).over(**janela).label("maximo"),
+        func.avg(MateriaPrimaPreco.valor_unitario).over(**janela).label("media"),
+        func.count().over(**janela).label("quantidade"),
+    )
+    precos = filtrar(precos).filter(item.in_(selecionadas)).subquery()
+
+    linhas = db.query(
+        precos.c.materia_prima_id, precos.c.periodo, precos.c.ultimo,
+        precos.c.minimo, precos.c.maximo, precos.c.media, precos.c.quantidade,
+    ).filter(precos.c.ordem == 1).order_by(precos.c.materia_prima_id, precos.c.periodo)
+
+    por_item: Dict[int, List[list]] = {}
+    for materia_prima_id, inicio, ultimo, minimo, maximo, media, quantidade in linhas:
+        por_item.setdefault(materia_prima_id, []).append([
+            _data(inicio), round(float(ultimo), 4), round(float(minimo), 4),
+            round(float(maximo), 4), round(float(media), 4), quantidade,
+        ])
+
+    nomes = dict(db.query(MateriaPrima.id, MateriaPrima.nome).filter(MateriaPrima.id.in_(selecionadas)).all())
+    resultado = []
+    for materia_prima_id, periodos in por_item.items():
+        total = len(periodos)
+        if total > pontos:
+            eixo = [(date.fromisoformat(p[0]).toordinal(), p[1]) for p in periodos]
+            periodos = [periodos[i] for i in lttb(eixo, pontos)]
+        resultado.append({
+            "materia_prima_id": materia_prima_id,
+            "nome": nomes.get(materia_prima_id),
+            "periodos": total,
+            "pontos": periodos,
+        })
+    return {"granularidade": granularidade, "colunas": COLUNAS, "series": resultado,
+            "limite_series": MAX_SERIES, "truncado": truncado}
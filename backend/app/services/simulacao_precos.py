@@ -0,0 +1,239 @@
+"""
+Simulação de cenários de preço ("e se o fio de cobre subir 12% e o verniz 5%?")
+sobre a estrutura de produtos, sem gravar nada em produto_precos.
+
+A estrutura é uma matriz esparsa produto x matéria-prima guardada por coluna:
+para cada matéria-prima, a lista (linha do produto, coeficiente), em que o
+coeficiente já converte a quantidade do componente para a unidade do preço.
+Entram as duas fontes de composição do sistema:
+    produto       — produto_componentes (unidade convertida para a da matéria-prima)
+    produto_final — produtos_finais.componentes (JSON; unidadeMedida convertida
+                    para a da matéria-prima, como na listagem)
+Componentes de produto final sem matéria-prima correspondente entram como custo
+fixo (quantidade x valorUnitario salvo), igual em todos os cenários.
+
+Um cenário é um vetor de variações de preço, esparso também. A variação de custo
+de todos os cenários sai de uma passada pelas colunas alteradas:
+delta[cenário][produto] += coeficiente x (preço novo - preço atual), ou seja, o
+custo é O(componentes das matérias-primas alteradas), não O(produtos x cenários).
+
+A matriz é montada uma vez e reaproveitada enquanto as tabelas de que depende não
+mudam (versões das tags do cache HTTP, como em conversao_unidades).
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+
+from app.models.materia_prima import MateriaPrima, MateriaPrimaPreco
+from app.models.produto import Produto, ProdutoComponente
+from app.models.produto_final import ProdutoFinal
+from app.services import conversao_unidades
+from app.utils import http_cache
+
+logger = logging.getLogger(__name__)
+
+TABELAS = ["produtos", "produto_componentes", "produtos_finais", "materias_primas", "materia_prima_precos", "unidades"]
+RECARGA_LOCAL = 60  # segundos; só vale quando as versões não vêm do Redis
+
+
+class ItemMatriz(NamedTuple):
+    tipo: str  # "produto" | "produto_final"
+    id: int
+    nome: str
+
+
+class MatrizBOM(NamedTuple):
+    linhas: List[ItemMatriz]
+    materias: List[Tuple[int, str]]  # (id, nome) de cada coluna
+    coluna: Dict[int, int]  # materia_prima_id -> coluna
+    colunas: List[List[Tuple[int, float]]]  # por coluna: (linha, coeficiente)
+    precos: List[Optional[float]]  # preço atual de cada coluna (None = sem preço)
+    custo_base: List[float]  # custo atual de cada linha (sem preço conta como 0)
+    incompletos: List[bool]  # linha com matéria-prima sem preço ou unidade sem conversão
+
+
+def montar(db: Session) -> MatrizBOM:
+    conversao = conversao_unidades.tabela(db)
+
+    materias, coluna, precos = [], {}, []
+    por_nome: Dict[str, int] = {}
+    unidades: List[str] = []
+    consulta = db.query(
+        MateriaPrima.id, MateriaPrima.nome, MateriaPrima.nome_exibicao, MateriaPrima.unidade_codigo,
+        MateriaPrima.is_active, MateriaPrimaPreco.valor_unitario,
+    ).outerjoin(
+        MateriaPrimaPreco,
+        and_(MateriaPrimaPreco.materia_prima_id == MateriaPrima.id, MateriaPrimaPreco.vigente_ate.is_(None))
+    ).order_by(MateriaPrima.id, MateriaPrimaPreco.vigente_desde.desc())
+    for mp_id, nome, nome_exibicao, unidade, ativa, valor in consulta:
+        if mp_id in coluna:
+            continue  # mais de um preço aberto: fica o mais recente
+        coluna[mp_id] = len(materias)
+        materias.append((mp_id, nome))
+        precos.append(float(valor) if valor is not None else None)
+        unidades.append(unidade)
+        if not ativa:
+            continue  # a listagem de produtos finais só atualiza o preço de matérias-primas ativas
+        por_nome.setdefault(nome.strip().lower(), coluna[mp_id])
+        if nome_exibicao:
+            por_nome.setdefault(nome_exibicao.strip().lower(), coluna[mp_id])
+
+    linhas: List[ItemMatriz] = []
+    colunas: List[List[Tuple[int, float]]] = [[] for _ in materias]
+    fixo: List[float] = []
+    incompletos: List[bool] = []
+
+    # produto_componentes: preço por unidade da matéria-prima (como em calcular_custo_produto)
+    linha_produto: Dict[int, int] = {}
+    for produto_id, nome in db.query(Produto.id, Produto.nome).order_by(Produto.id):
+        linha_produto[produto_id] = len(linhas)
+        linhas.append(ItemMatriz("produto", produto_id, nome))
+        fixo.append(0.0)
+        incompletos.append(False)
+    componentes = db.query(
+        ProdutoComponente.produto_id, ProdutoComponente.materia_prima_id,
+        ProdutoComponente.quantidade, ProdutoComponente.unidade_codigo,
+    )
+    for produto_id, mp_id, quantidade, unidade in componentes:
+        linha = linha_produto.get(produto_id)
+        c = coluna.get(mp_id)
+        if linha is None or c is None:
+            continue
+        fator = conversao.fator(unidade, unidades[c])
+        if fator is None:
+            incompletos[linha] = True
+            continue
+        colunas[c].append((linha, float(quantidade) * fator))
+
+    # produtos_finais.componentes: preço por unidade da matéria-prima (como na listagem)
+    for produto_id, nome, itens in db.query(ProdutoFinal.id, ProdutoFinal.nome, ProdutoFinal.componentes).filter(
+        ProdutoFinal.ativo == True
+    ).order_by(ProdutoFinal.id):
+        linha = len(linhas)
+        linhas.append(ItemMatriz("produto_final", produto_id, nome))
+        fixo.append(0.0)
+        incompletos.append(False)
+        for componente in itens or []:
+            try:
+                quantidade = float(componente.get("quantidade", 0))
+                c = por_nome.get(str(componente.get("materiaPrimaNome", "")).strip().lower())
+                if c is None:
+                    fixo[linha] += quantidade * float(componente.get("valorUnitario", 0))
+                    continue
+            except (ValueError, TypeError, AttributeError):
+                logger.warning("Componente inválido no produto final %s: %s", produto_id, componente)
+                continue
+            fator = conversao.fator(componente.get("unidadeMedida"), unidades[c])
+            colunas[c].append((linha, quantidade * (fator if fator is not None else 1.0)))
+
+    custo_base = list(fixo)
+    for c, entradas in enumerate(colunas):
+        preco = precos[c]
+        for linha, coeficiente in entradas:
+            if preco is None:
+                incompletos[linha] = True
+            else:
+                custo_base[linha] += coeficiente * preco
+
+    nao_nulos = sum(len(e) for e in colunas)
+    logger.debug("Matriz de simulação: %d produtos x %d matérias-primas, %d componentes",
+                 len(linhas), len(materias), nao_nulos)
+    return MatrizBOM(linhas, materias, coluna, colunas, precos, custo_base, incompletos)
+
+
+_matriz: Optional[MatrizBOM] = None
+_versao: Optional[tuple] = None
+_carregada_em = 0.0
+_lock = threading.Lock()
+
+
+def matriz(db: Session) -> MatrizBOM:
+    """Matriz atual (remontada se produtos, componentes, preços ou unidades mudaram)"""
+    global _matriz, _versao, _carregada_em
+    atual = http_cache.versoes(TABELAS)
+    agora = time.monotonic()
+    with _lock:
+        if (_matriz is not None and _versao == atual
+                and (atual[0] == "redis" or agora - _carregada_em < RECARGA_LOCAL)):
+            return _matriz
+    nova = montar(db)
+    with _lock:
+        _matriz, _versao, _carregada_em = nova, atual, agora
+    return nova
+
+
+def _precos_do_cenario(m: MatrizBOM, variacoes: Sequence[dict]) -> Dict[int, float]:
+    """coluna -> preço simulado; variações posteriores sobrescrevem as anteriores"""
+    novos: Dict[int, float] = {}
+    for variacao in variacoes:
+        if variacao.get("materia_prima_id") is not None:
+            c = m.coluna.get(variacao["materia_prima_id"])
+            alvo = [c] if c is not None else []
+        else:
+            trecho = variacao["nome_contem"].lower()
+            alvo = [c for c, (_, nome) in enumerate(m.materias) if trecho in nome.lower()]
+        for c in alvo:
+            if variacao.get("preco") is not None:
+                novos[c] = float(variacao["preco"])
+            elif m.precos[c] is not None:
+                novos[c] = m.precos[c] * (1 + float(variacao["percentual"]) / 100)
+    return novos
+
+
+def simular(db: Session, cenarios: Sequence[dict], limite_produtos: int = 50) -> List[dict]:
+    """Variação de custo por produto em cada cenário ({"nome", "variacoes": [...]})"""
+    m = matriz(db)
+
+    # Variação de preço por coluna, agrupada para uma passada só por coluna alterada
+    por_coluna: Dict[int, List[Tuple[int, float]]] = defaultdict(list)  # coluna -> [(cenário, delta)]
+    alteradas: List[int] = []
+    for s, cenario in enumerate(cenarios):
+        novos = _precos_do_cenario(m, cenario["variacoes"])
+        alteradas.append(len(novos))
+        for c, preco in novos.items():
+            delta = preco - (m.precos[c] or 0.0)
+            if delta:
+                por_coluna[c].append((s, delta))
+
+    deltas: List[Dict[int, float]] = [defaultdict(float) for _ in cenarios]
+    for c, variacoes in por_coluna.items():
+        entradas = m.colunas[c]
+        for s, delta_preco in variacoes:
+            delta_cenario = deltas[s]
+            for linha, coeficiente in entradas:
+                delta_cenario[linha] += coeficiente * delta_preco
+
+    resultados = []
+    for s, cenario in enumerate(cenarios):
+        afetados = sorted(deltas[s].items(), key=lambda item: (-abs(item[1]), item[0]))
+        produtos = []
+        for linha, delta in afetados[:limite_produtos]:
+            item = m.linhas[linha]
+            base = m.custo_base[linha]
+            produtos.append({
+                "tipo": item.tipo,
+                "id": item.id,
+                "nome": item.nome,
+                "custo_atual": round(base, 4),
+                "custo_simulado": round(base + delta, 4),
+                "variacao": round(delta, 4),
+                "variacao_percentual": round(delta / base * 100, 4) if base else None,
+                "custo_incompleto": m.incompletos[linha],
+            })
+        total_base = sum(m.custo_base[linha] for linha, _ in afetados)
+        total_delta = sum(delta for _, delta in afetados)
+        resultados.append({
+            "nome": cenario["nome"],
+            "materias_primas_alteradas": alteradas[s],
+            "produtos_afetados": len(afetados),
+            "custo_atual_afetados": round(total_base, 2),
+            "variacao_total": round(total_delta, 2),
+            "variacao_percentual": round(total_delta / total_base * 100, 4) if total_base else None,
+            "produtos": produtos,
+        })
+    return resultados
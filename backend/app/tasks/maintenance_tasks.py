@@ -3,22 +3,150 @@ from app.celery_app import celery_app
 from app.database import SessionLocal
 from app.models.audit import AuditLog
 from app.models.nota import Nota
-from app.models.materia_prima_preco import MateriaPrimaPreco
-from app.models.produto_preco import ProdutoPreco
+from app.models.fornecedor import Fornecedor
+from app.models.materia_prima import MateriaPrima, MateriaPrimaPreco
+from app.models.produto import ProdutoPreco
+from app.models.verificacao_integridade import VerificacaoIntegridade
 from app.config import get_settings
+from app.services.backup import run_backup
+from app.services import integridade, limpeza_uploads, resumo_historicos
+from app.utils import http_cache
 import logging
-import os
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
-from sqlalchemy import and_, func, or_
+import re
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional
+from sqlalchemy import and_, func, or_, select, text, update
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+_AUDIT_PARTITION_RE = re.compile(r"^audit_logs_p(\d{4})(\d{2})$")
+
+
+def _inicio_mes(data: datetime) -> datetime:
+    return datetime(data.year, data.month, 1, tzinfo=timezone.utc)
+
+
+def _proximo_mes(data: datetime) -> datetime:
+    return datetime(data.year + data.month // 12, data.month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def _audit_particionado(db) -> bool:
+    if db.bind.dialect.name != "postgresql":
+        return False
+    return bool(db.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'audit_logs'"
+    )).scalar())
+
+
+def _particoes_audit(db) -> Dict[str, datetime]:
+    """Partições mensais de audit_logs e o fim (exclusivo) do intervalo de cada uma"""
+    nomes = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'audit_logs'::regclass"
+    )).scalars().all()
+    particoes = {}
+    for nome in nomes:
+        match = _AUDIT_PARTITION_RE.match(nome)
+        if match:
+            inicio = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+            particoes[nome] = _proximo_mes(inicio)
+    return particoes
+
+
+def _particao_default_audit(db) -> Optional[str]:
+    return db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'audit_logs'::regclass AND pg_get_expr(c.relpartbound, c.oid) = 'DEFAULT'"
+    )).scalar()
+
+
+def _criar_particao_audit(db, nome: str, inicio: datetime, fim: datetime, default: Optional[str]) -> int:
+    """Cria a partição do mês; linhas do mês já gravadas na partição default são movidas para ela"""
+    limites = f"FOR VALUES FROM ('{inicio.isoformat()}') TO ('{fim.isoformat()}')"
+    intervalo = {"inicio": inicio, "fim": fim}
+    no_mes = "created_at >= :inicio AND created_at < :fim"
+    if default is None or not db.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {no_mes})"), intervalo
+    ).scalar():
+        db.execute(text(f"CREATE TABLE {nome} PARTITION OF audit_logs {limites}"))
+        return 0
+    # CREATE ... PARTITION OF falharia: a default já tem linhas no intervalo. A tabela é
+    # criada à parte, recebe as linhas e é anexada depois que elas saem da default.
+    db.execute(text(f"CREATE TABLE {nome} (LIKE audit_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    movidas = db.execute(
+        text(f"INSERT INTO {nome} SELECT * FROM {default} WHERE {no_mes}"), intervalo
+    ).rowcount
+    db.execute(text(f"DELETE FROM {default} WHERE {no_mes}"), intervalo)
+    db.execute(text(f"ALTER TABLE audit_logs ATTACH PARTITION {nome} {limites}"))
+    return movidas
+
+
+def garantir_particoes_audit(db, meses_a_frente: int = 3) -> List[str]:
+    """Cria as partições mensais de audit_logs até meses_a_frente (PostgreSQL)"""
+    if not _audit_particionado(db):
+        return []
+    existentes = _particoes_audit(db)
+    default = _particao_default_audit(db)
+    criadas = []
+    mes = _inicio_mes(datetime.now(timezone.utc))
+    for _ in range(meses_a_frente + 1):
+        nome = f"audit_logs_p{mes:%Y%m}"
+        fim = _proximo_mes(mes)
+        if nome not in existentes:
+            try:
+                movidas = _criar_particao_audit(db, nome, mes, fim, default)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error("Partição %s não criada: %s", nome, e)
+            else:
+                criadas.append(nome)
+                if movidas:
+                    logger.info("Partição %s criada com %s logs movidos de %s", nome, movidas, default)
+        mes = fim
+    return criadas
+
+
+def _remover_particoes_audit(db, data_limite: datetime) -> List[str]:
+    """Remove partições inteiramente anteriores à data limite"""
+    removidas = []
+    for nome, fim in sorted(_particoes_audit(db).items()):
+        if fim <= data_limite:
+            db.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {nome}"))
+            db.execute(text(f"DROP TABLE {nome}"))
+            db.commit()
+            removidas.append(nome)
+    return removidas
+
+
+def _remover_logs_em_lotes(db, data_limite: datetime, tamanho_lote: int) -> int:
+    """DELETE em lotes curtos pelo índice de created_at, com commit a cada lote"""
+    total = 0
+    while True:
+        removidos = db.execute(
+            text(
+                "DELETE FROM audit_logs WHERE id IN ("
+                "SELECT id FROM audit_logs WHERE created_at < :limite LIMIT :lote)"
+            ),
+            {"limite": data_limite, "lote": tamanho_lote},
+        ).rowcount
+        db.commit()
+        total += removidos
+        if removidos < tamanho_lote:
+            return total
+
 
 @celery_app.task(bind=True, name="app.tasks.maintenance_tasks.limpar_logs_antigos")
-def limpar_logs_antigos(self, dias_manter: int = 90):
-    """Tarefa para limpar logs de auditoria antigos"""
+def limpar_logs_antigos(self, dias_manter: int = 90, tamanho_lote: int = 5000):
+    """Tarefa para limpar logs de auditoria antigos
+    
+    No PostgreSQL remove partições mensais inteiras e cria as dos próximos meses;
+    o que sobrar (mês parcial, partição default, SQLite) é apagado em lotes.
+    """
     try:
         current_task.update_state(
             state="PROGRESS",
@@ -29,44 +157,32 @@ def limpar_logs_antigos(self, dias_manter: int = 90):
         
         try:
             # Calcular data limite
-            data_limite = datetime.now() - timedelta(days=dias_manter)
+            data_limite = datetime.now(timezone.utc) - timedelta(days=dias_manter)
+            
+            particoes_removidas = []
+            particoes_criadas = []
+            if _audit_particionado(db):
+                current_task.update_state(
+                    state="PROGRESS",
+                    meta={"status": "Removendo partições antigas..."}
+                )
+                particoes_removidas = _remover_particoes_audit(db, data_limite)
+                particoes_criadas = garantir_particoes_audit(db)
             
             current_task.update_state(
                 state="PROGRESS",
-                meta={"status": "Contando logs antigos..."}
+                meta={"status": "Removendo logs antigos em lotes..."}
             )
             
-            # Contar logs antigos
-            total_logs_antigos = db.query(AuditLog).filter(
-                AuditLog.created_at < data_limite
-            ).count()
-            
-            if total_logs_antigos == 0:
-                return {
-                    "status": "sucesso",
-                    "message": "Nenhum log antigo para limpar",
-                    "dias_manter": dias_manter,
-                    "logs_removidos": 0
-                }
-            
-            current_task.update_state(
-                state="PROGRESS",
-                meta={"status": f"Removendo {total_logs_antigos} logs antigos..."}
-            )
-            
-            # Remover logs antigos
-            logs_removidos = db.query(AuditLog).filter(
-                AuditLog.created_at < data_limite
-            ).delete()
-            
-            db.commit()
+            logs_removidos = _remover_logs_em_lotes(db, data_limite, tamanho_lote)
             
             resultado = {
                 "status": "sucesso",
                 "message": "Limpeza de logs concluída",
                 "dias_manter": dias_manter,
                 "data_limite": data_limite.isoformat(),
-                "total_logs_antigos": total_logs_antigos,
+                "particoes_removidas": particoes_removidas,
+                "particoes_criadas": particoes_criadas,
                 "logs_removidos": logs_removidos
             }
             
@@ -94,101 +210,49 @@ def limpar_logs_antigos(self, dias_manter: int = 90):
 
 @celery_app.task(bind=True, name="app.tasks.maintenance_tasks.limpar_arquivos_antigos")
 def limpar_arquivos_antigos(self, dias_manter: int = 30):
-    """Tarefa para limpar arquivos antigos do diretório de uploads"""
+    """Tarefa para remover arquivos órfãos do diretório de uploads (referenciados por notas são mantidos)"""
     try:
         current_task.update_state(
             state="PROGRESS",
-            meta={"status": "Iniciando limpeza de arquivos antigos..."}
-        )
-        
-        upload_dir = settings.UPLOAD_DIR
-        
-        if not os.path.exists(upload_dir):
-            return {
-                "status": "sucesso",
-                "message": "Diretório de uploads não existe",
-                "arquivos_removidos": 0
-            }
-        
-        # Calcular data limite
-        data_limite = datetime.now() - timedelta(days=dias_manter)
-        timestamp_limite = data_limite.timestamp()
-        
-        current_task.update_state(
-            state="PROGRESS",
-            meta={"status": "Verificando arquivos antigos..."}
+            meta={"status": "Iniciando limpeza de arquivos órfãos..."}
         )
-        
-        arquivos_removidos = 0
-        erros = []
-        
-        # Listar arquivos no diretório
-        for filename in os.listdir(upload_dir):
-            file_path = os.path.join(upload_dir, filename)
-            
-            try:
-                if os.path.isfile(file_path):
-                    # Verificar data de criação
-                    file_stat = os.stat(file_path)
-                    if file_stat.st_ctime < timestamp_limite:
-                        # Verificar se o arquivo não está sendo usado por nenhuma nota
-                        db = SessionLocal()
-                        try:
-                            # Buscar notas que referenciam este arquivo
-                            nota_com_arquivo = db.query(Nota).filter(
-                                or_(
-                                    Nota.arquivo_xml_path == file_path,
-                                    Nota.arquivo_pdf_path == file_path
-                                )
-                            ).first()
-                            
-                            if not nota_com_arquivo:
-                                # Arquivo não está sendo usado, pode remover
-                                os.remove(file_path)
-                                arquivos_removidos += 1
-                                
-                                current_task.update_state(
-                                    state="PROGRESS",
-                                    meta={
-                                        "status": f"Arquivo removido: {filename}",
-                                        "arquivos_removidos": arquivos_removidos
-                                    }
-                                )
-                            
-                        finally:
-                            db.close()
-                            
-            except Exception as e:
-                error_msg = f"Erro ao processar arquivo {filename}: {str(e)}"
-                logger.error(error_msg)
-                erros.append(error_msg)
-                continue
-        
+
+        db = SessionLocal()
+        try:
+            limpeza = limpeza_uploads.limpar(
+                db,
+                dias_manter,
+                progresso=lambda meta: current_task.update_state(
+                    state="PROGRESS", meta={"status": "Verificando arquivos...", **meta}
+                ),
+            )
+        finally:
+            db.close()
+
         resultado = {
             "status": "sucesso",
             "message": "Limpeza de arquivos concluída",
             "dias_manter": dias_manter,
-            "data_limite": data_limite.isoformat(),
-            "arquivos_removidos": arquivos_removidos,
-            "erros": erros
+            "data_limite": (datetime.now() - timedelta(days=dias_manter)).isoformat(),
+            **limpeza,
         }
-        
+
         current_task.update_state(
             state="SUCCESS",
             meta=resultado
         )
-        
+
         return resultado
-        
+
     except Exception as e:
         error_msg = f"Erro na limpeza de arquivos: {str(e)}"
         logger.error(error_msg)
-        
+
         current_task.update_state(
             state="FAILURE",
             meta={"status": "erro", "message": error_msg}
         )
-        
+
         raise
 
 
@@ -276,108 +340,54 @@ def otimizar_banco_dados(self):
 
 
 @celery_app.task(bind=True, name="app.tasks.maintenance_tasks.verificar_integridade")
-def verificar_integridade(self):
-    """Tarefa para verificar integridade dos dados"""
+def verificar_integridade(self, incremental: bool = False):
+    """Tarefa para verificar integridade dos dados (incremental: só o que mudou desde a última verificação)"""
     try:
         current_task.update_state(
             state="PROGRESS",
-            meta={"status": "Iniciando verificação de integridade..."}
+            meta={"status": "Verificando integridade dos dados..."}
         )
         
         db = SessionLocal()
         
         try:
-            problemas = []
-            
-            current_task.update_state(
-                state="PROGRESS",
-                meta={"status": "Verificando notas sem fornecedor..."}
-            )
-            
-            # Verificar notas sem fornecedor
-            notas_sem_fornecedor = db.query(Nota).filter(
-                Nota.fornecedor_id.is_(None)
-            ).count()
-            
-            if notas_sem_fornecedor > 0:
-                problemas.append({
-                    "tipo": "notas_sem_fornecedor",
-                    "descricao": f"{notas_sem_fornecedor} notas sem fornecedor associado",
-                    "severidade": "media"
-                })
-            
-            current_task.update_state(
-                state="PROGRESS",
-                meta={"status": "Verificando itens sem matéria-prima..."}
-            )
-            
-            # Verificar itens sem matéria-prima
-            from app.models.nota import NotaItem
-            itens_sem_mp = db.query(NotaItem).filter(
-                NotaItem.materia_prima_id.is_(None)
-            ).count()
-            
-            if itens_sem_mp > 0:
-                problemas.append({
-                    "tipo": "itens_sem_materia_prima",
-                    "descricao": f"{itens_sem_mp} itens sem matéria-prima associada",
-                    "severidade": "alta"
-                })
-            
-            current_task.update_state(
-                state="PROGRESS",
-                meta={"status": "Verificando preços duplicados..."}
-            )
-            
-            # Verificar preços duplicados (múltiplos preços vigentes para mesma MP)
-            precos_duplicados = db.query(MateriaPrimaPreco).filter(
-                MateriaPrimaPreco.vigente_ate.is_(None)
-            ).group_by(MateriaPrimaPreco.materia_prima_id).having(
-                func.count(MateriaPrimaPreco.id) > 1
-            ).count()
-            
-            if precos_duplicados > 0:
-                problemas.append({
-                    "tipo": "precos_duplicados",
-                    "descricao": f"{precos_duplicados} matérias-primas com múltiplos preços vigentes",
-                    "severidade": "alta"
-                })
-            
-            current_task.update_state(
-                state="PROGRESS",
-                meta={"status": "Verificando produtos sem componentes..."}
+            desde = integridade.marca_dagua(db) if incremental else None
+            execucao = VerificacaoIntegridade(
+                modo="incremental" if desde is not None else "completa",
+                iniciada_em=datetime.now(timezone.utc),
+                problemas_encontrados=0
             )
+            db.add(execucao)
+            db.commit()
             
-            # Verificar produtos sem componentes
-            from app.models.produto import Produto, ProdutoComponente
-            produtos_sem_componentes = db.query(Produto).outerjoin(ProdutoComponente).filter(
-                ProdutoComponente.id.is_(None)
-            ).count()
+            verificacao = integridade.verificar(db, desde)
+            problemas = verificacao["problemas"]
+            linhas = verificacao["linhas_verificadas"]
             
-            if produtos_sem_componentes > 0:
-                problemas.append({
-                    "tipo": "produtos_sem_componentes",
-                    "descricao": f"{produtos_sem_componentes} produtos sem componentes",
-                    "severidade": "baixa"
-                })
+            if desde is None:
+                estatisticas = {
+                    "total_notas": linhas.get("notas"),
+                    "total_fornecedores": integridade.contar(db, Fornecedor.__tablename__),
+                    "total_materias_primas": integridade.contar(db, MateriaPrima.__tablename__),
+                    "total_produtos": linhas.get("produtos")
+                }
+            else:
+                estatisticas = {"linhas_verificadas": linhas}
             
-            # Estatísticas gerais
-            total_notas = db.query(Nota).count()
-            total_fornecedores = db.query(Fornecedor).count()
-            total_materias_primas = db.query(MateriaPrima).count()
-            total_produtos = db.query(Produto).count()
+            execucao.concluida_em = datetime.now(timezone.utc)
+            execucao.problemas_encontrados = len(problemas)
+            execucao.problemas = problemas
+            db.commit()
             
             resultado = {
                 "status": "sucesso",
                 "message": "Verificação de integridade concluída",
-                "estatisticas": {
-                    "total_notas": total_notas,
-                    "total_fornecedores": total_fornecedores,
-                    "total_materias_primas": total_materias_primas,
-                    "total_produtos": total_produtos
-                },
+                "modo": execucao.modo,
+                "desde": desde.isoformat() if desde else None,
+                "estatisticas": estatisticas,
                 "problemas_encontrados": len(problemas),
                 "problemas": problemas,
+                "verificacoes_ignoradas": verificacao["ignoradas"],
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -403,41 +413,148 @@ def verificar_integridade(self):
         raise
 
 
-@celery_app.task(bind=True, name="app.tasks.maintenance_tasks.backup_dados")
-def backup_dados(self, tipo_backup: str = "completo"):
-    """Tarefa para fazer backup dos dados"""
+def _consultas_vigencia(primeira_mp: int, ultima_mp: int):
+    """
+    Consultas com funções de janela sobre os preços de uma faixa de matérias-primas.
+
+    Retorna (ids duplicados, (id, novo vigente_ate) dos sobrepostos). Duplicado é o
+    mesmo preço (valor, moeda, fornecedor e nota) com o mesmo vigente_desde; é só
+    contado, nenhum preço é removido. Cada preço deve terminar no início do seguinte
+    (ordem vigente_desde, id), então o mais antigo de um empate fica com vigência vazia.
+    """
+    mpp = MateriaPrimaPreco
+    janela = select(
+        mpp.id,
+        mpp.vigente_ate,
+        func.row_number().over(
+            partition_by=(mpp.materia_prima_id, mpp.vigente_desde, mpp.valor_unitario, mpp.moeda,
+                          mpp.fornecedor_id, mpp.nota_id),
+            order_by=mpp.id,
+        ).label("dup_rank"),
+        func.lead(mpp.vigente_desde, type_=mpp.vigente_desde.type).over(
+            partition_by=mpp.materia_prima_id,
+            order_by=(mpp.vigente_desde, mpp.id),
+        ).label("proximo_desde"),
+    ).where(mpp.materia_prima_id.between(primeira_mp, ultima_mp)).cte("janela")
+
+    duplicados = select(janela.c.id).where(janela.c.dup_rank > 1)
+    sobrepostos = select(janela.c.id, janela.c.proximo_desde).where(
+        janela.c.proximo_desde.is_not(None),
+        or_(janela.c.vigente_ate.is_(None), janela.c.vigente_ate > janela.c.proximo_desde),
+    )
+    return duplicados, sobrepostos
+
+
+@celery_app.task(bind=True, name="app.tasks.maintenance_tasks.corrigir_precos_sobrepostos")
+def corrigir_precos_sobrepostos(self, materias_por_lote: int = 200, apenas_verificar: bool = True):
+    """Tarefa para verificar (padrão) ou fechar vigências de preços sobrepostas; nunca remove preços"""
     try:
         current_task.update_state(
             state="PROGRESS",
-            meta={"status": "Iniciando backup dos dados..."}
+            meta={"status": "Analisando vigências de preços..."}
         )
         
-        # TODO: Implementar backup real
-        # Por enquanto, simular backup
+        db = SessionLocal()
+        
+        try:
+            materias = db.execute(
+                select(MateriaPrimaPreco.materia_prima_id).distinct().order_by(MateriaPrimaPreco.materia_prima_id)
+            ).scalars().all()
+            
+            duplicados = 0
+            sobrepostos = 0
+            tabela = MateriaPrimaPreco.__table__
+            
+            # Um UPDATE por lote de matérias-primas, com commit a cada lote
+            for inicio in range(0, len(materias), materias_por_lote):
+                faixa = materias[inicio:inicio + materias_por_lote]
+                consulta_dup, consulta_sob = _consultas_vigencia(faixa[0], faixa[-1])
+                
+                # Contagem antes de alterar: o rowcount de UPDATE com WITH não é confiável no SQLite
+                qtd_dup = db.execute(select(func.count()).select_from(consulta_dup.subquery())).scalar()
+                qtd_sob = db.execute(select(func.count()).select_from(consulta_sob.subquery())).scalar()
+                if qtd_sob and not apenas_verificar:
+                    # Só vigente_ate muda: o agregado do resumo (por vigente_desde e valor) continua válido
+                    novos = consulta_sob.subquery()
+                    db.execute(
+                        update(tabela)
+                        .where(tabela.c.id == novos.c.id)
+                        .values(vigente_ate=novos.c.proximo_desde)
+                    )
+                    # Explícito: as respostas em cache com preços caem no commit do lote
+                    http_cache.marcar_alteradas(db, tabela.name)
+                
+                duplicados += qtd_dup
+                sobrepostos += qtd_sob
+                db.commit()
+                
+                current_task.update_state(
+                    state="PROGRESS",
+                    meta={
+                        "status": "Verificando vigências..." if apenas_verificar else "Corrigindo vigências...",
+                        "materias_processadas": inicio + len(faixa),
+                        "total_materias": len(materias)
+                    }
+                )
+            
+            resultado = {
+                "status": "sucesso",
+                "message": "Verificação de vigências concluída" if apenas_verificar
+                           else "Correção de vigências concluída",
+                "materias_primas_analisadas": len(materias),
+                "duplicados_encontrados": duplicados,
+                "sobrepostos_encontrados": sobrepostos,
+                "corrigido": not apenas_verificar,
+                "timestamp": datetime.now().isoformat()
+            }
+            
+            current_task.update_state(
+                state="SUCCESS",
+                meta=resultado
+            )
+            
+            return resultado
+            
+        finally:
+            db.close()
+            
+    except Exception as e:
+        error_msg = f"Erro na correção de vigências: {str(e)}"
+        logger.error(error_msg)
         
         current_task.update_state(
-            state="PROGRESS",
-            meta={"status": "Preparando backup..."}
+            state="FAILURE",
+            meta={"status": "erro", "message": error_msg}
         )
         
-        # Simular tempo de backup
-        import time
-        time.sleep(2)
-        
+        raise
+
+
+@celery_app.task(bind=True, name="app.tasks.maintenance_tasks.backup_dados")
+def backup_dados(self, tipo_backup: str = "completo"):
+    """Tarefa para fazer backup dos dados"""
+    try:
         current_task.update_state(
             state="PROGRESS",
-            meta={"status": "Executando backup..."}
+            meta={"status": "Iniciando backup dos dados..."}
         )
         
-        time.sleep(3)
-        
+        def progresso(status: str) -> None:
+            current_task.update_state(state="PROGRESS", meta={"status": status})
+
+        backup = run_backup(tipo_backup, progress=progresso)
+        if not backup["verificado"]:
+            raise RuntimeError(f"Backup gravado com checksums inválidos: {backup['erros']}")
+
         resultado = {
             "status": "sucesso",
             "message": "Backup concluído com sucesso",
-            "tipo_backup": tipo_backup,
+            "tipo_backup": backup["tipo"],
+            "backup_base": backup["base"],
             "timestamp": datetime.now().isoformat(),
-            "arquivo_backup": f"backup_{tipo_backup}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.sql",
-            "tamanho_estimado": "50MB"
+            "arquivo_backup": backup["diretorio"],
+            "tamanho_bytes": backup["tamanho_bytes"],
+            "tabelas": backup["tabelas"],
         }
         
         current_task.update_state(
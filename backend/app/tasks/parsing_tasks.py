@@ -8,9 +8,11 @@ from app.models.materia_prima import MateriaPrima, MateriaPrimaPreco
 from app.models.enums import OrigemPreco
 from app.models.unidade import Unidade
 from app.config import get_settings
+from app.utils.metrics import registrar_parse
 from lxml import etree
 import logging
 import re
+import time
 from datetime import datetime
 from decimal import Decimal
 from typing import Dict, List, Any, Optional
@@ -43,6 +45,7 @@ def parse_xml_nfe(self, nota_id: int, file_path: str):
             )
             
             # Ler e parsear XML
+            inicio_parse = time.perf_counter()
             with open(file_path, 'rb') as f:
                 xml_content = f.read()
             
@@ -234,6 +237,7 @@ def parse_xml_nfe(self, nota_id: int, file_path: str):
             nota.status = StatusNota.processada
             
             db.commit()
+            registrar_parse("xml_tarefa", 1, len(itens), time.perf_counter() - inicio_parse)
             
             current_task.update_state(
                 state="SUCCESS",
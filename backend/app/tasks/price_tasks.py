@@ -5,6 +5,7 @@ from app.models.materia_prima import MateriaPrima, MateriaPrimaPreco
 from app.models.produto import Produto, ProdutoComponente, ProdutoPreco
 from app.models.unidade import Unidade
 from app.config import get_settings
+from app.services import analise_variacoes, conversao_unidades
 import logging
 from datetime import datetime
 from decimal import Decimal
@@ -426,37 +427,56 @@ def recalcular_produto_especifico(self, produto_id: int):
 
 
 def calcular_custo_produto(produto_id: int, db: SessionLocal) -> Optional[Decimal]:
-    """Função auxiliar para calcular custo de um produto"""
+    """Função auxiliar para calcular custo de um produto
+
+    A quantidade de cada componente é convertida da unidade do componente para
+    a unidade de compra da matéria-prima (a do preço) pela tabela de conversão.
+    """
     try:
-        componentes = db.query(ProdutoComponente).filter(
+        componentes = db.query(
+            ProdutoComponente.id,
+            ProdutoComponente.quantidade,
+            ProdutoComponente.unidade_codigo,
+            MateriaPrima.unidade_codigo,
+            MateriaPrimaPreco.valor_unitario,
+        ).join(
+            MateriaPrima, MateriaPrima.id == ProdutoComponente.materia_prima_id
+        ).outerjoin(
+            MateriaPrimaPreco,
+            and_(
+                MateriaPrimaPreco.materia_prima_id == ProdutoComponente.materia_prima_id,
+                MateriaPrimaPreco.vigente_ate.is_(None)
+            )
+        ).filter(
             ProdutoComponente.produto_id == produto_id
         ).all()
         
         if not componentes:
             return None
         
+        conversao = conversao_unidades.tabela(db)
         custo_total = Decimal('0')
+        vistos = set()
         
-        for componente in componentes:
-            # Buscar preço atual da matéria-prima
-            preco_mp = db.query(MateriaPrimaPreco).filter(
-                and_(
-                    MateriaPrimaPreco.materia_prima_id == componente.materia_prima_id,
-                    MateriaPrimaPreco.vigente_ate.is_(None)
-                )
-            ).first()
-            
-            if not preco_mp:
+        for componente_id, quantidade, unidade_componente, unidade_mp, valor_unitario in componentes:
+            if componente_id in vistos:
+                continue  # mais de um preço aberto para a mesma MP: vale o primeiro, como antes
+            vistos.add(componente_id)
+
+            if valor_unitario is None:
                 # Se não há preço para uma MP, não é possível calcular o custo
                 return None
             
-            # Calcular custo do componente
-            custo_componente = componente.quantidade * preco_mp.valor_unitario
-            
-            # TODO: Implementar conversão de unidades se necessário
-            # Por enquanto, assumir que as unidades são compatíveis
+            fator = conversao.fator(unidade_componente, unidade_mp)
+            if fator is None:
+                logger.warning(
+                    "Produto %s: unidade do componente '%s' não converte para '%s' da matéria-prima",
+                    produto_id, unidade_componente, unidade_mp
+                )
+                return None
             
-            custo_total += custo_componente
+            # Calcular custo do componente
+            custo_total += Decimal(str(quantidade)) * Decimal(str(fator)) * Decimal(str(valor_unitario))
         
         return custo_total
         
@@ -477,87 +497,41 @@ def analisar_variacoes_precos(self, periodo_dias: int = 30):
         db = SessionLocal()
         
         try:
-            from datetime import timedelta
-            data_limite = datetime.now() - timedelta(days=periodo_dias)
-            
-            # Buscar preços criados no período
-            precos_periodo = db.query(MateriaPrimaPreco).filter(
-                MateriaPrimaPreco.created_at >= data_limite
-            ).all()
-            
-            if not precos_periodo:
-                return {
-                    "status": "sucesso",
-                    "message": "Nenhuma variação de preço no período",
-                    "periodo_dias": periodo_dias,
-                    "total_variacoes": 0
-                }
+            linhas = analise_variacoes.analisar(db, periodo_dias, settings.ANALISE_VARIACAO_ZSCORE)
             
             current_task.update_state(
                 state="PROGRESS",
-                meta={"status": "Calculando estatísticas de variação..."}
+                meta={"status": "Gravando resumo das variações..."}
             )
             
-            # Agrupar por matéria-prima
-            variacoes_por_mp = {}
-            
-            for preco in precos_periodo:
-                mp_id = preco.materia_prima_id
-                if mp_id not in variacoes_por_mp:
-                    variacoes_por_mp[mp_id] = []
-                
-                variacoes_por_mp[mp_id].append({
-                    "valor": float(preco.valor_unitario),
-                    "data": preco.vigente_desde,
-                    "origem": preco.origem.value
-                })
-            
-            # Calcular estatísticas
-            estatisticas = []
-            
-            for mp_id, variacoes in variacoes_por_mp.items():
-                if len(variacoes) < 2:
-                    continue
-                
-                # Ordenar por data
-                variacoes.sort(key=lambda x: x["data"])
-                
-                # Calcular variações
-                variacoes_calculadas = []
-                for i in range(1, len(variacoes)):
-                    valor_anterior = variacoes[i-1]["valor"]
-                    valor_atual = variacoes[i]["valor"]
-                    
-                    variacao_abs = valor_atual - valor_anterior
-                    variacao_pct = (variacao_abs / valor_anterior) * 100 if valor_anterior > 0 else 0
-                    
-                    variacoes_calculadas.append({
-                        "data": variacoes[i]["data"],
-                        "valor_anterior": valor_anterior,
-                        "valor_atual": valor_atual,
-                        "variacao_abs": variacao_abs,
-                        "variacao_pct": variacao_pct
-                    })
-                
-                if variacoes_calculadas:
-                    # Buscar nome da matéria-prima
-                    materia_prima = db.query(MateriaPrima).filter(MateriaPrima.id == mp_id).first()
-                    
-                    estatisticas.append({
-                        "materia_prima_id": mp_id,
-                        "materia_prima_nome": materia_prima.nome if materia_prima else "Desconhecida",
-                        "total_variacoes": len(variacoes_calculadas),
-                        "variacoes": variacoes_calculadas,
-                        "maior_variacao_abs": max(v["variacao_abs"] for v in variacoes_calculadas),
-                        "maior_variacao_pct": max(v["variacao_pct"] for v in variacoes_calculadas)
-                    })
+            analise_variacoes.gravar(db, periodo_dias, linhas)
+            db.commit()
+            
+            # O detalhe fica em analises_variacao_preco; o resultado da tarefa só resume
+            anomalas = sorted(
+                (l for l in linhas if l["anomalias"]), key=lambda l: l["maior_zscore"], reverse=True
+            )[:10]
+            nomes = dict(db.query(MateriaPrima.id, MateriaPrima.nome).filter(
+                MateriaPrima.id.in_([l["materia_prima_id"] for l in anomalas])
+            )) if anomalas else {}
             
             resultado = {
                 "status": "sucesso",
-                "message": "Análise de variações concluída",
+                "message": "Análise de variações concluída" if linhas else "Nenhuma variação de preço no período",
                 "periodo_dias": periodo_dias,
-                "total_materias_primas": len(estatisticas),
-                "estatisticas": estatisticas
+                "total_materias_primas": len(linhas),
+                "total_variacoes": sum(l["total_variacoes"] for l in linhas),
+                "total_anomalias": sum(l["anomalias"] for l in linhas),
+                "maiores_anomalias": [
+                    {
+                        "materia_prima_id": l["materia_prima_id"],
+                        "materia_prima_nome": nomes.get(l["materia_prima_id"], "Desconhecida"),
+                        "anomalias": l["anomalias"],
+                        "maior_zscore": round(l["maior_zscore"], 2),
+                        "maior_variacao_pct": round(l["maior_variacao_pct"], 2)
+                    }
+                    for l in anomalas
+                ]
             }
             
             current_task.update_state(
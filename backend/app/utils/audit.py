@@ -1,8 +1,134 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
 from app.models.audit import AuditLog, AuditAction
 from app.models.user import User
 import json
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AuditBuffer:
+    """Fila limitada de entradas de auditoria gravadas em lote por uma thread própria"""
+
+    def __init__(self, max_size: int, batch_size: int, flush_interval: float):
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_size)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Para a thread gravando o que ainda estiver na fila"""
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def enqueue(self, entry: Dict[str, Any]) -> bool:
+        """Enfileira uma entrada; retorna False se o buffer não puder aceitá-la"""
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            return False
+
+    def flush(self) -> int:
+        """Grava imediatamente tudo que estiver na fila"""
+        total = 0
+        while True:
+            batch = self._drain(block=False)
+            if not batch:
+                return total
+            self._write(batch)
+            total += len(batch)
+
+    def _drain(self, block: bool) -> List[Dict[str, Any]]:
+        """Até batch_size entradas; bloqueando, espera a primeira e segue juntando
+        até batch_size ou flush_interval depois dela, o que vier antes"""
+        batch: List[Dict[str, Any]] = []
+        try:
+            if not block:
+                while len(batch) < self._batch_size:
+                    batch.append(self._queue.get_nowait())
+                return batch
+            batch.append(self._queue.get(timeout=self._flush_interval))
+            prazo = time.monotonic() + self._flush_interval
+            while len(batch) < self._batch_size:
+                restante = prazo - time.monotonic()
+                if restante > 0 and not self._stop.is_set():
+                    batch.append(self._queue.get(timeout=restante))
+                else:
+                    # Prazo vencido ou parando: completa só com o que já está na fila
+                    batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._drain(block=True)
+            if batch:
+                self._write(batch)
+        self.flush()
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(insert(AuditLog), batch)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning("Falha ao gravar lote de %s logs de auditoria, gravando um a um: %s", len(batch), e)
+            # Uma entrada inválida não deve descartar o lote inteiro
+            for entry in batch:
+                try:
+                    db.execute(insert(AuditLog), [entry])
+                    db.commit()
+                except Exception as exc:
+                    db.rollback()
+                    logger.error("Log de auditoria descartado (%s#%s): %s", entry.get("entity"), entry.get("entity_id"), exc)
+        finally:
+            db.close()
+
+
+audit_buffer = AuditBuffer(
+    max_size=settings.AUDIT_BUFFER_MAX_SIZE,
+    batch_size=settings.AUDIT_FLUSH_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL,
+)
+
+
+def start_audit_writer() -> None:
+    """Inicia a gravação em lote dos logs de auditoria (se habilitada)"""
+    if settings.AUDIT_BUFFER_ENABLED:
+        audit_buffer.start()
+
+
+def stop_audit_writer() -> None:
+    """Para a gravação em lote, descarregando a fila"""
+    audit_buffer.stop()
 
 
 def log_audit(
@@ -14,16 +140,24 @@ def log_audit(
     changes: Optional[Dict[str, Any]] = None,
     ip_address: Optional[str] = None
 ) -> None:
-    """Registra uma entrada de auditoria"""
-    audit_log = AuditLog(
-        user_id=user.id,
-        entity=entity,
-        entity_id=entity_id,
-        action=action,
-        changes=changes,
-        ip_address=ip_address
-    )
-    db.add(audit_log)
+    """Registra uma entrada de auditoria
+    
+    Com o buffer ativo a entrada é gravada em lote fora da requisição; sem ele
+    (ex.: workers Celery, scripts) ou com a fila cheia, grava na sessão recebida.
+    """
+    entry = {
+        "user_id": user.id,
+        "entity": entity,
+        "entity_id": entity_id,
+        "action": AuditAction(action),
+        "changes": changes,
+        "ip_address": ip_address,
+        "created_at": datetime.now(timezone.utc),
+    }
+    if audit_buffer.enqueue(entry):
+        return
+    
+    db.add(AuditLog(**entry))
     db.commit()
 
 
@@ -0,0 +1,225 @@
+"""
+Cache de respostas com ETag para endpoints de catálogo e visões calculadas.
+
+Cada tabela é uma tag com um contador de versão, incrementado quando uma sessão
+confirma escritas nela (hooks de Session: qualquer código que grave pelo ORM,
+na API ou nas tarefas Celery, publica a invalidação). A resposta serializada é
+guardada junto com as versões das tags de que depende; enquanto elas não mudam,
+a resposta sai do cache sem tocar no banco, e um If-None-Match igual ao ETag
+recebe 304 sem corpo.
+
+Com o Redis disponível (REDIS_URL, HTTP_CACHE_REDIS) as versões e os corpos
+ficam nele, compartilhados por todos os workers: uma escrita em qualquer
+processo invalida a resposta para todos na requisição seguinte. Cada processo
+mantém ainda uma cópia local dos corpos, validada pelas versões lidas do Redis.
+Sem Redis o cache é só do processo, e escritas feitas em outro worker são vistas
+após HTTP_CACHE_TTL. O ETag é o hash do corpo, igual em todos os workers.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.utils import redis_cliente
+
+_versoes: Dict[str, int] = defaultdict(int)
+# chave -> (versões das tabelas, expira em, corpo, etag)
+_cache: Dict[str, Tuple[tuple, float, bytes, str]] = {}
+_lock = threading.Lock()
+_adaptadores: Dict[Any, TypeAdapter] = {}
+
+_PREFIXO_TAG = "cache:tag:"
+_PREFIXO_RESPOSTA = "cache:resp:"
+
+
+def _redis():
+    if not settings.HTTP_CACHE_REDIS or settings.HTTP_CACHE_TTL <= 0:
+        return None
+    return redis_cliente.cliente()
+
+
+def invalidar(*tabelas: str) -> None:
+    """Incrementa a versão das tabelas (respostas que dependem delas deixam de valer)"""
+    with _lock:
+        for tabela in tabelas:
+            _versoes[tabela] += 1
+    cliente = _redis()
+    if cliente is None or not tabelas:
+        return
+    try:
+        pipe = cliente.pipeline(transaction=False)
+        for tabela in tabelas:
+            pipe.incr(_PREFIXO_TAG + tabela)
+        pipe.execute()
+    except Exception as exc:
+        redis_cliente.falha(exc, "Cache HTTP")
+
+
+def versoes(tabelas: Sequence[str]) -> tuple:
+    """Versões atuais das tabelas: do Redis quando disponível, senão do processo"""
+    cliente = _redis()
+    if cliente is not None:
+        try:
+            valores = cliente.mget([_PREFIXO_TAG + t for t in tabelas])
+            return ("redis", *(int(v or 0) for v in valores))
+        except Exception as exc:
+            redis_cliente.falha(exc, "Cache HTTP")
+    with _lock:
+        return ("local", *(_versoes[t] for t in tabelas))
+
+
+def limpar() -> None:
+    with _lock:
+        _cache.clear()
+
+
+def _etag_confere(request: Request, etag: str) -> bool:
+    cabecalho = request.headers.get("if-none-match")
+    if not cabecalho:
+        return False
+    if cabecalho.strip() == "*":
+        return True
+    candidatos = [c.strip() for c in cabecalho.split(",")]
+    return any(c.removeprefix("W/") == etag for c in candidatos)
+
+
+def _serializar(dados: Any, modelo: Any) -> bytes:
+    """Mesmo JSON que o FastAPI geraria com response_model (ou sem ele)"""
+    if modelo is not None:
+        adaptador = _adaptadores.get(modelo)
+        if adaptador is None:
+            adaptador = _adaptadores.setdefault(modelo, TypeAdapter(modelo))
+        return adaptador.dump_json(adaptador.validate_python(dados, from_attributes=True), by_alias=True)
+    return json.dumps(
+        jsonable_encoder(dados), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _prune(agora: float) -> None:
+    for chave in [c for c, (_, expira, _, _) in _cache.items() if expira <= agora]:
+        del _cache[chave]
+    excesso = len(_cache) - settings.HTTP_CACHE_MAX_ENTRIES
+    if excesso > 0:
+        for chave in sorted(_cache, key=lambda c: _cache[c][1])[:excesso]:
+            del _cache[chave]
+
+
+def _rotulo_versoes(atuais: tuple) -> str:
+    return ",".join(str(v) for v in atuais[1:])
+
+
+def _ler_redis(chave: str, atuais: tuple) -> Optional[Tuple[bytes, str]]:
+    """(corpo, etag) gravado por qualquer worker para estas versões"""
+    cliente = _redis()
+    if cliente is None or atuais[0] != "redis":
+        return None
+    try:
+        valor = cliente.get(_PREFIXO_RESPOSTA + chave)
+    except Exception as exc:
+        redis_cliente.falha(exc, "Cache HTTP")
+        return None
+    if not valor:
+        return None
+    cabecalho, _, corpo = valor.partition(b"\n")
+    gravadas, _, etag = cabecalho.decode().partition(" ")
+    if gravadas != _rotulo_versoes(atuais):
+        return None
+    return corpo, etag
+
+
+def _gravar_redis(chave: str, atuais: tuple, corpo: bytes, etag: str) -> None:
+    cliente = _redis()
+    if cliente is None or atuais[0] != "redis":
+        return
+    try:
+        cliente.set(_PREFIXO_RESPOSTA + chave, f"{_rotulo_versoes(atuais)} {etag}\n".encode() + corpo,
+                    ex=settings.HTTP_CACHE_TTL)
+    except Exception as exc:
+        redis_cliente.falha(exc, "Cache HTTP")
+
+
+def resposta_cacheada(request: Request, tabelas: Sequence[str], gerar: Callable[[], Any],
+                      modelo: Any = None) -> Response:
+    """Resposta JSON com ETag, servida do cache enquanto as tabelas não mudarem"""
+    chave = f"{request.url.path}?{sorted(request.query_params.multi_items())}"
+    agora = time.monotonic()
+    corpo: Optional[bytes] = None
+
+    if settings.HTTP_CACHE_TTL > 0:
+        # Versões lidas antes de gerar: uma escrita concorrente invalida o que for gravado aqui
+        atuais = versoes(tabelas)
+        with _lock:
+            entrada = _cache.get(chave)
+        if entrada is not None and entrada[0] == atuais and entrada[1] > agora:
+            _, _, corpo, etag = entrada
+        else:
+            chave_redis = hashlib.sha1(chave.encode()).hexdigest()
+            compartilhada = _ler_redis(chave_redis, atuais)
+            if compartilhada is not None:
+                corpo, etag = compartilhada
+            else:
+                corpo = _serializar(gerar(), modelo)
+                etag = f'"{hashlib.sha1(corpo).hexdigest()[:20]}"'
+                _gravar_redis(chave_redis, atuais, corpo, etag)
+            with _lock:
+                _cache[chave] = (atuais, agora + settings.HTTP_CACHE_TTL, corpo, etag)
+                if len(_cache) > settings.HTTP_CACHE_MAX_ENTRIES:
+                    _prune(agora)
+    else:
+        corpo = _serializar(gerar(), modelo)
+        etag = f'"{hashlib.sha1(corpo).hexdigest()[:20]}"'
+
+    cabecalhos = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_confere(request, etag):
+        return Response(status_code=304, headers=cabecalhos)
+    return Response(content=corpo, media_type="application/json", headers=cabecalhos)
+
+
+# ---- Invalidação a partir das sessões ----
+
+def _tabelas_alteradas(session: Session) -> set:
+    return session.info.setdefault("http_cache_tabelas", set())
+
+
+def marcar_alteradas(session: Session, *tabelas: str) -> None:
+    """Escritas que os hooks não veem (text(), session.connection()): invalidadas no commit da sessão"""
+    _tabelas_alteradas(session).update(tabelas)
+
+
+@event.listens_for(Session, "after_flush")
+def _ao_flush(session, contexto):
+    alteradas = _tabelas_alteradas(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        tabela = getattr(type(obj), "__tablename__", None)
+        if tabela:
+            alteradas.add(tabela)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _ao_executar(estado):
+    # update()/delete() em lote executados pela sessão não passam pelo flush
+    if estado.is_update or estado.is_delete or estado.is_insert:
+        tabela = getattr(estado.statement, "table", None)
+        if tabela is not None:
+            _tabelas_alteradas(estado.session).add(tabela.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _ao_commit(session):
+    alteradas = session.info.pop("http_cache_tabelas", None)
+    if alteradas:
+        invalidar(*alteradas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _ao_rollback(session):
+    session.info.pop("http_cache_tabelas", None)
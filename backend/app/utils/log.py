@@ -0,0 +1,78 @@
+"""
+Configuração de logging da aplicação.
+
+Nível definido por LOG_LEVEL: chamadas abaixo dele (logger.debug com argumentos
+%s) são descartadas antes de montar a mensagem. A escrita no stdout é feita por
+uma thread própria (QueueHandler/QueueListener), então a requisição só enfileira
+o registro.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.config import settings
+
+FORMATO_TEXTO = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Atributos padrão de LogRecord; o que sobrar veio de extra={...}
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class FormatterJson(logging.Formatter):
+    """Uma linha JSON por registro, incluindo os campos passados em extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        dados = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage(),
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO:
+                dados[chave] = valor
+        if record.exc_info:
+            dados["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+def configurar_logging() -> None:
+    """Instala o handler assíncrono no logger raiz (idempotente)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    saida = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT.lower() == "json":
+        saida.setFormatter(FormatterJson())
+    else:
+        saida.setFormatter(logging.Formatter(FORMATO_TEXTO))
+
+    fila: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+    raiz.addHandler(logging.handlers.QueueHandler(fila))
+    raiz.setLevel(settings.LOG_LEVEL.upper())
+    # SQL do SQLAlchemy só quando pedido explicitamente
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(fila, saida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(encerrar_logging)
+
+
+def encerrar_logging() -> None:
+    """Esvazia a fila e para a thread de escrita"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
@@ -0,0 +1,236 @@
+"""
+Métricas no formato Prometheus (/metrics).
+
+Na API: histograma de latência por rota (template do caminho) e gauges do pool
+do SQLAlchemy, atualizados a cada requisição e na coleta.
+
+Com mais de um processo da API (uvicorn --workers, gunicorn), defina
+PROMETHEUS_MULTIPROC_DIR no ambiente, apontando para um diretório vazio a cada
+início do servidor: cada processo grava suas métricas ali e /metrics soma
+todos (gauges do pool: soma dos processos vivos). Sem a variável, cada scrape
+veria só o processo que atendeu; com WEB_CONCURRENCY > 1 isso gera um aviso.
+
+Nos workers Celery: duração e falhas das tarefas e contadores de parsing são
+acumulados no Redis (cada worker é um processo separado) e exportados pela API
+junto com o tamanho das filas do broker. Vazão de parsing (notas/s, itens/s) =
+rate(nfe_parse_notas_total[5m]) e rate(nfe_parse_itens_total[5m]).
+"""
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client.core import REGISTRY, CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+
+from app.utils import redis_cliente
+
+FILAS_CELERY = ["ingestao", "calculos", "celery"]
+BUCKETS_TAREFA = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 1800.0)
+_CHAVE_TAREFAS = "metricas:celery:tarefas"
+_CHAVE_PARSE = "metricas:parse"
+
+logger = logging.getLogger(__name__)
+
+# Lida pelo prometheus_client na importação: precisa estar no ambiente antes do processo iniciar
+MULTIPROCESSO = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições HTTP por rota",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+
+# Entre processos vale a soma dos vivos (livesum); num processo só, o valor dele
+POOL_GAUGES = [
+    (Gauge(nome, ajuda, multiprocess_mode="livesum"), metodo)
+    for nome, metodo, ajuda in [
+        ("db_pool_size", "size", "Tamanho configurado do pool"),
+        ("db_pool_checked_out", "checkedout", "Conexões em uso"),
+        ("db_pool_checked_in", "checkedin", "Conexões ociosas no pool"),
+        ("db_pool_overflow", "overflow", "Conexões acima de pool_size"),
+    ]
+]
+
+_engine = None
+
+
+def _atualizar_pool() -> None:
+    if _engine is None:
+        return
+    pool = _engine.pool
+    for gauge, metodo in POOL_GAUGES:
+        if hasattr(pool, metodo):
+            # overflow() fica negativo enquanto o pool não está cheio
+            gauge.set(max(0, getattr(pool, metodo)()))
+
+
+def observar_requisicao(request, status: int, duracao: float) -> None:
+    """Registra a requisição usando o template da rota (evita um rótulo por id)"""
+    rota = request.scope.get("route")
+    caminho = getattr(rota, "path", None) or "nao_mapeada"
+    REQUEST_LATENCY.labels(request.method, caminho, str(status)).observe(duracao)
+    _atualizar_pool()
+
+
+def gerar() -> tuple:
+    """(conteúdo, content-type) para a resposta de /metrics (chama o Redis: rodar fora do event loop)"""
+    _atualizar_pool()
+    if not MULTIPROCESSO:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    # Registro novo a cada coleta, como pede o modo multiprocesso do prometheus_client
+    registro = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registro)
+    registro.register(_ColetorCelery())
+    return generate_latest(registro), CONTENT_TYPE_LATEST
+
+
+def encerrar_processo() -> None:
+    """Remove os gauges deste processo da soma (modo multiprocesso)"""
+    if MULTIPROCESSO:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def registrar_parse(origem: str, notas: int, itens: int, duracao: float) -> None:
+    """Acumula notas/itens processados e tempo de parsing por origem (xml, pdf, ia...)"""
+    cliente = redis_cliente.cliente()
+    if cliente is None:
+        return
+    try:
+        pipe = cliente.pipeline(transaction=False)
+        pipe.hincrby(_CHAVE_PARSE, f"{origem}|notas", notas)
+        pipe.hincrby(_CHAVE_PARSE, f"{origem}|itens", itens)
+        pipe.hincrbyfloat(_CHAVE_PARSE, f"{origem}|segundos", duracao)
+        pipe.execute()
+    except Exception as exc:
+        redis_cliente.falha(exc, "Métricas")
+
+
+def _registrar_tarefa(tarefa: str, fila: str, duracao: Optional[float], falhou: bool) -> None:
+    cliente = redis_cliente.cliente()
+    if cliente is None:
+        return
+    prefixo = f"{tarefa}|{fila}"
+    try:
+        pipe = cliente.pipeline(transaction=False)
+        if duracao is not None:
+            pipe.hincrby(_CHAVE_TAREFAS, f"{prefixo}|count", 1)
+            pipe.hincrbyfloat(_CHAVE_TAREFAS, f"{prefixo}|sum", duracao)
+            for limite in BUCKETS_TAREFA:
+                if duracao <= limite:
+                    pipe.hincrby(_CHAVE_TAREFAS, f"{prefixo}|le{limite}", 1)
+        if falhou:
+            pipe.hincrby(_CHAVE_TAREFAS, f"{prefixo}|fail", 1)
+        pipe.execute()
+    except Exception as exc:
+        redis_cliente.falha(exc, "Métricas")
+
+
+# ---- Sinais do Celery (executados nos workers) ----
+
+_inicio_tarefas: Dict[str, float] = {}
+
+
+def _fila_da_tarefa(task) -> str:
+    entrega = getattr(task.request, "delivery_info", None) or {}
+    return entrega.get("routing_key") or "celery"
+
+
+def _ao_iniciar_tarefa(task_id=None, task=None, **_):
+    _inicio_tarefas[task_id] = time.perf_counter()
+
+
+def _ao_terminar_tarefa(task_id=None, task=None, state=None, **_):
+    inicio = _inicio_tarefas.pop(task_id, None)
+    if task is None or inicio is None:
+        return
+    _registrar_tarefa(task.name, _fila_da_tarefa(task), time.perf_counter() - inicio, state == "FAILURE")
+
+
+def conectar_sinais_celery() -> None:
+    from celery.signals import task_postrun, task_prerun
+
+    task_prerun.connect(_ao_iniciar_tarefa, weak=False)
+    task_postrun.connect(_ao_terminar_tarefa, weak=False)
+
+
+# ---- Coletor lido a cada scrape ----
+
+class _ColetorCelery:
+    """Tarefas e parsing acumulados no Redis pelos workers, e tamanho das filas"""
+
+    def describe(self):
+        # Sem isso o registro chamaria collect() (e o Redis) já na importação
+        return []
+
+    def collect(self):
+        disponivel = GaugeMetricFamily("celery_metrics_up", "1 se o Redis respondeu na coleta")
+        cliente = redis_cliente.cliente()
+        if cliente is None:
+            disponivel.add_metric([], 0)
+            yield disponivel
+            return
+        try:
+            pipe = cliente.pipeline(transaction=False)
+            pipe.hgetall(_CHAVE_TAREFAS)
+            pipe.hgetall(_CHAVE_PARSE)
+            for fila in FILAS_CELERY:
+                pipe.llen(fila)
+            tarefas, parse, *tamanhos = pipe.execute()
+        except Exception as exc:
+            redis_cliente.falha(exc, "Métricas")
+            disponivel.add_metric([], 0)
+            yield disponivel
+            return
+        disponivel.add_metric([], 1)
+        yield disponivel
+
+        filas = GaugeMetricFamily("celery_queue_length", "Mensagens aguardando na fila", labels=["queue"])
+        for fila, tamanho in zip(FILAS_CELERY, tamanhos):
+            filas.add_metric([fila], tamanho)
+        yield filas
+
+        agrupado: Dict[tuple, Dict[str, float]] = {}
+        for campo, valor in tarefas.items():
+            tarefa, fila, medida = campo.decode().rsplit("|", 2)
+            agrupado.setdefault((tarefa, fila), {})[medida] = float(valor)
+        duracao = HistogramMetricFamily(
+            "celery_task_runtime_seconds", "Duração das tarefas Celery", labels=["task", "queue"]
+        )
+        falhas = CounterMetricFamily("celery_task_failures", "Tarefas Celery com falha", labels=["task", "queue"])
+        for (tarefa, fila), medidas in sorted(agrupado.items()):
+            buckets = [(str(limite), medidas.get(f"le{limite}", 0.0)) for limite in BUCKETS_TAREFA]
+            buckets.append(("+Inf", medidas.get("count", 0.0)))
+            duracao.add_metric([tarefa, fila], buckets, medidas.get("sum", 0.0))
+            falhas.add_metric([tarefa, fila], medidas.get("fail", 0.0))
+        yield duracao
+        yield falhas
+
+        familias = {
+            "notas": CounterMetricFamily("nfe_parse_notas", "Notas processadas pelo parsing", labels=["origem"]),
+            "itens": CounterMetricFamily("nfe_parse_itens", "Itens extraídos pelo parsing", labels=["origem"]),
+            "segundos": CounterMetricFamily("nfe_parse_seconds", "Tempo gasto em parsing", labels=["origem"]),
+        }
+        for campo, valor in sorted(parse.items()):
+            origem, medida = campo.decode().rsplit("|", 1)
+            if medida in familias:
+                familias[medida].add_metric([origem], float(valor))
+        yield from familias.values()
+
+
+_registrado = False
+
+
+def registrar_coletores(engine) -> None:
+    global _engine, _registrado
+    _engine = engine
+    if _registrado:
+        return
+    if not MULTIPROCESSO:
+        REGISTRY.register(_ColetorCelery())
+        if int(os.environ.get("WEB_CONCURRENCY") or 1) > 1:
+            logger.warning("Métricas: WEB_CONCURRENCY > 1 sem PROMETHEUS_MULTIPROC_DIR; "
+                           "cada coleta verá só um processo")
+    _registrado = True
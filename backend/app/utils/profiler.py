@@ -0,0 +1,119 @@
+"""Contagem e tempo das consultas SQL de cada requisição (Server-Timing e log de requisições lentas)"""
+import contextvars
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_CONSULTAS_GUARDADAS = 1000  # limite de instruções guardadas por requisição
+MAX_SQL_LOG = 500  # caracteres de cada instrução no log
+
+
+class PerfilRequisicao:
+    """Consultas executadas durante uma requisição"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_db = 0.0  # segundos
+        self.instrucoes: List[tuple] = []  # (segundos, sql)
+
+    def registrar(self, sql: str, duracao: float) -> None:
+        self.consultas += 1
+        self.tempo_db += duracao
+        if len(self.instrucoes) < MAX_CONSULTAS_GUARDADAS:
+            self.instrucoes.append((duracao, sql))
+
+    def mais_lentas(self, limite: int) -> List[Dict[str, Any]]:
+        """Instruções agrupadas pelo texto, ordenadas pelo tempo total (repetição indica N+1)"""
+        grupos: Dict[str, List[float]] = {}
+        for duracao, sql in self.instrucoes:
+            grupos.setdefault(sql, []).append(duracao)
+        ordenados = sorted(grupos.items(), key=lambda g: sum(g[1]), reverse=True)[:limite]
+        return [
+            {
+                "sql": " ".join(sql.split())[:MAX_SQL_LOG],
+                "vezes": len(duracoes),
+                "total_ms": round(sum(duracoes) * 1000, 2),
+                "max_ms": round(max(duracoes) * 1000, 2),
+            }
+            for sql, duracoes in ordenados
+        ]
+
+    def server_timing(self, tempo_total: float) -> str:
+        return (
+            f'db;dur={self.tempo_db * 1000:.2f};desc="{self.consultas} consultas", '
+            f"total;dur={tempo_total * 1000:.2f}"
+        )
+
+
+_perfil_atual: contextvars.ContextVar[Optional[PerfilRequisicao]] = contextvars.ContextVar(
+    "perfil_requisicao", default=None
+)
+
+
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    if _perfil_atual.get() is not None:
+        conn.info.setdefault("profiler_inicio", []).append(time.perf_counter())
+
+
+def _depois(conn, cursor, statement, parameters, context, executemany):
+    perfil = _perfil_atual.get()
+    inicios = conn.info.get("profiler_inicio")
+    if perfil is None or not inicios:
+        return
+    perfil.registrar(statement, time.perf_counter() - inicios.pop())
+
+
+def _erro(contexto):
+    inicios = contexto.connection.info.get("profiler_inicio") if contexto.connection is not None else None
+    if _perfil_atual.get() is not None and inicios:
+        inicios.pop()
+
+
+def instalar(engine: Engine) -> None:
+    """Registra os listeners de consulta no engine (idempotente)"""
+    if event.contains(engine, "before_cursor_execute", _antes):
+        return
+    event.listen(engine, "before_cursor_execute", _antes)
+    event.listen(engine, "after_cursor_execute", _depois)
+    event.listen(engine, "handle_error", _erro)
+
+
+def iniciar() -> contextvars.Token:
+    return _perfil_atual.set(PerfilRequisicao())
+
+
+def encerrar(token: contextvars.Token) -> Optional[PerfilRequisicao]:
+    perfil = _perfil_atual.get()
+    _perfil_atual.reset(token)
+    return perfil
+
+
+def registrar_requisicao(perfil: PerfilRequisicao, request_id: str, metodo: str, caminho: str,
+                         status: int, tempo_total: float) -> None:
+    """Log estruturado da requisição; acima dos limites inclui as instruções mais pesadas"""
+    dados = {
+        "request_id": request_id,
+        "metodo": metodo,
+        "caminho": caminho,
+        "status": status,
+        "tempo_ms": round(tempo_total * 1000, 2),
+        "consultas": perfil.consultas,
+        "tempo_db_ms": round(perfil.tempo_db * 1000, 2),
+    }
+    lenta = (
+        tempo_total * 1000 >= settings.SLOW_REQUEST_MS
+        or perfil.consultas >= settings.SLOW_REQUEST_QUERIES
+    )
+    if lenta:
+        dados["instrucoes"] = perfil.mais_lentas(settings.PROFILER_TOP_QUERIES)
+        logger.warning("requisicao_lenta %s", json.dumps(dados, ensure_ascii=False))
+    elif logger.isEnabledFor(logging.DEBUG):
+        logger.debug("requisicao %s", json.dumps(dados, ensure_ascii=False))
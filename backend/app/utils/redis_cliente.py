@@ -0,0 +1,44 @@
+"""
+Cliente Redis compartilhado pelos utilitários (métricas, cache de respostas).
+
+Timeouts curtos e, após uma falha, nenhuma nova tentativa por 30s: o Redis
+fora do ar não pode travar requisições nem tarefas.
+"""
+import logging
+import threading
+import time
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PAUSA_APOS_FALHA = 30  # segundos
+
+_redis = None
+_lock = threading.Lock()
+_indisponivel_ate = 0.0
+
+
+def cliente():
+    """Cliente Redis, ou None se o Redis falhou há pouco (ou o pacote não está instalado)"""
+    global _redis, _indisponivel_ate
+    if time.monotonic() < _indisponivel_ate:
+        return None
+    with _lock:
+        if _redis is None:
+            try:
+                import redis
+            except ImportError:
+                _indisponivel_ate = float("inf")
+                return None
+            _redis = redis.Redis.from_url(
+                settings.REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5
+            )
+    return _redis
+
+
+def falha(exc: Exception, contexto: str) -> None:
+    """Registra a falha e suspende o uso do Redis por PAUSA_APOS_FALHA"""
+    global _indisponivel_ate
+    _indisponivel_ate = time.monotonic() + PAUSA_APOS_FALHA
+    logger.warning("%s: Redis indisponível (%s)", contexto, exc)
@@ -0,0 +1,31 @@
+"""
+Fixtures dos testes (rodar a partir de backend/: python -m pytest tests/).
+
+Os testes não dependem de PostgreSQL nem de Redis: o banco é um SQLite em
+memória com as tabelas criadas a partir dos modelos.
+"""
+import os
+
+# Antes de importar app.config: sem Redis, o cache HTTP fica só no processo
+os.environ.setdefault("HTTP_CACHE_REDIS", "false")
+
+import pytest  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app.models import Base, load_all_models  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """Sessão num SQLite em memória com o esquema dos modelos"""
+    load_all_models()
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    sessao = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+    try:
+        yield sessao
+    finally:
+        sessao.close()
+        engine.dispose()
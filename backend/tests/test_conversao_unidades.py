@@ -0,0 +1,58 @@
+"""Fechamento do grafo de unidades (app.services.conversao_unidades.montar)"""
+import pytest
+
+from app.services.conversao_unidades import montar
+
+# (id, codigo, fator_para_menor, menor_unidade_id)
+UNIDADES = [
+    (1, "G", None, None),
+    (2, "KG", 1000, 1),
+    (3, "T", 1000, 2),
+    (4, "ML", None, None),
+    (5, "L", 1000, 4),
+    (6, "PC", None, None),
+]
+
+
+def test_fatores_pela_cadeia():
+    tabela = montar(UNIDADES)
+    assert tabela.fator("KG", "G") == 1000
+    assert tabela.fator("G", "KG") == pytest.approx(0.001)
+    assert tabela.fator("T", "G") == 1_000_000
+    assert tabela.fator("T", "KG") == 1000
+    assert tabela.converter(2.5, "L", "ML") == 2500
+    assert tabela.base[tabela.posicao("T")] == "G"
+
+
+def test_cadeias_diferentes_nao_convertem():
+    tabela = montar(UNIDADES)
+    assert tabela.fator("KG", "L") is None
+    assert tabela.converter(1, "PC", "G") is None
+
+
+def test_codigo_sem_diferenciar_maiusculas():
+    tabela = montar(UNIDADES)
+    assert tabela.fator("kg", "g") == 1000
+    # Fora da tabela só converte para o mesmo código
+    assert tabela.fator("cx", "CX") == 1.0
+    assert tabela.fator("cx", "PC") is None
+    assert tabela.fator(None, "KG") is None
+
+
+def test_linhas_invalidas_e_ciclos():
+    tabela = montar([
+        (None, "X", 10, 1),  # sem id
+        (1, "", None, None),  # sem código
+        (2, "A", 2, 3),
+        (3, "B", 2, 2),  # ciclo A -> B -> A
+        (4, "C", 0, 5),  # fator inválido: vira base
+        (5, "D", None, None),
+        (6, "E", 4, 99),  # menor inexistente: vira base
+    ])
+    assert tabela.posicao("X") is None
+    assert tabela.fator("C", "D") is None
+    assert tabela.fator("C", "C") == 1.0
+    assert tabela.fator("E", "E") == 1.0
+    # No ciclo, a unidade onde ele fecha é a base e as duas continuam conversíveis
+    assert tabela.fator("A", "B") is not None
+    assert tabela.fator("A", "B") * tabela.fator("B", "A") == pytest.approx(1.0)
@@ -0,0 +1,81 @@
+"""Extração dos campos do cabeçalho da DANFE (app.services.danfe_texto)"""
+import random
+
+import pytest
+
+from app.benchmarks.danfe_regex import LAYOUTS
+from app.services.danfe_texto import extrair_campos, valor_brl
+
+DANFE_PDFPLUMBER = "\n".join([
+    "RECEBEMOS DE METALURGICA SAO JORGE LTDA OS PRODUTOS CONSTANTES DA NOTA FISCAL INDICADA AO LADO",
+    "IDENTIFICAÇÃO DO EMITENTE",
+    "METALURGICA SAO JORGE LTDA",
+    "RUA INDUSTRIAL, 120 - CEP 09000-100 FONE (11) 4444-5555",
+    "DANFE",
+    "Nº 000.012.345",
+    "SÉRIE 1 FOLHA 1/1",
+    "CHAVE DE ACESSO",
+    "3525 0712 3456 7800 0199 5500 1000 0123 4510 0012 3456",
+    "INSCRIÇÃO ESTADUAL 123.456.789.000 CNPJ 12.345.678/0001-99",
+    "DESTINATÁRIO/REMETENTE",
+    "NOME/RAZÃO SOCIAL CLIENTE BOBINAS LTDA CNPJ/CPF 98.765.432/0001-10 DATA DA EMISSÃO 02/07/2025",
+    "CÁLCULO DO IMPOSTO",
+    "VALOR TOTAL DA NOTA 1.234,56",
+    "TRANSPORTADOR / VOLUMES TRANSPORTADOS",
+    "DADOS DOS PRODUTOS / SERVIÇOS",
+    "000001 -FIO ESMALTADO 12MM 85118090 0500 5101 KG 10,00 123,45 1.234,50",
+])
+
+
+def test_layout_pdfplumber():
+    campos = extrair_campos(DANFE_PDFPLUMBER)
+    assert campos["numero_nota"] == "000012345"
+    assert campos["serie"] == "1"
+    assert campos["chave_acesso"] == "35250712345678000199550010000123451000123456"
+    assert campos["cnpj_emitente"] == "12.345.678/0001-99"
+    assert campos["emitente"] == "METALURGICA SAO JORGE LTDA"
+    assert campos["data_emissao"] == "02/07/2025"
+    assert valor_brl(campos["valor_total"]) == 1234.56
+
+
+def test_nome_na_mesma_linha_do_cnpj_nao_consome_o_rotulo():
+    # Regressão: o nome ia até o fim da linha e levava "CNPJ: ..." junto
+    texto = ("NOTA FISCAL Nº 000004321 SÉRIE 2\n"
+             "EMITENTE: FIOS E CABOS PAULISTA LTDA CNPJ: 12345678000199 INSCRIÇÃO ESTADUAL: 111222333\n"
+             "DATA DE EMISSÃO: 15/03/2024\n"
+             "VALOR TOTAL: 980,00\n"
+             "DADOS DOS PRODUTOS/SERVIÇOS\n"
+             "000001 -FIO 2MM KG 10,00 98,00 980,00")
+    campos = extrair_campos(texto)
+    assert campos["emitente"] == "FIOS E CABOS PAULISTA LTDA"
+    assert campos["cnpj_emitente"] == "12345678000199"
+    assert campos["numero_nota"] == "000004321"
+    assert campos["serie"] == "2"
+    assert campos["data_emissao"] == "15/03/2024"
+    assert valor_brl(campos["valor_total"]) == 980.0
+
+
+def test_texto_sem_quebras_de_linha():
+    texto = ("DANFE RAZÃO SOCIAL: COMERCIAL ELETRICA NORTE LTDA ENDEREÇO: AV. BRASIL, 10 "
+             "CNPJ: 11.222.333/0001-44 DATA DE EMISSÃO: 01/02/2023 VALOR TOTAL: R$ 50,00")
+    campos = extrair_campos(texto)
+    assert campos["emitente"] == "COMERCIAL ELETRICA NORTE LTDA"
+    assert campos["cnpj_emitente"] == "11.222.333/0001-44"
+
+
+@pytest.mark.parametrize("layout", LAYOUTS, ids=lambda f: f.__name__)
+def test_corpus_sintetico(layout):
+    rng = random.Random(41)
+    for _ in range(50):
+        texto, gabarito = layout(rng)
+        campos = extrair_campos(texto)
+        assert campos.get("emitente") == gabarito["emitente"]
+        assert "".join(filter(str.isdigit, campos.get("cnpj_emitente", ""))) == gabarito["cnpj_digitos"]
+        assert campos.get("data_emissao") == gabarito["data_emissao"]
+        assert valor_brl(campos.get("valor_total", "")) == pytest.approx(gabarito["valor_total"])
+
+
+def test_texto_vazio():
+    assert extrair_campos("") == {}
+    assert valor_brl("1.234,56") == 1234.56
+    assert valor_brl("1234.56") == 1234.56
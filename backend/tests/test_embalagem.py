@@ -0,0 +1,29 @@
+"""Tamanho de embalagem no fim do nome (app.services.embalagem.interpretar)"""
+import pytest
+
+from app.services.embalagem import interpretar
+
+
+@pytest.mark.parametrize("nome, exibicao, quantidade, unidade", [
+    ("OLEO ISOLANTE 18L", "OLEO ISOLANTE", 18.0, "L"),
+    ("VERNIZ 3.6 KG", "VERNIZ", 3.6, "KG"),
+    ("ADESIVO PVA DAS 403 BAR50KG", "ADESIVO PVA DAS 403 BAR", 50.0, "KG"),
+    ("BORRACHA ISOLAÇÃO 39MT", "BORRACHA ISOLAÇÃO", 39.0, "MT"),
+    ("fita crepe 50m", "fita crepe", 50.0, "M"),
+    ("PARAFUSO 10 pc", "PARAFUSO", 10.0, "PC"),
+])
+def test_embalagem_no_fim_do_nome(nome, exibicao, quantidade, unidade):
+    assert interpretar(nome) == {
+        "nome_exibicao": exibicao, "embalagem_quantidade": quantidade, "embalagem_unidade": unidade,
+    }
+
+
+@pytest.mark.parametrize("nome", ["FIO ESMALTADO", "ESPAGUETE 180° - 0,80MM", "KIT 2L EXTRA", ""])
+def test_sem_embalagem(nome):
+    assert interpretar(nome) == {"nome_exibicao": nome, "embalagem_quantidade": None, "embalagem_unidade": None}
+
+
+def test_nome_so_com_embalagem_e_nulo():
+    # Sem texto antes do tamanho o nome de exibição continua sendo o nome inteiro
+    assert interpretar("18L")["nome_exibicao"] == "18L"
+    assert interpretar(None)["nome_exibicao"] == ""
@@ -0,0 +1,95 @@
+"""CSV do COPY e normalização do checksum em scripts/export_sqlite_to_postgres.py"""
+import csv
+import importlib.util
+import io
+import sqlite3
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+_SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "export_sqlite_to_postgres.py"
+_spec = importlib.util.spec_from_file_location("export_sqlite_to_postgres", _SCRIPT)
+export = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(export)
+
+
+def _csv(linhas, chunk_size=2, integer_positions=(), enum_labels=None, tamanho_leitura=7):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (a, b, c, d)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?)", linhas)
+    stream = export.SqliteCsvStream(conn.execute("SELECT a, b, c, d FROM t"), chunk_size,
+                                    integer_positions, enum_labels)
+    partes = []
+    while True:
+        parte = stream.read(tamanho_leitura)
+        if not parte:
+            break
+        partes.append(parte)
+    return b"".join(partes).decode("utf-8"), stream.rows
+
+
+def test_null_sai_sem_aspas_e_texto_barra_n_entre_aspas():
+    conteudo, linhas = _csv([(None, "\\N", "", 1.5)])
+    assert conteudo == '\\N,"\\N","",1.5\n'
+    assert linhas == 1
+
+
+def test_textos_com_aspas_virgula_e_quebra_de_linha():
+    conteudo, _ = _csv([('A "B", C', "linha 1\nlinha 2", "ç/ã", 7)])
+    assert next(csv.reader(io.StringIO(conteudo))) == ['A "B", C', "linha 1\nlinha 2", "ç/ã", "7"]
+
+
+def test_reais_inteiros_em_colunas_inteiras_e_enums():
+    labels = {"admin": "admin", "viewer": "viewer"}
+    conteudo, _ = _csv([(3.0, 2.5, "ADMIN", None)], integer_positions=[0, 1], enum_labels={2: labels})
+    # 2.5 não é inteiro: fica como está para o PostgreSQL recusar
+    assert conteudo == '3,2.5,"admin",\\N\n'
+
+
+def test_leitura_em_pedacos_cobre_todos_os_lotes():
+    linhas = [(i, f"nome {i}", None, i / 4) for i in range(25)]
+    conteudo, total = _csv(linhas, chunk_size=4, tamanho_leitura=5)
+    assert total == 25
+    assert len(list(csv.reader(io.StringIO(conteudo)))) == 25
+
+
+@pytest.mark.parametrize("tipo, sqlite, postgres, extra", [
+    ("integer", 3.0, 3, {}),
+    ("boolean", 1, True, {}),
+    ("numeric", 0.1 + 0.2, Decimal("0.30"), {"scale": 2}),
+    ("numeric", 12, Decimal("12.0000"), {"scale": 4}),
+    ("double precision", 2, 2.0, {}),
+    ("timestamp with time zone", "2025-07-02 03:00:00-03:00",
+     datetime(2025, 7, 2, 6, 0, tzinfo=timezone.utc), {}),
+    ("timestamp with time zone", "2025-07-02 06:00:00", datetime(2025, 7, 2, 6, 0, tzinfo=timezone.utc), {}),
+    # Sem fuso no PostgreSQL o offset do texto é ignorado na carga
+    ("timestamp without time zone", "2025-07-02 03:00:00+05:00", datetime(2025, 7, 2, 3, 0), {}),
+    ("json", '{"b": 1, "a": [1, 2]}', {"a": [1, 2], "b": 1}, {}),
+    ("userrole", "ADMIN", "admin", {"enum_labels": {"admin": "admin"}}),
+])
+def test_normalizacao_igual_nos_dois_bancos(tipo, sqlite, postgres, extra):
+    normalizar = export.normalizer(tipo, extra.get("enum_labels"), extra.get("scale"))
+    assert normalizar(sqlite) == normalizar(postgres)
+
+
+def test_normalizacao_distingue_valores_diferentes():
+    normalizar = export.normalizer("numeric", scale=2)
+    assert normalizar(1.004) != normalizar(Decimal("1.01"))
+    assert export.normalizer("text")("a") != export.normalizer("text")("a ")
+
+
+def test_checksum_sem_chave_nao_depende_da_ordem():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (a, b)")
+    conn.executemany("INSERT INTO t VALUES (?, ?)", [(1, "x"), (2, "y"), (3, None)])
+    normalizers = [export.normalizer("integer"), export.normalizer("text")]
+    ida = export.row_checksum(conn.cursor(), "t", ["a", "b"], normalizers, [])
+    conn.execute("CREATE TABLE u AS SELECT * FROM t ORDER BY a DESC")
+    volta = export.row_checksum(conn.cursor(), "u", ["a", "b"], normalizers, [])
+    assert ida == volta
+    conn.execute("UPDATE u SET b = 'z' WHERE a = 2")
+    assert export.row_checksum(conn.cursor(), "u", ["a", "b"], normalizers, []) != ida
@@ -0,0 +1,89 @@
+"""Remoção de arquivos órfãos de UPLOAD_DIR (app.services.limpeza_uploads.limpar)"""
+import os
+import time
+from datetime import date
+
+import pytest
+
+from app.models.nota import Nota, StatusNota
+from app.services import limpeza_uploads
+
+DIA = 24 * 3600
+
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch):
+    monkeypatch.setattr(limpeza_uploads.settings, "UPLOAD_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _arquivo(diretorio, nome, idade_segundos, tamanho=10):
+    caminho = diretorio / nome
+    caminho.write_bytes(b"x" * tamanho)
+    instante = time.time() - idade_segundos
+    os.utime(caminho, (instante, instante))
+    return caminho
+
+
+def _nota(db, numero, xml=None, pdf=None):
+    db.execute(Nota.__table__.insert(), [{
+        "numero": numero, "emissao_date": date(2025, 1, 1), "valor_total": 1.0, "status": StatusNota.rascunho,
+        "arquivo_xml_path": xml, "arquivo_pdf_path": pdf,
+    }])
+
+
+def test_referenciados_ficam_e_orfaos_vencidos_saem(db, uploads):
+    xml = _arquivo(uploads, "nota1.xml", 90 * DIA)
+    pdf = _arquivo(uploads, "nota2.pdf", 90 * DIA)
+    orfao_velho = _arquivo(uploads, "solto.xml", 40 * DIA, tamanho=25)
+    orfao_novo = _arquivo(uploads, "recente.xml", 1 * DIA)
+    _nota(db, "1", xml=str(xml))
+    # Caminho relativo ao diretório de trabalho, como gravam as tarefas
+    _nota(db, "2", pdf=os.path.relpath(pdf))
+
+    resultado = limpeza_uploads.limpar(db, dias_manter=30)
+
+    assert xml.exists() and pdf.exists() and orfao_novo.exists()
+    assert not orfao_velho.exists()
+    assert resultado["arquivos_verificados"] == 4
+    assert resultado["arquivos_referenciados"] == 2
+    assert resultado["arquivos_removidos"] == 1
+    assert resultado["bytes_liberados"] == 25
+    assert resultado["erros"] == []
+
+
+def test_pdf_de_sessao_do_ia_tem_prazo_proprio(db, uploads):
+    sessao_vencida = _arquivo(uploads, "danfe_" + "a" * 32 + ".pdf", 30 * 3600)
+    sessao_recente = _arquivo(uploads, "danfe_" + "b" * 32 + ".pdf", 2 * 3600)
+    comum = _arquivo(uploads, "danfe.pdf", 30 * 3600)
+
+    resultado = limpeza_uploads.limpar(db, dias_manter=30, horas_sessao_ia=24)
+
+    assert not sessao_vencida.exists()
+    assert sessao_recente.exists() and comum.exists()
+    assert resultado["arquivos_removidos"] == 1
+
+
+def test_sessao_do_ia_referenciada_fica(db, uploads):
+    sessao = _arquivo(uploads, "danfe_" + "c" * 32 + ".pdf", 90 * DIA)
+    _nota(db, "3", pdf=str(sessao))
+    assert limpeza_uploads.limpar(db, dias_manter=1, horas_sessao_ia=1)["arquivos_removidos"] == 0
+    assert sessao.exists()
+
+
+def test_subdiretorios_e_links_nao_sao_tocados(db, uploads):
+    (uploads / "sub").mkdir()
+    antigo = _arquivo(uploads / "sub", "dentro.xml", 90 * DIA)
+    alvo = _arquivo(uploads, "alvo.xml", 0)
+    _nota(db, "4", xml=str(alvo))
+    (uploads / "link.xml").symlink_to(alvo)
+
+    resultado = limpeza_uploads.limpar(db, dias_manter=1)
+
+    assert antigo.exists() and alvo.exists() and (uploads / "link.xml").is_symlink()
+    assert resultado["arquivos_verificados"] == 1
+
+
+def test_diretorio_inexistente(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(limpeza_uploads.settings, "UPLOAD_DIR", str(tmp_path / "nao_existe"))
+    assert limpeza_uploads.limpar(db, dias_manter=30)["arquivos_verificados"] == 0
@@ -0,0 +1,90 @@
+"""Preço vigente numa data pelo caminho sem tstzrange (SQLite) de app.services.precos_vigentes"""
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.models.materia_prima import MateriaPrimaPreco
+from app.services import precos_vigentes
+
+BRT = timezone(timedelta(hours=-3))
+
+
+def _d(dia: str) -> datetime:
+    return datetime.fromisoformat(dia)
+
+
+@pytest.fixture
+def historico(db):
+    precos = [
+        # item 1: troca de preço em 01/02
+        (1, 10, "2025-01-01", "2025-02-01"),
+        (1, 20, "2025-02-01", None),
+        # item 2: buraco entre 10/01 e 20/01
+        (2, 5, "2025-01-01", "2025-01-10"),
+        (2, 6, "2025-01-20", None),
+        # item 3: dois preços abertos (vale o que começou por último)
+        (3, 1, "2025-01-01", None),
+        (3, 2, "2025-03-01", None),
+        # item 4: intervalo longo atrás de um curto que começou depois
+        (4, 100, "2025-01-01", "2025-12-31"),
+        (4, 200, "2025-03-01", "2025-03-02"),
+    ]
+    db.execute(MateriaPrimaPreco.__table__.insert(), [
+        {"materia_prima_id": item, "valor_unitario": valor, "moeda": "BRL", "vigente_desde": _d(desde),
+         "vigente_ate": _d(ate) if ate else None, "created_at": _d(desde)}
+        for item, valor, desde, ate in precos
+    ])
+    # item 5: gravado como no banco do docker-compose (texto com offset)
+    db.execute(text(
+        "INSERT INTO materia_prima_precos (materia_prima_id, valor_unitario, moeda, vigente_desde, vigente_ate, "
+        "created_at) VALUES (5, 7, 'BRL', '2025-07-02 03:00:00+00:00', NULL, '2025-07-02 03:00:00+00:00')"
+    ))
+    db.commit()
+    return db
+
+
+def _valor(registro):
+    return None if registro is None else registro.valor
+
+
+@pytest.mark.parametrize("item, instante, esperado", [
+    (1, _d("2025-01-15"), 10),
+    (1, _d("2025-02-01"), 20),  # vigente_desde fechado, vigente_ate aberto
+    (1, _d("2024-12-31"), None),  # antes do primeiro preço
+    (2, _d("2025-01-15"), None),  # no buraco
+    (2, _d("2025-01-20"), 6),
+    (3, _d("2025-02-01"), 1),
+    (3, _d("2025-03-05"), 2),
+    (4, _d("2025-03-01 12:00"), 200),
+    (4, _d("2025-06-01"), 100),
+    (5, _d("2025-07-02 02:59"), None),
+    (5, _d("2025-07-02 03:00"), 7),
+    # Instantes com fuso são comparados em UTC
+    (1, datetime(2025, 1, 31, 22, 0, tzinfo=BRT), 20),
+    (1, datetime(2025, 1, 31, 20, 59, tzinfo=BRT), 10),
+    (5, datetime(2025, 7, 2, 0, 0, tzinfo=BRT), 7),
+])
+def test_preco_na_data(historico, item, instante, esperado):
+    assert _valor(precos_vigentes.preco_materia_prima_em(historico, item, instante)) == esperado
+    assert _valor(precos_vigentes.precos_materias_primas_em(historico, [(item, instante)])[0]) == esperado
+
+
+def test_lote_igual_consulta_individual(historico):
+    rng = random.Random(46)
+    inicio = datetime(2024, 12, 1)
+    pares = []
+    for _ in range(300):
+        instante = inicio + timedelta(hours=rng.randint(0, 24 * 420))
+        if rng.random() < 0.3:
+            instante = instante.replace(tzinfo=rng.choice([timezone.utc, BRT]))
+        pares.append((rng.randint(1, 6), instante))
+    lote = precos_vigentes.precos_materias_primas_em(historico, pares)
+    individuais = [precos_vigentes.preco_materia_prima_em(historico, item, instante) for item, instante in pares]
+    assert [_valor(r) for r in lote] == [_valor(r) for r in individuais]
+    assert [r.id if r else None for r in lote] == [r.id if r else None for r in individuais]
+
+
+def test_lote_vazio(db):
+    assert precos_vigentes.precos_materias_primas_em(db, []) == []
@@ -0,0 +1,71 @@
+"""Redução das séries por LTTB (app.services.series_precos.lttb)"""
+import math
+import random
+
+from app.services.series_precos import lttb
+
+
+def test_sem_reducao_quando_cabe_no_limite():
+    pontos = [(i, i * 2.0) for i in range(10)]
+    assert lttb(pontos, 10) == list(range(10))
+    assert lttb(pontos, 50) == list(range(10))
+    # Menos de 3 pontos não formam triângulo: nada é reduzido
+    assert lttb(pontos, 2) == list(range(10))
+    assert lttb([], 5) == []
+
+
+def test_mantem_extremos_ordem_e_tamanho():
+    rng = random.Random(47)
+    pontos = [(i, rng.uniform(0, 100)) for i in range(1000)]
+    for limite in (3, 10, 200, 999):
+        indices = lttb(pontos, limite)
+        assert len(indices) == limite
+        assert indices[0] == 0 and indices[-1] == len(pontos) - 1
+        assert indices == sorted(set(indices))
+
+
+def test_preserva_pico_e_queda():
+    pontos = [(i, 10.0) for i in range(500)]
+    pontos[137] = (137, 90.0)
+    pontos[402] = (402, -50.0)
+    indices = lttb(pontos, 20)
+    assert 137 in indices
+    assert 402 in indices
+
+
+def test_um_ponto_por_faixa():
+    pontos = [(i, math.sin(i / 10)) for i in range(102)]
+    indices = lttb(pontos, 12)
+    largura = (len(pontos) - 2) / 10
+    for faixa, indice in enumerate(indices[1:-1]):
+        assert int(faixa * largura) + 1 <= indice < int((faixa + 1) * largura) + 1
+
+
+def test_series_limitadas_a_max_series(db, monkeypatch):
+    from datetime import datetime
+
+    from app.models.materia_prima import MateriaPrima, MateriaPrimaPreco
+    from app.services import series_precos
+
+    agora = datetime(2025, 1, 1)
+    db.execute(MateriaPrima.__table__.insert(), [
+        {"id": i, "nome": f"MP {i}", "unidade_codigo": "KG", "is_active": i != 2, "created_at": agora}
+        for i in range(1, 7)
+    ])
+    db.execute(MateriaPrimaPreco.__table__.insert(), [
+        {"materia_prima_id": i, "valor_unitario": 10 + dia, "moeda": "BRL",
+         "vigente_desde": datetime(2025, 1, 1 + dia), "created_at": agora}
+        for i in range(1, 7) for dia in range(3)
+    ])
+    monkeypatch.setattr(series_precos, "MAX_SERIES", 3)
+
+    resposta = series_precos.series(db, "dia")
+    assert [s["materia_prima_id"] for s in resposta["series"]] == [1, 3, 4]  # 2 está inativa
+    assert resposta["truncado"] is True
+    assert resposta["limite_series"] == 3
+    assert resposta["series"][0]["pontos"][0] == ["2025-01-01", 10.0, 10.0, 10.0, 10.0, 1]
+
+    resposta = series_precos.series(db, "mes", [5, 6])
+    assert [s["materia_prima_id"] for s in resposta["series"]] == [5, 6]
+    assert resposta["truncado"] is False
+    assert resposta["series"][0]["pontos"] == [["2025-01-01", 12.0, 10.0, 12.0, 11.0, 3]]
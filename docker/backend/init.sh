@@ -35,6 +35,12 @@ python -m app.seeds || echo "Seeds falharam (normal se backup ja populou dados)"
 
 echo "Sistema pronto para iniciar!"
 
+# Metricas multiprocesso: arquivos de uma execucao anterior somariam processos mortos
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 # Iniciar aplicaÃ§Ã£o
 echo "Iniciando FastAPI..."
 exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload